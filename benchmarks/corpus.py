@@ -0,0 +1,110 @@
+"""Generates synthetic snippet repositories for the benchmarks.
+
+    python -m benchmarks.corpus /tmp/corpus --folders 50 --files 40 --size 800
+
+The output only depends on the arguments and the seed, so two commits are measured on
+the same corpus.
+"""
+
+import argparse
+import json
+import random
+import typing as t
+from pathlib import Path
+
+from cs_cli.constants import SNIPPET_CONFIG
+
+lang_folders = ("python", "css", "html", "javascript", "rust", "shellscript", "sql")
+charm_contexts = ("Python", "Django", "HTML", "JAVA_SCRIPT", "SQL", "CSS")
+configs = (
+    None,
+    {"vscode_lang_ids": ["python"]},
+    {"vscode_lang_ids": ["python", "html"], "pycharm_contexts": ["Python", "Django"]},
+    {"pycharm_contexts": ["OTHER"]},
+)
+kinds = ("extmark", "pycharm", "plain")
+endings = ("py", "sh", None)
+words = (
+    "value items result target request session context config index data name user"
+).split()
+
+
+class CorpusSpec(t.NamedTuple):
+    folders: int = 20
+    files: int = 20
+    # Approximate size of a snippet file in bytes
+    size: int = 400
+    seed: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.folders}x{self.files}x{self.size}"
+
+
+def _placeholder(kind: str, n: int, word: str) -> str:
+    if kind == "extmark":
+        return f"${{{n}:{word}}}"
+    if kind == "pycharm":
+        return f"${word.upper()}$"
+    return word
+
+
+def snippet_text(rnd: random.Random, kind: str, ending: str | None, size: int) -> str:
+    lines = []
+    if ending == "py":
+        lines += ["import os", "from pathlib import Path", "", ""]
+    n = 0
+    while sum(len(li) + 1 for li in lines) < size:
+        n += 1
+        a, b = rnd.sample(words, 2)
+        var = _placeholder(kind, n, a)
+        indent = "    " * rnd.randint(0, 2)
+        lines.append(f"{indent}{b} = compute({var}, {b}_{n})")
+    if kind == "extmark":
+        lines.append("$0")
+    elif kind == "pycharm":
+        lines.append("$END$")
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(root: Path, spec: CorpusSpec = CorpusSpec()) -> t.List[Path]:
+    """Writes `spec.folders` snippet folders with `spec.files` files each below root.
+    Returns the folders"""
+    rnd = random.Random(spec.seed)
+    folders = []
+    for i in range(spec.folders):
+        if i < len(lang_folders):
+            name = lang_folders[i]
+        else:
+            name = f"group_{i:04d}"
+        folder = root / name
+        folder.mkdir(parents=True, exist_ok=True)
+        config = configs[i % len(configs)]
+        if config is not None:
+            (folder / SNIPPET_CONFIG).write_text(json.dumps(config))
+        for j in range(spec.files):
+            kind = kinds[(i + j) % len(kinds)]
+            ending = endings[j % len(endings)]
+            fn = f"{kind}_{j:04d}" + (f".{ending}" if ending else "")
+            (folder / fn).write_text(snippet_text(rnd, kind, ending, spec.size))
+        folders.append(folder)
+    return folders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", type=Path)
+    # The class attributes of a NamedTuple are field descriptors, not the defaults
+    defaults = CorpusSpec()
+    parser.add_argument("--folders", type=int, default=defaults.folders)
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--size", type=int, default=defaults.size)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+    spec = CorpusSpec(args.folders, args.files, args.size, args.seed)
+    folders = generate_corpus(args.root, spec)
+    print(f"Wrote {len(folders)} folders with {spec.files} files to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Time and peak memory to merge the snippets of many folders that share one lang id,
+as in `python.json`: the accumulation with `VSCodeSnippets.__add__` the vscode target
+used before, which copies the merged dict for every folder, against the
+`VSCodeWriter`, which appends each folder to the open file. Both include serializing.
+`merge_s` is the accumulation alone, the part that grows quadratically.
+
+    python -m benchmarks.lang_merge --folders 500 --files 20
+"""
+
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+from cs_cli import pipeline
+from cs_cli.codium_models import VSCodeOut, VSCodeSnippet, VSCodeWriter
+
+
+def folder_models(folders: int, files: int):
+    models = []
+    for i in range(folders):
+        folder = Path(f"group_{i:04}")
+        snippets = (
+            VSCodeSnippet.construct(
+                prefix=[f"snip_{j}"],
+                body=[f"value_{i}_{j} = $1", "$0"],
+                description=f"from {folder.name}/snip_{j}",
+            )
+            for j in range(files)
+        )
+        models.append((folder, pipeline.vscode_models_callback(snippets, folder)))
+    return models
+
+
+def merge(models):
+    merged = None
+    for _, snippets in models:
+        merged = snippets if merged is None else merged + snippets
+    return merged
+
+
+def accumulated(models) -> bytes:
+    merged = merge(models)
+    return VSCodeOut.construct(__root__={"python.json": merged}).json(indent=2).encode()
+
+
+def streamed(models) -> bytes:
+    writer = VSCodeWriter()
+    try:
+        for folder, snippets in models:
+            assert not writer.add("python.json", snippets, folder.name)
+        parts = []
+        writer.echo(parts.append)
+        return "".join(parts).encode()
+    finally:
+        writer.cleanup()
+
+
+def best_of(fn, models, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(models)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_bytes(fn, models) -> int:
+    tracemalloc.start()
+    try:
+        fn(models)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(folders: int = 500, files: int = 20, repeat: int = 3):
+    models = folder_models(folders, files)
+    assert accumulated(models) == streamed(models)
+    return {
+        "snippets": folders * files,
+        "merge_s": best_of(merge, models, repeat),
+        "accumulated_s": best_of(accumulated, models, repeat),
+        "streamed_s": best_of(streamed, models, repeat),
+        "accumulated_peak_bytes": peak_bytes(accumulated, models),
+        "streamed_peak_bytes": peak_bytes(streamed, models),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folders", type=int, default=500)
+    parser.add_argument("--files", type=int, default=20)
+    args = parser.parse_args(argv)
+    r = run(args.folders, args.files)
+    print(f"{r['snippets']} snippets in one file")
+    for key, value in r.items():
+        if key.endswith("_s"):
+            print(f"  {key:24} {value:8.3f}")
+        elif key.endswith("_bytes"):
+            print(f"  {key:24} {value / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Time to build and refresh the snippet index and to answer queries on a corpus of
+50k snippets.
+
+    python -m benchmarks.search --folders 250 --files 200
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from cs_cli.folder_index import FolderIndex
+from cs_cli.snippet_db import SnippetDB
+
+# (query, lang id, group). The corpus uses a dozen words, so a word of the body
+# matches nearly every snippet, which is the worst case for ranking
+queries = (
+    ("extmark_0042", None, None),
+    ("compute", None, "group_0100"),
+    ("session request", None, None),
+    ("value", "html", None),
+)
+
+
+def run(spec: CorpusSpec, repeat: int = 20):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "corpus"
+        generate_corpus(root, spec)
+        index = FolderIndex(root, Path(tmp) / "folders.json")
+        result = {}
+        with SnippetDB(Path(tmp) / "snippets.sqlite3") as db:
+            start = time.perf_counter()
+            db.update(index)
+            result["index_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            stats = db.update(index)
+            result["refresh_s"] = time.perf_counter() - start
+            assert stats.unchanged == spec.folders * spec.files
+            for query, lang_id, group in queries:
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    db.search(query, lang_id=lang_id, group=group)
+                    best = min(best, time.perf_counter() - start)
+                key = f"search {query!r} lang={lang_id} group={group} ms"
+                result[key] = best * 1000
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folders", type=int, default=250)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size", type=int, default=300)
+    args = parser.parse_args(argv)
+    spec = CorpusSpec(args.folders, args.files, args.size)
+    print(f"{spec.folders * spec.files} snippets")
+    for key, value in run(spec).items():
+        print(f"{key}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
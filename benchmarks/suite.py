@@ -0,0 +1,261 @@
+"""Offline benchmark suite on a synthetic snippet corpus.
+
+    python -m benchmarks.suite --scale medium --output before.json
+    python -m benchmarks.suite --scale medium --output after.json --compare before.json
+
+Each case reports the best and the median wall time of its repeats. The JSON results
+include the corpus spec, the python version and the git commit, so runs of different
+commits can be compared.
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import typing as t
+from datetime import datetime, timezone
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from cs_cli import pipeline
+from cs_cli.charm_models import CharmTemplate
+from cs_cli.codium_models import VSCodeOut
+from cs_cli.constants import SNIPPETS_ROOT_ENV
+from cs_cli.main import app
+from cs_cli.snippet import Snippet
+
+scales = {
+    "small": CorpusSpec(folders=10, files=10, size=300),
+    "medium": CorpusSpec(folders=40, files=30, size=600),
+    "large": CorpusSpec(folders=150, files=60, size=1200),
+}
+
+
+class Case(t.NamedTuple):
+    name: str
+    run: t.Callable[[], t.Any]
+    # Number of items processed per run, to report per-item times
+    items: int
+    setup: t.Callable[[], t.Any] | None = None
+
+
+def measure(case: Case, repeat: int) -> t.Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        if case.setup is not None:
+            case.setup()
+        start = time.perf_counter()
+        case.run()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "min_s": best,
+        "median_s": statistics.median(times),
+        "items": case.items,
+        "per_item_us": best / max(case.items, 1) * 1e6,
+    }
+
+
+def read_corpus(folders: t.Sequence[Path]) -> t.Dict[Path, t.List[Snippet]]:
+    transforms = pipeline.file_transforms(False)
+    return {
+        folder: [
+            pipeline.read_snippet(f, transforms, pipeline.snippets_config(folder))
+            for f in sorted(folder.iterdir())
+            if not f.name.startswith(".")
+        ]
+        for folder in folders
+    }
+
+
+def cases(root: Path, folders: t.Sequence[Path], out: Path) -> t.List[Case]:
+    snippets = read_corpus(folders)
+    all_snippets = [s for group in snippets.values() for s in group]
+    contents = [s.file.read_text() for s in all_snippets]
+    names = [s.file.name for s in all_snippets]
+    transforms = pipeline.file_transforms(True)
+
+    templates = {
+        folder: [pipeline.charm_handle_file(s) for s in group]
+        for folder, group in snippets.items()
+    }
+    template_sets = [
+        pipeline.charm_models_callback(models, folder)
+        for folder, models in templates.items()
+    ]
+    vscode_sets = [
+        pipeline.vscode_models_callback(map(pipeline.vscode_handle_file, group), folder)
+        for folder, group in snippets.items()
+    ]
+    vscode_out = VSCodeOut.parse_obj(
+        {f"{folder.name}.code-snippets": m for folder, m in zip(folders, vscode_sets)}
+    )
+    write_dir = out / "write_files"
+
+    def fresh_write_dir():
+        shutil.rmtree(write_dir, ignore_errors=True)
+        write_dir.mkdir(parents=True)
+
+    def context(s: Snippet):
+        return [{"name": n} for n in s.config.pycharm_contexts]
+
+    runner = CliRunner()
+    folder_args = [arg for f in folders for arg in ("-f", str(f))]
+    env = {SNIPPETS_ROOT_ENV: str(root)}
+
+    def cli(*args: str):
+        def run():
+            result = runner.invoke(
+                app, [*args, *folder_args, "--force", "-j", "1"], env=env
+            )
+            if result.exit_code != 0:
+                raise RuntimeError(result.output) from result.exception
+
+        return run
+
+    def e2e_out(name: str):
+        path = out / name
+        return lambda: (shutil.rmtree(path, ignore_errors=True), path.mkdir())
+
+    def clear_config_cache():
+        pipeline.reset_configs()
+
+    return [
+        Case(
+            "transform_content",
+            lambda: [
+                pipeline.transform_content(fn, c, transforms)
+                for fn, c in zip(names, contents)
+            ],
+            len(contents),
+        ),
+        Case(
+            "charm_template",
+            lambda: [
+                CharmTemplate(name=s.name, value=s.body, context=context(s))
+                for s in all_snippets
+            ],
+            len(all_snippets),
+        ),
+        Case(
+            "template_set_xml",
+            lambda: [m.xml() for m in template_sets],
+            len(template_sets),
+        ),
+        Case(
+            "vscode_snippets_json",
+            lambda: [m.json(indent=2) for m in vscode_sets],
+            len(vscode_sets),
+        ),
+        Case(
+            "vscode_write_files",
+            lambda: vscode_out.write_files(write_dir),
+            len(vscode_sets),
+            setup=fresh_write_dir,
+        ),
+        Case(
+            "cli_pycharm",
+            cli("pycharm", "--out-dir", str(out / "pycharm")),
+            len(all_snippets),
+            setup=lambda: (e2e_out("pycharm")(), clear_config_cache()),
+        ),
+        Case(
+            "cli_vscode",
+            cli("vscode", "--out-dir", str(out / "vscode"), "--strategy", "overwrite"),
+            len(all_snippets),
+            setup=lambda: (e2e_out("vscode")(), clear_config_cache()),
+        ),
+    ]
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run(
+    spec: CorpusSpec, repeat: int = 5, only: t.Sequence[str] = ()
+) -> t.Dict[str, t.Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "corpus"
+        out = Path(tmp) / "out"
+        out.mkdir()
+        folders = generate_corpus(root, spec)
+        results = {}
+        for case in cases(root, folders, out):
+            if only and case.name not in only:
+                continue
+            results[case.name] = measure(case, repeat)
+    return {
+        "meta": {
+            "corpus": spec._asdict(),
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(results: t.Dict[str, t.Any], baseline: t.Dict[str, t.Any]):
+    """Prints the ratio of each case to the baseline, > 1 is faster"""
+    base = baseline["results"]
+    if baseline["meta"]["corpus"] != results["meta"]["corpus"]:
+        print("Warning: the baseline used a different corpus")
+    for name, r in results["results"].items():
+        if name not in base:
+            continue
+        ratio = base[name]["min_s"] / r["min_s"]
+        print(
+            f"{name:22} {base[name]['min_s']:9.4f}s -> {r['min_s']:9.4f}s  x{ratio:.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=scales, default="small")
+    parser.add_argument("--folders", type=int, help="Overrides the scale")
+    parser.add_argument("--files", type=int, help="Overrides the scale")
+    parser.add_argument("--size", type=int, help="Overrides the scale")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--case", action="append", default=[], help="Only run these")
+    parser.add_argument("--output", type=Path, help="Write the results as json")
+    parser.add_argument("--compare", type=Path, help="Results json of a baseline")
+    args = parser.parse_args(argv)
+
+    overrides = {
+        k: getattr(args, k)
+        for k in ("folders", "files", "size")
+        if getattr(args, k) is not None
+    }
+    spec = scales[args.scale]._replace(**overrides)
+    results = run(spec, repeat=args.repeat, only=args.case)
+    for name, r in results["results"].items():
+        print(
+            f"{name:22} best {r['min_s']:9.4f}s  median {r['median_s']:9.4f}s  "
+            f"{r['per_item_us']:9.1f}us/item"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
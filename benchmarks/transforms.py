@@ -0,0 +1,90 @@
+"""Compares the whole-buffer file transforms against the former per-line
+`yield_lines` pipeline on large python snippet files.
+
+    python -m benchmarks.transforms
+"""
+
+import random
+import re
+import timeit
+from functools import partial
+
+from cs_cli.pipeline import file_transforms, transform_content
+from cs_cli.py import remove_python_imports
+from cs_cli.utils import file_ending, yield_lines
+
+
+def legacy_remove_imports(line: str, rm_imports: bool = False) -> str | None:
+    return line if not rm_imports else remove_python_imports(line)
+
+
+def legacy_identity(line: str) -> str:
+    return line
+
+
+def legacy_line_transforms(rm_imports: bool):
+    return {
+        "py": (partial(legacy_remove_imports, rm_imports=rm_imports),),
+        None: (legacy_identity,),
+        "sh": (legacy_identity,),
+    }
+
+
+def legacy_transform_content(fn: str, content: str, line_transforms):
+    """The transform before the whole-buffer pipeline, kept for comparison"""
+    ending = file_ending(fn)
+    lines = yield_lines(content, line_transforms[ending])
+    snippet_name = re.sub(rf"\.{ending}", "", fn)
+    return snippet_name, re.sub(r"^\n{2,}", "", "\n".join(lines))
+
+
+def python_file(lines: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    out = ["import os", "from pathlib import Path", "", ""]
+    for i in range(lines):
+        if rnd.random() < 0.05:
+            out.append(f"import module_{i}")
+        else:
+            out.append("    " * rnd.randint(0, 3) + f"value_{i} = compute(${i}:x}})")
+    return "\n".join(out) + "\n"
+
+
+def run(lines=(100, 1_000, 10_000), number: int = 20, repeat: int = 5):
+    results = {}
+    for rm_imports in (True, False):
+        legacy_transforms = legacy_line_transforms(rm_imports)
+        transforms = file_transforms(rm_imports)
+        for n in lines:
+            content = python_file(n)
+            legacy = legacy_transform_content("big.py", content, legacy_transforms)
+            assert legacy == transform_content("big.py", content, transforms)
+            legacy_s = min(
+                timeit.repeat(
+                    lambda: legacy_transform_content(
+                        "big.py", content, legacy_transforms
+                    ),
+                    number=number,
+                    repeat=repeat,
+                )
+            )
+            new_s = min(
+                timeit.repeat(
+                    lambda: transform_content("big.py", content, transforms),
+                    number=number,
+                    repeat=repeat,
+                )
+            )
+            results[f"{n} lines, rm_imports={rm_imports}"] = {
+                "legacy_us": legacy_s / number * 1e6,
+                "buffer_us": new_s / number * 1e6,
+                "speedup": legacy_s / new_s,
+            }
+    return results
+
+
+if __name__ == "__main__":
+    for name, r in run().items():
+        print(
+            f"{name:30} legacy {r['legacy_us']:9.1f}us  "
+            f"buffer {r['buffer_us']:9.1f}us  x{r['speedup']:.1f}"
+        )
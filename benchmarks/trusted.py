@@ -0,0 +1,100 @@
+"""CPU time per thousand snippets for building the editor models with validation on
+every step, as before, and with the trusted construction used by the pipeline.
+
+    python -m benchmarks.trusted
+"""
+
+import random
+import time
+from pathlib import Path
+
+from benchmarks.corpus import configs, kinds, snippet_text
+from cs_cli import pipeline
+from cs_cli.charm_models import CharmTemplate, TemplateContext, TemplateSet
+from cs_cli.codium_models import VSCodeOut, VSCodeSnippet, VSCodeSnippets
+from cs_cli.config import SnippetsConfig, folder_config
+from cs_cli.placeholders import parse_placeholders
+from cs_cli.snippet import Snippet
+
+
+def snippets(count: int, per_folder: int = 20, seed: int = 0):
+    rnd = random.Random(seed)
+    folders = {}
+    for i in range(count):
+        folder = Path(f"group_{i // per_folder}")
+        data = configs[i // per_folder % len(configs)] or {}
+        config = folder_config(SnippetsConfig.parse_obj(data))
+        body = snippet_text(rnd, kinds[i % len(kinds)], "py", 300)
+        folders.setdefault(folder, []).append(
+            Snippet(f"snip_{i}", folder.name, body, folder / f"snip_{i}.py", config)
+        )
+    return folders
+
+
+def validated(folders):
+    """The model building before the trusted construction, kept for comparison"""
+    out = {}
+    for folder, group in folders.items():
+        templates = []
+        for sn in group:
+            ctx = TemplateContext.parse_obj(
+                [{"name": n} for n in sn.config.pycharm_contexts]
+            )
+            templates.append(CharmTemplate(name=sn.name, value=sn.body, context=ctx))
+        TemplateSet(group="cs-" + folder.name, templates=templates)
+        models = {
+            f"{folder.name}-{sn.name}": VSCodeSnippet(
+                prefix=[sn.name],
+                body=sn.placeholders.extmark.splitlines(),
+                description=f"from {sn.group}/{sn.name}",
+            )
+            for sn in group
+        }
+        vscode = VSCodeSnippets.parse_obj(models)
+        key = f"{folder.name}.code-snippets"
+        if key in out:
+            merged = out[key].__root__.copy()
+            merged.update(vscode.__root__)
+            out[key] = VSCodeSnippets(__root__=merged)
+        else:
+            out[key] = vscode
+    return VSCodeOut.parse_obj(out)
+
+
+def trusted(folders):
+    out = {}
+    for folder, group in folders.items():
+        pipeline.charm_models_callback(map(pipeline.charm_handle_file, group), folder)
+        vscode = pipeline.vscode_models_callback(
+            map(pipeline.vscode_handle_file, group), folder
+        )
+        key = f"{folder.name}.code-snippets"
+        out[key] = out[key] + vscode if key in out else vscode
+    return VSCodeOut.construct(__root__=out)
+
+
+def cpu_ms_per_thousand(build, folders, count: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # Both paths parse the placeholders, compare without memoized results
+        parse_placeholders.cache_clear()
+        start = time.process_time()
+        build(folders)
+        best = min(best, time.process_time() - start)
+    return best / count * 1000 * 1e3
+
+
+def run(count: int = 2000, repeat: int = 5):
+    folders = snippets(count)
+    assert validated(folders).json() == trusted(folders).json()
+    before = cpu_ms_per_thousand(validated, folders, count, repeat)
+    after = cpu_ms_per_thousand(trusted, folders, count, repeat)
+    return {"validated_ms": before, "trusted_ms": after, "speedup": before / after}
+
+
+if __name__ == "__main__":
+    r = run()
+    print(
+        f"CPU per 1000 snippets: validated {r['validated_ms']:.1f}ms  "
+        f"trusted {r['trusted_ms']:.1f}ms  x{r['speedup']:.1f}"
+    )
@@ -0,0 +1,75 @@
+"""Compares `XmlMixin.to_ET` following the cached `xml_plan` against the former
+implementation that called `dict()` and inspected every field per instance.
+
+    python -m benchmarks.xml_plan
+"""
+
+import timeit
+import xml.etree.ElementTree as ET
+
+from pydantic.typing import get_origin
+from pydantic.utils import lenient_issubclass
+
+from cs_cli.charm_models import (
+    CharmTemplate,
+    CharmVariable,
+    TemplateContext,
+    XmlMixin,
+    create_element,
+)
+
+
+def legacy_to_ET(model: XmlMixin, parent=None):
+    """The serializer before the per-class plan, kept for comparison"""
+    data = model.dict()
+    elem_data = {k: v for k, v in data.items() if isinstance(v, str)}
+    elem = create_element(model._xml_tag, parent, elem_data)
+    for key, model_field in model.__fields__.items():
+        if key in elem_data:
+            continue
+        if not lenient_issubclass(model_field.type_, XmlMixin):
+            continue
+        value = getattr(model, key)
+        if get_origin(model_field.outer_type_) in (list, set, tuple):
+            for child in value or []:
+                legacy_to_ET(child, elem)
+        elif value is not None:
+            legacy_to_ET(value, elem)
+    return elem
+
+
+def samples():
+    context = TemplateContext.parse_obj([{"name": "Python"}, {"name": "Django"}])
+    return {
+        "CharmVariable": CharmVariable(name="TARGET"),
+        "TemplateContext": context,
+        "CharmTemplate": CharmTemplate(
+            name="for", value="for $TARGET$ in $ITER$:\n    $END$", context=context
+        ),
+    }
+
+
+def run(number: int = 20_000, repeat: int = 5):
+    results = {}
+    for name, model in samples().items():
+        assert ET.tostring(legacy_to_ET(model)) == ET.tostring(model.to_ET())
+        legacy = min(
+            timeit.repeat(lambda: legacy_to_ET(model), number=number, repeat=repeat)
+        )
+        planned = min(
+            timeit.repeat(lambda: model.to_ET(), number=number, repeat=repeat)
+        )
+        results[name] = {
+            "legacy_us": legacy / number * 1e6,
+            "plan_us": planned / number * 1e6,
+            "speedup": legacy / planned,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for name, r in run().items():
+        print(
+            f"{name:16} legacy {r['legacy_us']:7.2f}us  "
+            f"plan {r['plan_us']:7.2f}us  x{r['speedup']:.1f}"
+        )
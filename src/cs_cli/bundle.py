@@ -0,0 +1,429 @@
+"""Distributable snippet bundles: `cs-cli bundle` renders the editor outputs once and
+`cs-cli install` writes them on other machines without the snippet sources.
+
+A bundle is a single file::
+
+    b"CSBUNDLE" | format (u32) | header length (u64) | header json | payloads
+
+The header holds the bundle version, the tool version, the file entries with the
+offset, size and content hash of each payload, and an index of the groups and
+snippets. Payloads are the rendered PyCharm xml and VSCode json files, stored as
+they are written. Installing memory-maps the bundle and writes each payload slice
+straight to its file; neither pydantic nor the transforms are imported.
+"""
+
+import contextlib
+import errno
+import json
+import mmap
+import os
+import shutil
+import stat
+import struct
+import tempfile
+import typing as t
+import uuid
+from pathlib import Path
+
+from cs_cli.constants import DEFAULT_PREFIX, MANIFEST_FILE
+from cs_cli.jsonc import JSONCDecodeError, merge_object
+from cs_cli.manifest import content_hash, tool_version
+
+if t.TYPE_CHECKING:
+    from cs_cli.matcher import Matcher
+
+BUNDLE_MAGIC = b"CSBUNDLE"
+BUNDLE_FORMAT = 1
+BUNDLE_SUFFIX = ".csbundle"
+EDITORS = ("pycharm", "vscode")
+# The files a bundle may install
+PAYLOAD_SUFFIXES = (".xml", ".json", ".code-snippets")
+_prelude = struct.Struct("<IQ")
+
+
+class BundleError(ValueError):
+    pass
+
+
+class BundleFile(t.NamedTuple):
+    editor: str
+    name: str
+    # Relative to the end of the header
+    offset: int
+    size: int
+    hash: str
+
+
+class BundleGroup(t.NamedTuple):
+    """An index entry: a snippet group and the files it is rendered into"""
+
+    group: str
+    snippets: t.Tuple[str, ...]
+    pycharm: str
+    vscode: t.Tuple[str, ...]
+
+
+def valid_payload_name(name: str) -> bool:
+    """Payloads are written into the editor directories by name, so the name must
+    not reach outside of them. The hash of a payload does not vouch for its name"""
+    return (
+        name not in ("", ".", "..")
+        and "/" not in name
+        and "\\" not in name
+        and os.sep not in name
+        and (os.altsep is None or os.altsep not in name)
+        and name.endswith(PAYLOAD_SUFFIXES)
+    )
+
+
+class Bundle:
+    """A memory-mapped bundle. Payloads are views into the mapping and should be
+    released after use, e.g. `with bundle.payload(f) as data: ...`"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fp = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped
+            self._fp.close()
+            raise BundleError(f"{path} is not a snippet bundle") from None
+        self._view = memoryview(self._mm)
+        try:
+            self.header = self._read_header()
+        except BundleError:
+            self.close()
+            raise
+        self.files = tuple(BundleFile(**f) for f in self.header["files"])
+        for file in self.files:
+            if file.editor not in EDITORS or not valid_payload_name(file.name):
+                self.close()
+                raise BundleError(f"{path}: invalid file {file.editor}/{file.name}")
+        self.index = tuple(
+            BundleGroup(
+                g["group"], tuple(g["snippets"]), g["pycharm"], tuple(g["vscode"])
+            )
+            for g in self.header["index"]
+        )
+
+    def _read_header(self) -> t.Dict[str, t.Any]:
+        start = len(BUNDLE_MAGIC) + _prelude.size
+        if self._mm[: len(BUNDLE_MAGIC)] != BUNDLE_MAGIC or len(self._mm) < start:
+            raise BundleError(f"{self.path} is not a snippet bundle")
+        fmt, length = _prelude.unpack_from(self._mm, len(BUNDLE_MAGIC))
+        if fmt != BUNDLE_FORMAT:
+            raise BundleError(
+                f"{self.path} has bundle format {fmt}, this cs-cli reads {BUNDLE_FORMAT}"
+            )
+        self._data_start = start + length
+        try:
+            return json.loads(self._view[start : self._data_start].tobytes())
+        except ValueError as err:
+            raise BundleError(f"{self.path}: invalid header: {err}") from None
+
+    @property
+    def version(self) -> str:
+        return self.header["version"]
+
+    @property
+    def digest(self) -> str:
+        return self.header["digest"]
+
+    def payload(self, file: BundleFile) -> memoryview:
+        start = self._data_start + file.offset
+        if start + file.size > len(self._mm):
+            raise BundleError(f"{self.path}: {file.name} is truncated")
+        return self._view[start : start + file.size]
+
+    def verify(self):
+        """Checks every payload against its hash"""
+        for file in self.files:
+            with self.payload(file) as data:
+                if content_hash(data) != file.hash:
+                    raise BundleError(f"{self.path}: {file.name} is corrupt")
+
+    def close(self):
+        self._view.release()
+        self._mm.close()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_bundle(
+    path: Path,
+    staging: t.Mapping[str, Path],
+    index: t.Sequence[BundleGroup],
+    version: str = "",
+    group_prefix: str = DEFAULT_PREFIX,
+) -> t.Dict[str, t.Any]:
+    """Packs the files of the staging directory of each editor into a bundle.
+    Returns the header"""
+    files = []
+    sources = []
+    offset = 0
+    for editor, directory in staging.items():
+        for file in sorted(directory.iterdir()):
+            if file.name.startswith(MANIFEST_FILE) or not file.is_file():
+                continue
+            data = file.read_bytes()
+            files.append(
+                BundleFile(editor, file.name, offset, len(data), content_hash(data))
+            )
+            sources.append(file)
+            offset += len(data)
+    digest = content_hash(
+        json.dumps([[f.editor, f.name, f.hash] for f in files]).encode()
+    )
+    header = {
+        "version": version or digest[:12],
+        "tool": tool_version(),
+        "digest": digest,
+        "group_prefix": group_prefix,
+        "files": [f._asdict() for f in files],
+        "index": [g._asdict() for g in index],
+    }
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as out:
+        out.write(BUNDLE_MAGIC)
+        out.write(_prelude.pack(BUNDLE_FORMAT, len(encoded)))
+        out.write(encoded)
+        for source in sources:
+            with open(source, "rb") as f:
+                shutil.copyfileobj(f, out)
+    os.replace(tmp, path)
+    return header
+
+
+def build_bundle(
+    path: Path,
+    folders: t.Sequence[Path],
+    root: Path | None = None,
+    matcher: "Matcher | None" = None,
+    rm_imports: bool = False,
+    group_prefix: str = DEFAULT_PREFIX,
+    version: str = "",
+    jobs: int | None = None,
+    read_ahead: int = 0,
+) -> t.Dict[str, t.Any]:
+    """Builds the PyCharm and VSCode outputs of the folders into a bundle, reading
+    each snippet file once. Returns the header"""
+    from cs_cli.pipeline import (
+        Target,
+        group_file_name,
+        pycharm_target,
+        run_targets,
+        vscode_output_names,
+        vscode_target,
+    )
+    from cs_cli.types import MergeStrategy
+
+    index = []
+
+    def collect(folder, names: t.List[str]):
+        index.append(
+            BundleGroup(
+                folder.name,
+                tuple(names),
+                f"{group_prefix}{group_file_name(folder)}.xml",
+                vscode_output_names(folder),
+            )
+        )
+
+    index_target = Target(
+        name="index",
+        templates_dir=path.parent,
+        file_to_model=_snippet_name,
+        models_callback=_snippet_names,
+        collect_callback=collect,
+        print_on_dry_run=False,
+    )
+    with tempfile.TemporaryDirectory(prefix="cs-bundle-") as tmp:
+        staging = {editor: Path(tmp) / editor for editor in EDITORS}
+        for directory in staging.values():
+            directory.mkdir()
+        pycharm, pycharm_finish = pycharm_target(staging["pycharm"], group_prefix)
+        vscode, vscode_finish = vscode_target(
+            [staging["vscode"]], MergeStrategy.OVERWRITE
+        )
+        run_targets(
+            [
+                # Everything is rendered, there is nothing to compare with
+                (pycharm._replace(manifest=None), pycharm_finish),
+                (vscode._replace(manifest=None), vscode_finish),
+                (index_target, _no_finish),
+            ],
+            folders=folders,
+            rm_imports=rm_imports,
+            matcher=matcher,
+            dry_run=False,
+            jobs=jobs,
+            root=root,
+            read_ahead=read_ahead,
+        )
+        return write_bundle(path, staging, index, version, group_prefix)
+
+
+def _snippet_name(snippet) -> str:
+    return snippet.name
+
+
+def _snippet_names(names: t.Iterable[str], folder: Path) -> t.List[str]:
+    return list(names)
+
+
+def _no_finish(dirty: t.Set[str] | None, dry_run: bool):
+    pass
+
+
+# (uid, gid)
+OwnerT = t.Tuple[int, int]
+
+
+# The temp file must be new, links planted at its name are not followed
+_EXCLUSIVE = (
+    os.O_WRONLY
+    | os.O_CREAT
+    | os.O_EXCL
+    | getattr(os, "O_NOFOLLOW", 0)
+    | getattr(os, "O_BINARY", 0)
+)
+
+
+_DIRECTORY = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+
+
+def open_dir(home: Path, directory: Path) -> int:
+    """A descriptor of a directory below `home`, opened one part at a time without
+    following links. Once checked, the directory can not be swapped for a link to
+    somewhere else: names are then resolved relative to the descriptor"""
+    fd = os.open(home, _DIRECTORY)
+    try:
+        for part in directory.relative_to(home).parts:
+            parent, fd = fd, -1
+            try:
+                fd = os.open(part, _DIRECTORY | _NOFOLLOW, dir_fd=parent)
+            finally:
+                os.close(parent)
+    except BaseException:
+        if fd >= 0:
+            os.close(fd)
+        raise
+    return fd
+
+
+def _read_existing(file: Path, dir_fd: int | None = None) -> bytes | None:
+    """The content of a file to replace, None if there is no regular file. With
+    `dir_fd`, `file` is looked up by name in that directory and must not be a link"""
+    if dir_fd is None:
+        return file.read_bytes() if file.is_file() else None
+    try:
+        # Non-blocking, so a planted fifo can not stall the install
+        fd = os.open(file.name, os.O_RDONLY | _NOFOLLOW | os.O_NONBLOCK, dir_fd=dir_fd)
+    except FileNotFoundError:
+        return None
+    except OSError as err:
+        if err.errno == errno.ELOOP:
+            raise OSError(err.errno, "refusing to follow a link", str(file)) from None
+        raise
+    with open(fd, "rb") as f:
+        if not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            return None
+        return f.read()
+
+
+def _write_atomic(
+    file: Path,
+    data: t.Union[bytes, memoryview],
+    owner: OwnerT | None = None,
+    dir_fd: int | None = None,
+):
+    """Writes through a new temp file renamed over `file`. With `dir_fd`, `file` is
+    looked up by name in that directory"""
+    tmp = f".{file.name}.{uuid.uuid4().hex[:12]}.tmp"
+    if dir_fd is None:
+        tmp, target = str(file.with_name(tmp)), str(file)
+    else:
+        target = file.name
+    fd = os.open(tmp, _EXCLUSIVE, 0o666, dir_fd=dir_fd)
+    try:
+        with open(fd, "wb") as f:
+            if owner is not None:
+                os.fchown(f.fileno(), *owner)
+            f.write(data)
+        os.replace(tmp, target, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp, dir_fd=dir_fd)
+        raise
+
+
+def install_bundle(
+    bundle: Bundle,
+    dirs: t.Mapping[str, t.Sequence[Path]],
+    overwrite: bool = False,
+    dry_run: bool = False,
+    verify: bool = True,
+    owner: OwnerT | None = None,
+    home: Path | None = None,
+) -> t.Dict[Path, t.List[str]]:
+    """Writes the payloads of each editor to its directories and returns the names
+    written per directory. Files with the same content are left alone. Unless
+    `overwrite`, VSCode snippets are merged into existing files like `cs-cli vscode`
+    does. With `verify`, the payloads are checked against their hash before anything
+    is written. Written files are given to `owner`, if set.
+
+    With `home`, the directories must be real paths below it. They are opened
+    without following links (see `open_dir`), and neither the files nor the temp
+    files are written through links"""
+    if verify:
+        bundle.verify()
+    written: t.Dict[Path, t.List[str]] = {}
+    dir_fds: t.Dict[Path, int | None] = {}
+    try:
+        for file in bundle.files:
+            targets = dirs.get(file.editor, ())
+            if not targets:
+                continue
+            with bundle.payload(file) as data:
+                for directory in targets:
+                    if directory not in dir_fds:
+                        # A dry run does not create the directories
+                        missing = dry_run and not directory.is_dir()
+                        dir_fds[directory] = (
+                            None
+                            if home is None or missing
+                            else open_dir(home, directory)
+                        )
+                    dir_fd = dir_fds[directory]
+                    dest = directory / file.name
+                    content: t.Union[bytes, memoryview] = data
+                    old = _read_existing(dest, dir_fd)
+                    if old is not None:
+                        if not overwrite and file.editor == "vscode":
+                            try:
+                                merged = merge_object(
+                                    old.decode(), json.loads(bytes(data))
+                                )
+                            except JSONCDecodeError as err:
+                                raise JSONCDecodeError(
+                                    f"{dest}: {err.msg}", err.pos
+                                ) from None
+                            content = merged.encode()
+                        if old == content:
+                            continue
+                    written.setdefault(directory, []).append(file.name)
+                    if not dry_run:
+                        _write_atomic(dest, content, owner, dir_fd)
+    finally:
+        for fd in dir_fds.values():
+            if fd is not None:
+                os.close(fd)
+    return written
@@ -1,12 +1,16 @@
+import functools
 import re
 import typing as t
 import xml.etree.ElementTree as ET
 from io import BytesIO
+from pathlib import Path
 
 from pydantic import BaseModel, Field, validator
 from pydantic.typing import get_origin
 from pydantic.utils import lenient_issubclass
 
+from cs_cli.placeholders import Placeholders, parse_placeholders
+
 BoolType = t.Literal["true", "false"]
 CharmContextNames = t.Literal[
     "OTHER",
@@ -35,6 +39,24 @@ digits_rgx = re.compile(r"^\d+$")
 # Todo: check out pydantic-xml package that allows also de-serializing an ElementTree
 
 
+_attrib_escapes = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "\r": "&#13;",
+        "\n": "&#10;",
+        "\t": "&#09;",
+    }
+)
+
+
+def escape_attrib(value: str) -> str:
+    """Escapes an attribute value the same way ElementTree does"""
+    return value.translate(_attrib_escapes)
+
+
 def create_element(key: str, parent=None, attribs: None | t.Dict[str, str] = None):
     attribs = attribs or {}
     if parent is None:
@@ -42,50 +64,79 @@ def create_element(key: str, parent=None, attribs: None | t.Dict[str, str] = Non
     return ET.SubElement(parent, key, attribs)
 
 
+class XmlPlan(t.NamedTuple):
+    """Which fields of a model class render as attributes and which as child elements"""
+
+    attributes: t.Tuple[str, ...]
+    # (field name, is a collection of models) in field order
+    children: t.Tuple[t.Tuple[str, bool], ...]
+
+
+@functools.cache
+def xml_plan(cls: t.Type["XmlMixin"]) -> XmlPlan:
+    attributes = []
+    children = []
+    for key, model_field in cls.__fields__.items():
+        if not lenient_issubclass(model_field.type_, XmlMixin):
+            attributes.append(key)
+            continue
+        origin = get_origin(model_field.outer_type_)
+        children.append((key, origin in (list, set, tuple)))
+    return XmlPlan(tuple(attributes), tuple(children))
+
+
 class XmlMixin(BaseModel):
     """pydantic mixin to render a model as xml."""
 
     _xml_tag = "default"
 
     def to_ET(self, parent=None, exclude=None):
-        exclude = exclude or set()
-
-        def include(field_val):
-            if isinstance(field_val, str):
-                return True
-            return False
-
-        data = self.dict(exclude=exclude)
-        elem_data = {k: v for k, v in data.items() if include(v)}
-        elem = create_element(self._xml_tag, parent, elem_data)
-
-        def register_field(key, model_field):
-            origin = get_origin(model_field.outer_type_)
-            if not lenient_issubclass(model_field.type_, XmlMixin):
-                # print(f'Skipped (not a subclass): {key}')
-                # print(f'origin: {origin}')
-                # print(f'field type: {model_field.type_}')
-                return
-
-            if origin in (list, set, tuple):
-                for model in getattr(self, key) or []:
-                    try:
-                        model.to_ET(elem)
-                    except AttributeError:
-                        return
-            try:
-                # print(f'field type: {model_field.type_}')
-                getattr(self, key).to_ET(elem)
-            except AttributeError:
-                return
-
-        for key, model_field in self.__fields__.items():
-            if key in elem_data:
-                continue
-            register_field(key, model_field)
-
+        attribs, children = self._xml_parts(exclude)
+        elem = create_element(self._xml_tag, parent, attribs)
+        for child in children:
+            child.to_ET(elem)
         return elem
 
+    def _xml_parts(self, exclude=None):
+        """Returns the attributes and the child models following the class' `xml_plan`"""
+        plan = xml_plan(self.__class__)
+        values = self.__dict__
+        attribs = {}
+        for key in plan.attributes:
+            value = values[key]
+            if isinstance(value, str) and not (exclude and key in exclude):
+                attribs[key] = value
+        children = []
+        for key, is_collection in plan.children:
+            value = values[key]
+            if value is None or (exclude and key in exclude):
+                continue
+            if is_collection:
+                children.extend(value)
+            else:
+                children.append(value)
+        return attribs, children
+
+    def iter_xml(self, indent: int = 2, level: int = 0) -> t.Iterator[str]:
+        """Yields the xml of `xml()` in chunks, one element at a time"""
+        attribs, children = self._xml_parts()
+        attrs = "".join(f' {k}="{escape_attrib(v)}"' for k, v in attribs.items())
+        if not children:
+            yield f"<{self._xml_tag}{attrs} />"
+            return
+        yield f"<{self._xml_tag}{attrs}>"
+        child_indent = "\n" + indent * " " * (level + 1)
+        for child in children:
+            yield child_indent
+            yield from child.iter_xml(indent, level + 1)
+        yield "\n" + indent * " " * level + f"</{self._xml_tag}>"
+
+    def write_xml(self, path: Path, indent: int = 2, encoding: str = "utf-8"):
+        """Streams the xml to a file without building the whole document in memory"""
+        with path.open("w", encoding=encoding, errors="xmlcharrefreplace") as f:
+            for chunk in self.iter_xml(indent):
+                f.write(chunk)
+
     def xml(self, indent: int = 2, encoding: str = "utf-8"):
         """Renders the xml template"""
         et = ET.ElementTree(self.to_ET())
@@ -110,28 +161,11 @@ def extmark_extract_vars(snippet_val: str):
 
 
 def transform_extmark_to_pycharm(content: str):
-    def replace(match):
-        g = match.group(2) or match.group(1)
-        return f"${g}$"
-
-    return extmarks_variable_rgx.sub(replace, content)
+    return parse_placeholders(content).pycharm
 
 
-def transform_pycharm_to_extmark(content):
-    count = 0
-
-    def replace(occ: re.Match):
-        nonlocal count
-        gmatch = occ.group(1)
-        if gmatch == "0":
-            return f"${gmatch}"
-        if digits_rgx.match(gmatch):
-            count += 1
-            return f"${gmatch}"
-        count += 1
-        return f"${{{count}:{gmatch}}}"
-
-    return charm_variable_rgx.sub(replace, content)
+def transform_pycharm_to_extmark(content: str):
+    return parse_placeholders(content).extmark
 
 
 class CharmVariable(XmlMixin):
@@ -156,6 +190,30 @@ class TemplateContext(XmlMixin):
     __root__: t.List[TemplateContextOption] = [TemplateContextOption()]
 
 
+@functools.lru_cache(maxsize=None)
+def template_context(names: t.Tuple[str, ...]) -> TemplateContext:
+    """The validated context for a list of context names, shared by all templates
+    using it. 'OTHER' includes all contexts, so it replaces the others"""
+    context = TemplateContext.parse_obj([{"name": n} for n in names])
+    for option in context.__root__:
+        if option.name == "OTHER":
+            context.__root__ = [option]
+            break
+    return context
+
+
+def charm_variables(placeholders: Placeholders) -> t.List[CharmVariable] | None:
+    if not placeholders.variables:
+        return None
+    # The parsed names are valid variables already
+    return [
+        CharmVariable.construct(
+            name=v.name, expression=v.expression, defaultValue=v.default_value
+        )
+        for v in sorted(placeholders.variables)
+    ]
+
+
 class CharmTemplate(XmlMixin):
     _xml_tag = "template"
     name: str
@@ -173,16 +231,9 @@ class CharmTemplate(XmlMixin):
             return value
         if value:
             return value
-        vars_extracted = charm_extract_vars(content)
-        if not vars_extracted:
-            vars_extracted = extmark_extract_vars(content)
-            if vars_extracted:
-                values["value"] = transform_extmark_to_pycharm(content)
-        return (
-            list(CharmVariable(name=n) for n in sorted(set(vars_extracted)))
-            if vars_extracted
-            else None
-        )
+        placeholders = parse_placeholders(content)
+        values["value"] = placeholders.pycharm
+        return charm_variables(placeholders)
 
     @validator("context")
     def validate_context(cls, value):
@@ -197,6 +248,18 @@ class CharmTemplate(XmlMixin):
                 return new_val
         return new_val
 
+    @classmethod
+    def trusted(cls, name: str, value: str, context: TemplateContext):
+        """Builds a template from a snippet body without running pydantic validation.
+        `context` must be validated already, e.g. by `template_context`"""
+        placeholders = parse_placeholders(value)
+        return cls.construct(
+            name=name,
+            value=placeholders.pycharm,
+            variables=charm_variables(placeholders),
+            context=context,
+        )
+
 
 class TemplateSet(XmlMixin):
     """A representation of a Pycharm Live Snippet Template file."""
@@ -1,57 +1,13 @@
 import json
+import tempfile
 import typing as t
-from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from pydantic import BaseModel
 
-
-class MergeStrategy(str, Enum):
-    OVERWRITE = "overwrite"
-    MERGE = "merge"
-
-
-class DefaultLangID(str, Enum):
-    """Most of the VSCode supported language ids"""
-
-    BIBTEXT = "bibtex"
-    CLOZURE = "clozure"
-    C = "c"
-    CPP = "cpp"
-    CSHARP = "csharp"
-    COMPOSE = "dockercompose"
-    CSS = "css"
-    DOCKERFILE = "dockerfile"
-    GO = "go"
-    HANDLEBARS = "handlebars"
-    HTML = "html"
-    JAVA = "java"
-    INI = "init"
-    JS = "javascript"
-    JSX = "javascriptreact"
-    LATEX = "latex"
-    LESS = "less"
-    LUA = "lua"
-    MAKEFILE = "makefile"
-    MARKDOWN = "markdown"
-    PLAINTEXT = "plaintext"
-    POWER_SHELL = "powershell"
-    PYTHON = "python"
-    R = "r"
-    RUBY = "ruby"
-    RUST = "rust"
-    SCSS = "scss"
-    SHELL = "shellscript"
-    SQL = "sql"
-    STYLUS = "stylus"
-    SWIFT = "swift"
-    TYPESCRIPT = "typescript"
-    TYPESCRIPT_REACT = "typescriptreact"
-    TEX = "tex"
-    VUE = "vue"
-    XML = "xml"
-    XSL = "xsl"
-    YAML = "yaml"
+from cs_cli.jsonc import JSONCDecodeError, ObjectWriter, merge_object
+from cs_cli.types import DefaultLangID, MergeStrategy  # noqa: F401
 
 
 class VSCodeSnippet(BaseModel):
@@ -68,9 +24,10 @@ class VSCodeSnippets(BaseModel):
     __root__: t.Dict[str, VSCodeSnippet]
 
     def __add__(self, other):
+        # Both sides are validated, so the result needs no validation
         d = self.__root__.copy()
         d.update(other.__root__)
-        return VSCodeSnippets(__root__=d)
+        return VSCodeSnippets.construct(__root__=d)
 
 
 class VSCodeOut(BaseModel):
@@ -79,13 +36,183 @@ class VSCodeOut(BaseModel):
 
     __root__: t.Dict[str, VSCodeSnippets]
 
-    def write_files(self, path: Path, overwrite: bool = True):
-        for fn, items in self.__root__.items():
-            file = path / fn
-            if not file.is_file() or overwrite:
-                file.write_text(items.json(indent=2))
+    def write_files(self, path: Path, overwrite: bool = True) -> t.List[str]:
+        """Writes one json file per key. When merging, existing files may contain
+        comments; only the snippets that changed are replaced. Files are only
+        rewritten if their content changes. Returns the names of the written files."""
+        return self.write_dirs((path,), overwrite=overwrite)[path]
+
+    def write_dirs(
+        self, paths: t.Sequence[Path], overwrite: bool = True
+    ) -> t.Dict[Path, t.List[str]]:
+        """Like `write_files` for several directories written in parallel. Each file is
+        serialized once and the same bytes are written to every directory."""
+        rendered = {
+            fn: items.json(indent=2).encode() for fn, items in self.__root__.items()
+        }
+        updates = (
+            {}
+            if overwrite
+            else {
+                fn: {k: v.dict() for k, v in items.__root__.items()}
+                for fn, items in self.__root__.items()
+            }
+        )
+
+        def write(path: Path) -> t.List[str]:
+            return [
+                fn
+                for fn, data in rendered.items()
+                if _write_output(path / fn, data, overwrite, lambda fn=fn: updates[fn])
+            ]
+
+        return _map_dirs(write, paths)
+
+
+def _write_output(
+    file: Path,
+    data: bytes,
+    overwrite: bool,
+    updates: t.Callable[[], t.Mapping[str, t.Any]],
+) -> bool:
+    """Writes a snippets file unless its content stays the same. When merging,
+    `updates` are the snippets to set in the existing file"""
+    old = file.read_bytes() if file.is_file() else None
+    if old is not None and not overwrite:
+        try:
+            data = merge_object(old.decode(), updates()).encode()
+        except JSONCDecodeError as err:
+            raise JSONCDecodeError(f"{file}: {err.msg}", err.pos) from None
+    if data == old:
+        return False
+    file.write_bytes(data)
+    return True
+
+
+def _map_dirs(
+    write: t.Callable[[Path], t.List[str]], paths: t.Sequence[Path]
+) -> t.Dict[Path, t.List[str]]:
+    if len(paths) == 1:
+        return {paths[0]: write(paths[0])}
+    with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+        return dict(zip(paths, pool.map(write, paths)))
+
+
+class KeyCollision(t.NamedTuple):
+    """A snippet key of an output file that two groups produce"""
+
+    file: str
+    key: str
+    group: str
+    # The group whose snippet was kept
+    previous_group: str
+
+
+class VSCodeWriter:
+    """Streams snippets into their output files folder by folder, instead of
+    accumulating a `VSCodeOut`. Each output is written to a temporary file as its
+    snippets arrive, folders sharing a lang id append to the same open file, so adding
+    a snippet takes constant time however many folders share the file. Only one
+    output file is in memory at a time when they are written to the snippets
+    directories.
+
+    Only the keys of each file are kept, to find snippets of different groups with the
+    same key, e.g. `a-b` + `c` and `a` + `b-c`. The first one is kept."""
+
+    def __init__(self):
+        self._tmp: tempfile.TemporaryDirectory | None = None
+        self._writers: t.Dict[str, ObjectWriter] = {}
+        self._files: t.Dict[str, t.TextIO] = {}
+        # file -> key -> group
+        self._keys: t.Dict[str, t.Dict[str, str]] = {}
+
+    @property
+    def names(self) -> t.List[str]:
+        """The output files in the order they were started"""
+        return list(self._writers)
+
+    def add(
+        self, fn: str, snippets: VSCodeSnippets, group: str = ""
+    ) -> t.List[KeyCollision]:
+        """Appends the snippets of a group to an output file. Returns the keys that
+        another group already added, these snippets are skipped"""
+        writer = self._writers.get(fn)
+        if writer is None:
+            if self._tmp is None:
+                self._tmp = tempfile.TemporaryDirectory(prefix="cs-cli-")
+            fp = self._files[fn] = open(
+                Path(self._tmp.name) / fn, "w", encoding="utf-8"
+            )
+            writer = self._writers[fn] = ObjectWriter(fp.write)
+            self._keys[fn] = {}
+        keys = self._keys[fn]
+        collisions = []
+        for key, snippet in snippets.__root__.items():
+            previous = keys.get(key)
+            if previous is not None:
+                # The same group twice, e.g. a lang id listed twice, is no collision
+                if previous != group:
+                    collisions.append(KeyCollision(fn, key, group, previous))
                 continue
-            data = json.loads(file.read_text())
-            data.update(items.dict()["__root__"])
-            new_items = items.__class__.parse_obj(data)
-            file.write_text(new_items.json(indent=2))
+            keys[key] = group
+            writer.add(key, snippet.dict())
+        return collisions
+
+    def _finish_files(self):
+        for fn, writer in self._writers.items():
+            fp = self._files.pop(fn, None)
+            if fp is not None:
+                writer.close()
+                fp.close()
+
+    def render(self, fn: str) -> bytes:
+        """The content of an output file, `{}` for one without snippets"""
+        self._finish_files()
+        if fn not in self._writers:
+            return b"{}"
+        return (Path(self._tmp.name) / fn).read_bytes()
+
+    def echo(self, write: t.Callable[[str], t.Any]):
+        """Writes all outputs as the json of a `VSCodeOut`, one file at a time"""
+        out = ObjectWriter(write)
+        for fn in self._writers:
+            out.add_raw(fn, self.render(fn).decode())
+        out.close()
+
+    def write_dirs(
+        self,
+        paths: t.Sequence[Path],
+        names: t.Iterable[str] | None = None,
+        overwrite: bool = True,
+    ) -> t.Dict[Path, t.List[str]]:
+        """Writes the output files, or the given ones, to each directory like
+        `VSCodeOut.write_dirs`. Given names without snippets are written empty"""
+        written: t.Dict[Path, t.List[str]] = {path: [] for path in paths}
+        for fn in self.names if names is None else names:
+            data = self.render(fn)
+            updates: t.List[t.Mapping[str, t.Any]] = []
+
+            def get_updates() -> t.Mapping[str, t.Any]:
+                # Parsed once per file, only if an existing file is merged
+                if not updates:
+                    updates.append(json.loads(data))
+                return updates[0]
+
+            def write(path: Path) -> t.List[str]:
+                return (
+                    [fn]
+                    if _write_output(path / fn, data, overwrite, get_updates)
+                    else []
+                )
+
+            for path, files in _map_dirs(write, paths).items():
+                written[path].extend(files)
+        return written
+
+    def cleanup(self):
+        self._finish_files()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+        self._tmp = None
+        self._writers.clear()
+        self._keys.clear()
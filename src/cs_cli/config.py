@@ -1,9 +1,23 @@
+import fnmatch
+import json
+import re
 import typing as t
+from pathlib import Path
 
 from pydantic import BaseModel, Field
 
-from cs_cli.charm_models import CharmContextNames
+from cs_cli.charm_models import CharmContextNames, TemplateContext, template_context
 from cs_cli.codium_models import DefaultLangID
+from cs_cli.constants import SNIPPET_CONFIG
+from cs_cli.walk import SnippetFolder
+
+
+class FileConfig(BaseModel):
+    """Overrides for the snippet files of a folder matching a pattern"""
+
+    pycharm_contexts: t.Optional[t.Sequence[CharmContextNames]] = Field(
+        None, description="PyCharm contexts of the matching files"
+    )
 
 
 class SnippetsConfig(BaseModel):
@@ -17,6 +31,10 @@ class SnippetsConfig(BaseModel):
         [],
         description="Language identifiers used by VSCode. Will include all the snippets in a json file per identifier",
     )
+    files: t.Dict[str, FileConfig] = Field(
+        {},
+        description="Overrides per file name pattern, e.g. '*.sh'. The last matching pattern wins",
+    )
 
 
 class StrictSnippetsConfig(SnippetsConfig):
@@ -24,3 +42,89 @@ class StrictSnippetsConfig(SnippetsConfig):
         [],
         description="Language identifiers used by VSCode. Will include all the snippets in a json file per identifier",
     )
+
+
+class FolderConfig(t.NamedTuple):
+    """The resolved config of a folder. It is shared by every snippet of the folder
+    and by all folders with the same config files, so it must not be changed"""
+
+    pycharm_contexts: t.Tuple[str, ...]
+    vscode_lang_ids: t.Tuple[str, ...]
+    # Validated once for `pycharm_contexts`
+    template_context: TemplateContext
+    # (compiled file name pattern, config of the matching files)
+    files: t.Tuple[t.Tuple[t.Pattern, "FolderConfig"], ...] = ()
+
+    def for_file(self, name: str) -> "FolderConfig":
+        """The config of a snippet file of the folder, by its name"""
+        config = self
+        for pattern, override in self.files:
+            if pattern.match(name):
+                config = override
+        return config
+
+
+def folder_config(config: SnippetsConfig) -> FolderConfig:
+    """Resolves a validated config, building the template context of each distinct
+    list of contexts once"""
+    contexts = tuple(config.pycharm_contexts)
+    base = FolderConfig(
+        contexts, tuple(config.vscode_lang_ids), template_context(contexts)
+    )
+    files = []
+    for pattern, override in config.files.items():
+        resolved = base
+        if override.pycharm_contexts is not None:
+            contexts = tuple(override.pycharm_contexts)
+            resolved = base._replace(
+                pycharm_contexts=contexts, template_context=template_context(contexts)
+            )
+        files.append((re.compile(fnmatch.translate(pattern)), resolved))
+    return base._replace(files=tuple(files))
+
+
+class ConfigResolver:
+    """Resolves the configs of the folders of one run. Each config file is parsed
+    once. A folder inherits the configs of its parents and the snippets root, the
+    nearest one winning per key; `files` overrides are merged per pattern. Folders
+    with the same config files share one `FolderConfig`"""
+
+    def __init__(self):
+        self._data: t.Dict[Path, t.Dict[str, t.Any]] = {}
+        self._resolved: t.Dict[t.Tuple[Path, ...], FolderConfig] = {}
+
+    def _read(self, file: Path) -> t.Dict[str, t.Any]:
+        data = self._data.get(file)
+        if data is None:
+            try:
+                data = self._data[file] = json.loads(file.read_bytes())
+            except json.JSONDecodeError as err:
+                raise json.JSONDecodeError(
+                    f"{file}: {err.msg}", err.doc, err.pos
+                ) from None
+        return data
+
+    def resolve(self, path: Path | SnippetFolder) -> FolderConfig:
+        """The config of a walked folder, or of the folder of a path, without
+        inheritance"""
+        if isinstance(path, SnippetFolder):
+            chain = path.config_files
+        else:
+            f = (path.parent if path.is_file() else path) / SNIPPET_CONFIG
+            chain = (f,) if f.is_file() else ()
+        config = self._resolved.get(chain)
+        if config is None:
+            config = self._resolved[chain] = self._merge(chain)
+        return config
+
+    def _merge(self, chain: t.Sequence[Path]) -> FolderConfig:
+        merged: t.Dict[str, t.Any] = {}
+        files: t.Dict[str, t.Any] = {}
+        for f in chain:
+            data = self._read(f)
+            merged.update(data)
+            if isinstance(data.get("files"), dict):
+                files.update(data["files"])
+        if files:
+            merged["files"] = files
+        return folder_config(SnippetsConfig.parse_obj(merged))
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+from rich import print
+
+from cs_cli.types import StringOrPath
+
+__all__ = ("print", "success", "on_fail", "file_info")
+
+
+def success(msg):
+    print(f"[bold green]{msg}:party_popper:")
+
+
+def on_fail(msg: StringOrPath):
+    print(f"[red]Abort:[/red] {msg}")
+    sys.exit(1)
+
+
+def file_info(f: Path):
+    print(f"[bold]File: [magenta]{f.name}")
@@ -1,3 +1,6 @@
 DEFAULT_PREFIX = "cs-"
 SNIPPET_CONFIG = ".cs-config.json"
+IGNORE_FILE = ".csignore"
 SNIPPETS_ROOT_ENV = "CODE_SNIPPETS_PATH"
+MANIFEST_FILE = ".cs-manifest"
+CACHE_DIR_ENV = "CS_CLI_CACHE_DIR"
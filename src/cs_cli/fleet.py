@@ -0,0 +1,185 @@
+"""Installs one bundle into many home directories, e.g. on shared build hosts or VDI
+images.
+
+The editor directories of each home are found like for the current user, with the
+paths relative to the home: `~/.config/JetBrains/PyCharm*/templates` and the
+`User/snippets` folders of VSCodium and VSCode. The bundle is verified once and each
+home is written by a thread of a pool. When run as root, written files and created
+folders are given to the owner of the home.
+
+The homes are controlled by their users, so nothing is written through links that
+lead out of a home or into directories the owner of the home does not own. The
+directories are pinned with descriptors after the check and files are replaced by
+renaming fresh temp files, see `install_bundle`. Dropping to the euid of each home
+owner is not an option: the credentials are shared by all threads of the process.
+"""
+
+import glob
+import os
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cs_cli.bundle import Bundle, OwnerT, install_bundle, open_dir
+from cs_cli.charm import charm_config_base
+from cs_cli.charm import config_dir as pycharm_config_dir
+from cs_cli.codium import codium_config_base, vscode2_config_base, vscode_config_base
+from cs_cli.jsonc import JSONCDecodeError
+
+
+class TargetResult(t.NamedTuple):
+    """What was installed for one editor of one home"""
+
+    home: Path
+    editor: str
+    dirs: t.Tuple[Path, ...] = ()
+    written: int = 0
+    unchanged: int = 0
+    # Why nothing was installed
+    skipped: str = ""
+
+
+class _NotFound(Exception):
+    pass
+
+
+def _not_found(msg):
+    raise _NotFound(str(msg))
+
+
+def expand_homes(patterns: t.Iterable[str]) -> t.List[Path]:
+    """Home directories from paths or glob patterns like `/home/*`, in the given
+    order without duplicates"""
+    homes: t.Dict[Path, None] = {}
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        homes.update(dict.fromkeys(Path(p) for p in paths if os.path.isdir(p)))
+    return list(homes)
+
+
+def _in_home(home: Path, path: Path) -> Path:
+    try:
+        return home / path.relative_to(Path.home())
+    except ValueError:
+        # e.g. XDG_CONFIG_HOME outside the home of the current user
+        raise _NotFound(f"{path} is not below {Path.home()}") from None
+
+
+def _checked_dir(home: Path, path: Path, owner: OwnerT | None) -> Path:
+    """The real path of a directory in a home. Raises `_NotFound` if it leaves the
+    home, or is not owned by `owner` (its parent, if it does not exist yet)"""
+    real = Path(os.path.realpath(path))
+    if real != home and home not in real.parents:
+        raise _NotFound(f"{path} leads out of {home}")
+    existing = real if real.exists() else real.parent
+    if owner is not None and existing.stat().st_uid != owner[0]:
+        raise _NotFound(f"{existing} is not owned by the owner of {home}")
+    return real
+
+
+def _ensure_dir(home: Path, path: Path, owner: OwnerT | None, dry_run: bool) -> Path:
+    """`path` checked with `_checked_dir`, created if needed. Returns its real path"""
+    path = _checked_dir(home, path, owner)
+    if not path.is_dir() and not dry_run:
+        parent = open_dir(home, path.parent)
+        try:
+            os.mkdir(path.name, dir_fd=parent)
+            if owner is not None:
+                os.chown(path.name, *owner, dir_fd=parent, follow_symlinks=False)
+        finally:
+            os.close(parent)
+    return path
+
+
+def editor_dirs(
+    home: Path,
+    editor: str,
+    version: str | None = None,
+    owner: OwnerT | None = None,
+    dry_run: bool = False,
+) -> t.Tuple[Path, ...]:
+    """The real snippet directories of an editor in a home. Raises `_NotFound` if
+    the editor is not set up there, or its directories are not safe to write"""
+    home = Path(os.path.realpath(home))
+    if editor == "pycharm":
+        cfg_dir = pycharm_config_dir(
+            on_fail=_not_found,
+            version=version,
+            cfg_dir_base=_in_home(home, charm_config_base),
+        )
+        return (_ensure_dir(home, cfg_dir / "templates", owner, dry_run),)
+    bases = (codium_config_base, vscode_config_base, vscode2_config_base)
+    cfg_dirs = [_in_home(home, base) for base in bases]
+    dirs = tuple(
+        _ensure_dir(home, cfg_dir / "snippets", owner, dry_run)
+        for cfg_dir in cfg_dirs
+        if cfg_dir.is_dir()
+    )
+    if not dirs:
+        raise _NotFound("vscodium/vscode not installed")
+    return dirs
+
+
+def home_owner(home: Path) -> OwnerT | None:
+    """The owner to give written files to, when running as root"""
+    if not hasattr(os, "geteuid") or os.geteuid() != 0:
+        return None
+    st = home.stat()
+    return st.st_uid, st.st_gid
+
+
+def install_home(
+    bundle: Bundle,
+    home: Path,
+    editors: t.Sequence[str],
+    version: str | None = None,
+    overwrite: bool = False,
+    dry_run: bool = False,
+) -> t.List[TargetResult]:
+    """Installs the bundle for each editor of a home. Problems of one editor are
+    reported in its result and do not stop the others"""
+    owner = home_owner(home)
+    results = []
+    for editor in editors:
+        total = sum(f.editor == editor for f in bundle.files)
+        try:
+            dirs = editor_dirs(home, editor, version, owner, dry_run)
+            written = install_bundle(
+                bundle,
+                {editor: dirs},
+                overwrite=overwrite,
+                dry_run=dry_run,
+                verify=False,
+                owner=owner,
+                home=Path(os.path.realpath(home)),
+            )
+        except (_NotFound, OSError, JSONCDecodeError) as err:
+            results.append(TargetResult(home, editor, skipped=str(err)))
+            continue
+        count = sum(len(names) for names in written.values())
+        results.append(
+            TargetResult(home, editor, dirs, count, total * len(dirs) - count)
+        )
+    return results
+
+
+def fleet_install(
+    bundle: Bundle,
+    homes: t.Sequence[Path],
+    editors: t.Sequence[str],
+    version: str | None = None,
+    overwrite: bool = False,
+    dry_run: bool = False,
+    threads: int = 8,
+) -> t.Iterator[TargetResult]:
+    """Installs the bundle into every home with a pool of threads. Results are
+    yielded in the order of the homes"""
+    bundle.verify()
+    with ThreadPoolExecutor(max_workers=max(1, min(threads, len(homes)))) as pool:
+        for results in pool.map(
+            lambda home: install_home(
+                bundle, home, editors, version, overwrite, dry_run
+            ),
+            homes,
+        ):
+            yield from results
@@ -0,0 +1,206 @@
+"""On-disk index of the snippet folders below a snippets root.
+
+Listing the folders and reading their configs needs a stat per entry, which is slow on
+networked home directories. The index stores the folder names and their metadata and
+is validated with a single stat of the root: adding or removing a folder changes the
+root's mtime. Folder metadata is re-read only for folders whose own mtime or config,
+or the config at the root they inherit, changed. Lang ids are resolved like the builds
+do, see `lang_ids`; the configs are read as plain json, as completion must not import
+the pydantic models of `cs_cli.config`. The index lives in the user cache dir, since writing into the root would
+change the very mtime it is keyed on.
+"""
+
+import hashlib
+import json
+import os
+import typing as t
+from pathlib import Path
+
+from cs_cli.constants import CACHE_DIR_ENV, SNIPPET_CONFIG
+from cs_cli.types import DefaultLangID
+
+INDEX_VERSION = 2
+excluded_folders = frozenset(("tests", "__pycache__", "cs_cli"))
+default_lang_ids = frozenset(e.value for e in DefaultLangID)
+
+
+class FolderInfo(t.NamedTuple):
+    name: str
+    mtime_ns: int
+    files: int
+    config_mtime_ns: int
+    # Contents of the folder's config file, without defaults applied
+    config: t.Dict[str, t.Any]
+    lang_ids: t.Tuple[str, ...]
+    # Of the config at the root when the folder was read
+    root_config_mtime_ns: int = 0
+
+
+def cache_dir() -> Path:
+    custom = os.getenv(CACHE_DIR_ENV)
+    if custom:
+        return Path(custom)
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "cs-cli"
+
+
+def root_key(root: Path) -> str:
+    """Names the cache files of a snippets root"""
+    return hashlib.blake2b(
+        os.fsencode(os.path.abspath(root)), digest_size=8
+    ).hexdigest()
+
+
+def lang_ids(name: str, config: t.Mapping[str, t.Any]) -> t.Tuple[str, ...]:
+    """The VSCode language ids of a group, by its resolved config or by name. A nested
+    group takes the name of the nearest parent that is a lang id"""
+    ids = tuple(config.get("vscode_lang_ids") or ())
+    if ids:
+        return ids
+    for part in reversed(name.split("/")):
+        if part in default_lang_ids:
+            return (part,)
+    return ()
+
+
+def _read_config(path: Path) -> t.Dict[str, t.Any]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        # Reported with a proper message when the folder is built
+        return {}
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def read_folder(
+    path: Path,
+    inherited: t.Mapping[str, t.Any] | None = None,
+    root_config_mtime_ns: int = 0,
+) -> FolderInfo:
+    """`inherited` is the config of the root, which the folder's own overrides per
+    key like in the builds"""
+    files = 0
+    config_mtime_ns = 0
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name == SNIPPET_CONFIG:
+                config_mtime_ns = entry.stat().st_mtime_ns
+            elif not entry.name.startswith(".") and entry.is_file():
+                files += 1
+    config = _read_config(path / SNIPPET_CONFIG) if config_mtime_ns else {}
+    return FolderInfo(
+        name=path.name,
+        mtime_ns=_mtime_ns(path),
+        files=files,
+        config_mtime_ns=config_mtime_ns,
+        config=config,
+        lang_ids=lang_ids(path.name, {**(inherited or {}), **config}),
+        root_config_mtime_ns=root_config_mtime_ns,
+    )
+
+
+class FolderIndex:
+    """The snippet folders of a root and their metadata, cached across runs"""
+
+    def __init__(self, root: Path, path: Path | None = None):
+        self.root = root
+        self.path = path or self.default_path(root)
+        self._mtime_ns = 0
+        self._names: t.Tuple[str, ...] = ()
+        self._folders: t.Dict[str, FolderInfo] = {}
+        self._dirty = False
+        # (mtime, content) of the config at the root, read when first needed
+        self._root_config_mtime_ns: int | None = None
+        self._root_config: t.Dict[str, t.Any] | None = None
+        self._load()
+
+    @staticmethod
+    def default_path(root: Path) -> Path:
+        return cache_dir() / f"folders-{root_key(root)}.json"
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self._mtime_ns = data["mtime_ns"]
+        self._names = tuple(data["names"])
+        self._folders = {
+            name: FolderInfo(**{**info, "lang_ids": tuple(info["lang_ids"])})
+            for name, info in data["folders"].items()
+        }
+
+    def names(self) -> t.Tuple[str, ...]:
+        """The sorted folder names, listing the root only if its mtime changed"""
+        mtime_ns = _mtime_ns(self.root)
+        if mtime_ns != self._mtime_ns or not mtime_ns:
+            self._names = tuple(sorted(self._scan_root()))
+            self._mtime_ns = mtime_ns
+            self._folders = {k: v for k, v in self._folders.items() if k in self._names}
+            self._dirty = True
+        return self._names
+
+    def _scan_root(self) -> t.Iterator[str]:
+        with os.scandir(self.root) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith(".") or name in excluded_folders:
+                    continue
+                if entry.is_dir():
+                    yield name
+
+    def folders(self) -> t.Tuple[Path, ...]:
+        return tuple(self.root / name for name in self.names())
+
+    def info(self, name: str) -> FolderInfo:
+        """Metadata of a folder, re-read if the folder, its config or the config at
+        the root changed"""
+        path = self.root / name
+        cached = self._folders.get(name)
+        if self._root_config_mtime_ns is None:
+            self._root_config_mtime_ns = _mtime_ns(self.root / SNIPPET_CONFIG)
+        if (
+            cached is not None
+            and cached.mtime_ns == _mtime_ns(path)
+            and cached.config_mtime_ns == _mtime_ns(path / SNIPPET_CONFIG)
+            and cached.root_config_mtime_ns == self._root_config_mtime_ns
+        ):
+            return cached
+        if self._root_config is None:
+            self._root_config = (
+                _read_config(self.root / SNIPPET_CONFIG)
+                if self._root_config_mtime_ns
+                else {}
+            )
+        info = read_folder(path, self._root_config, self._root_config_mtime_ns)
+        self._folders[name] = info
+        self._dirty = True
+        return info
+
+    def save(self):
+        if not self._dirty:
+            return
+        data = {
+            "version": INDEX_VERSION,
+            "root": os.path.abspath(self.root),
+            "mtime_ns": self._mtime_ns,
+            "names": self._names,
+            "folders": {k: v._asdict() for k, v in self._folders.items()},
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data))
+            os.replace(tmp, self.path)
+        except OSError:
+            # The index is only a cache
+            return
+        self._dirty = False
@@ -0,0 +1,227 @@
+"""Converts existing PyCharm Live Templates (xml) and VSCode snippets (json) back
+into snippet folders with `.cs-config.json` files, as consumed by `generate`.
+
+Both readers are streaming: the xml is read with `iterparse` and each template is
+released after use, the json is read one snippet at a time. The writer writes each
+snippet as soon as it is read and only keeps the config of each folder in memory."""
+
+import json
+import re
+import typing as t
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from cs_cli.charm_models import CharmContextNames
+from cs_cli.constants import DEFAULT_PREFIX, SNIPPET_CONFIG
+from cs_cli.jsonc import iter_members
+from cs_cli.types import DefaultLangID
+
+charm_context_names = frozenset(t.get_args(CharmContextNames))
+default_lang_ids = frozenset(e.value for e in DefaultLangID)
+# Descriptions written by `cs-cli vscode`
+_description_rgx = re.compile(r"from (.+)/([^/]+)")
+_unsafe_chars_rgx = re.compile(r"[^\w.\-+@]+")
+
+
+class ImportedSnippet(t.NamedTuple):
+    """A snippet read from an editor. Empty contexts or lang ids are unknown"""
+
+    group: str
+    name: str
+    body: str
+    pycharm_contexts: t.Tuple[str, ...] = ()
+    vscode_lang_ids: t.Tuple[str, ...] = ()
+
+
+class ImportStats(t.NamedTuple):
+    written: int
+    unchanged: int
+    # Existing files with other content, kept without --overwrite
+    conflicts: t.Tuple[Path, ...]
+    duplicates: int
+    configs: t.Tuple[Path, ...]
+
+
+def safe_name(name: str) -> str:
+    """A file or folder name for a snippet or group name. Leading dots are removed,
+    since hidden files are skipped when building"""
+    return _unsafe_chars_rgx.sub("_", name).lstrip(".") or "_"
+
+
+def group_folder(group: str) -> str:
+    """The folder of a group, nested groups like `python/django` become nested folders"""
+    return "/".join(safe_name(part) for part in group.split("/") if part) or "_"
+
+
+def iter_pycharm_templates(
+    path: Path,
+    group_prefix: str = DEFAULT_PREFIX,
+    on_unknown_context: t.Callable[[str], None] | None = None,
+) -> t.Iterator[ImportedSnippet]:
+    """Yields the templates of a PyCharm template set file one by one"""
+    group = path.stem
+    root = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+                group = elem.get("group") or group
+                if group_prefix and group.startswith(group_prefix):
+                    group = group[len(group_prefix) :] or group
+            continue
+        if elem.tag != "template":
+            continue
+        contexts = []
+        for option in elem.iterfind("context/option"):
+            if option.get("value") != "true":
+                continue
+            name = option.get("name", "")
+            if name in charm_context_names:
+                contexts.append(name)
+            elif on_unknown_context is not None:
+                on_unknown_context(name)
+        yield ImportedSnippet(
+            group=group,
+            name=elem.get("name", ""),
+            body=elem.get("value", ""),
+            pycharm_contexts=tuple(contexts) or ("OTHER",),
+        )
+        # Releases the template and everything read so far
+        root.clear()
+
+
+def _lang_ids(path: Path, scope: t.Any) -> t.Tuple[str, ...]:
+    if isinstance(scope, str) and scope.strip():
+        return tuple(s.strip() for s in scope.split(",") if s.strip())
+    if path.suffix == ".json":
+        return (path.stem,)
+    return ()
+
+
+def iter_vscode_snippets(path: Path) -> t.Iterator[ImportedSnippet]:
+    """Yields the snippets of a VSCode snippets file one by one. Snippets generated by
+    `cs-cli vscode` get their group and name back from the description, others use
+    the file name as group"""
+    with path.open(encoding="utf-8") as fp:
+        for key, value in iter_members(fp):
+            if not isinstance(value, dict) or "body" not in value:
+                continue
+            group, name = path.stem, key
+            prefix = value.get("prefix")
+            if isinstance(prefix, list) and prefix:
+                name = prefix[0]
+            elif isinstance(prefix, str) and prefix:
+                name = prefix
+            description = value.get("description")
+            m = _description_rgx.fullmatch(description or "")
+            if m:
+                group, name = m.groups()
+            body = value["body"]
+            yield ImportedSnippet(
+                group=group,
+                name=name,
+                body="\n".join(body) if isinstance(body, list) else str(body),
+                vscode_lang_ids=_lang_ids(path, value.get("scope")),
+            )
+
+
+class _FolderConfig(t.NamedTuple):
+    pycharm_contexts: t.Dict[str, None]
+    vscode_lang_ids: t.Dict[str, None]
+
+
+class SnippetWriter:
+    """Writes imported snippets into `<root>/<group>/<name>` and accumulates the
+    contexts and lang ids of each group for its `.cs-config.json`"""
+
+    def __init__(self, root: Path, overwrite: bool = False, dry_run: bool = False):
+        self.root = root
+        self.overwrite = overwrite
+        self.dry_run = dry_run
+        self.configs: t.Dict[str, _FolderConfig] = {}
+        self.seen: t.Set[t.Tuple[str, str]] = set()
+        self.written = 0
+        self.unchanged = 0
+        self.duplicates = 0
+        self.conflicts: t.List[Path] = []
+
+    def add(self, snippet: ImportedSnippet) -> Path | None:
+        """Writes the snippet file. Returns the path if it was (or would be) written"""
+        folder = group_folder(snippet.group)
+        config = self.configs.get(folder)
+        if config is None:
+            config = self.configs[folder] = _FolderConfig({}, {})
+        config.pycharm_contexts.update(dict.fromkeys(snippet.pycharm_contexts))
+        config.vscode_lang_ids.update(dict.fromkeys(snippet.vscode_lang_ids))
+
+        key = (folder, safe_name(snippet.name))
+        if key in self.seen:
+            # e.g. the same snippet in several lang id files
+            self.duplicates += 1
+            return None
+        self.seen.add(key)
+        path = self.root / folder / key[1]
+        content = snippet.body + "\n"
+        if path.is_file():
+            old = path.read_text()
+            if old == content:
+                self.unchanged += 1
+                return None
+            if not self.overwrite:
+                self.conflicts.append(path)
+                return None
+        self.written += 1
+        if not self.dry_run:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        return path
+
+    def folder_config(self, folder: str) -> t.Dict[str, t.List[str]]:
+        """The config entries that differ from what `generate` assumes by default"""
+        config = self.configs[folder]
+        data = {}
+        contexts = list(config.pycharm_contexts)
+        if contexts and "OTHER" not in contexts:
+            data["pycharm_contexts"] = contexts
+        lang_ids = list(config.vscode_lang_ids)
+        leaf = folder.rsplit("/", 1)[-1]
+        if lang_ids and not (lang_ids == [leaf] and leaf in default_lang_ids):
+            data["vscode_lang_ids"] = lang_ids
+        return data
+
+    def finish(self) -> ImportStats:
+        """Writes the `.cs-config.json` files, merged with existing ones"""
+        configs = []
+        for folder in self.configs:
+            data = self.folder_config(folder)
+            if not data:
+                continue
+            path = self.root / folder / SNIPPET_CONFIG
+            merged = json.loads(path.read_text()) if path.is_file() else {}
+            for key, values in data.items():
+                merged[key] = list(dict.fromkeys([*merged.get(key, ()), *values]))
+            content = json.dumps(merged, indent=2) + "\n"
+            if path.is_file() and path.read_text() == content:
+                continue
+            configs.append(path)
+            if not self.dry_run:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(content)
+        return ImportStats(
+            written=self.written,
+            unchanged=self.unchanged,
+            conflicts=tuple(self.conflicts),
+            duplicates=self.duplicates,
+            configs=tuple(configs),
+        )
+
+
+def source_files(paths: t.Iterable[Path], patterns: t.Sequence[str]) -> t.List[Path]:
+    """Expands directories to the files matching one of the glob patterns"""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(f for p in patterns for f in path.glob(p)))
+        else:
+            files.append(path)
+    return files
@@ -0,0 +1,349 @@
+"""Parsing and minimal-edit merging of JSON with comments (JSONC) as written by VSCode."""
+
+import json
+import re
+import typing as t
+
+_token_rgx = re.compile(
+    r"""
+    (?P<ws>\s+)
+    |(?P<comment>//[^\n]*|/\*.*?\*/)
+    |(?P<string>"(?:[^"\\\n]|\\.)*")
+    |(?P<punct>[{}\[\]:,])
+    |(?P<literal>[-+\w.]+)
+    |(?P<error>.)
+    """,
+    re.S | re.X,
+)
+_line_rest_rgx = re.compile(r"[ \t]*(?://[^\n]*)?")
+
+
+class JSONCDecodeError(ValueError):
+    def __init__(self, msg: str, pos: int):
+        super().__init__(f"{msg} at position {pos}")
+        self.msg = msg
+        self.pos = pos
+
+
+class Token(t.NamedTuple):
+    kind: str
+    start: int
+    end: int
+
+
+class Member(t.NamedTuple):
+    """A key of the top-level object and the span of its value"""
+
+    key: str
+    value_start: int
+    value_end: int
+
+
+def tokenize(text: str) -> t.List[Token]:
+    """Splits the text into tokens, dropping whitespace and comments"""
+    tokens = []
+    for m in _token_rgx.finditer(text):
+        kind = m.lastgroup
+        if kind == "ws" or kind == "comment":
+            continue
+        if kind == "error":
+            raise JSONCDecodeError(f"Unexpected character {m.group()!r}", m.start())
+        tokens.append(Token(kind, m.start(), m.end()))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def _next(self) -> Token:
+        if self.pos >= len(self.tokens):
+            raise JSONCDecodeError("Unexpected end of document", len(self.text))
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _peek(self) -> str:
+        if self.pos >= len(self.tokens):
+            return ""
+        token = self.tokens[self.pos]
+        return self.text[token.start : token.end]
+
+    def _expect(self, char: str) -> Token:
+        token = self._next()
+        if self.text[token.start : token.end] != char:
+            raise JSONCDecodeError(f"Expected {char!r}", token.start)
+        return token
+
+    def value(self) -> t.Any:
+        token = self._next()
+        raw = self.text[token.start : token.end]
+        if token.kind == "string":
+            return json.loads(raw)
+        if token.kind == "literal":
+            try:
+                return json.loads(raw)
+            except ValueError:
+                raise JSONCDecodeError(f"Invalid literal {raw!r}", token.start)
+        if raw == "{":
+            return dict((m[0], m[1]) for m in self.members())
+        if raw == "[":
+            return self.array()
+        raise JSONCDecodeError(f"Unexpected {raw!r}", token.start)
+
+    def members(self) -> t.Iterator[t.Tuple[str, t.Any, int, int]]:
+        """Yields key, value and value span of an object after the opening brace"""
+        while True:
+            if self._peek() == "}":
+                self._next()
+                return
+            key_token = self._next()
+            if key_token.kind != "string":
+                raise JSONCDecodeError("Expected a string key", key_token.start)
+            key = json.loads(self.text[key_token.start : key_token.end])
+            self._expect(":")
+            start = self.tokens[self.pos].start if self.pos < len(self.tokens) else 0
+            value = self.value()
+            yield key, value, start, self.tokens[self.pos - 1].end
+            if self._peek() == ",":
+                self._next()
+            elif self._peek() != "}":
+                raise JSONCDecodeError("Expected ',' or '}'", self._next().start)
+
+    def array(self) -> t.List[t.Any]:
+        items = []
+        while True:
+            if self._peek() == "]":
+                self._next()
+                return items
+            items.append(self.value())
+            if self._peek() == ",":
+                self._next()
+            elif self._peek() != "]":
+                raise JSONCDecodeError("Expected ',' or ']'", self._next().start)
+
+    def end(self):
+        if self.pos != len(self.tokens):
+            raise JSONCDecodeError("Extra data", self.tokens[self.pos].start)
+
+
+def loads(text: str) -> t.Any:
+    """Parses JSON allowing comments and trailing commas"""
+    parser = _Parser(text)
+    value = parser.value()
+    parser.end()
+    return value
+
+
+def parse_object(text: str) -> t.Tuple[t.Dict[str, t.Any], t.List[Member], int]:
+    """Parses a top-level object. Returns its data, the members with their value spans
+    and the position of the closing brace"""
+    parser = _Parser(text)
+    parser._expect("{")
+    data = {}
+    members = []
+    for key, value, start, end in parser.members():
+        data[key] = value
+        members.append(Member(key, start, end))
+    close = parser.tokens[parser.pos - 1].start
+    parser.end()
+    return data, members, close
+
+
+def dumps_member(key: str, value: t.Any, indent: str) -> str:
+    rendered = json.dumps(value, indent=indent).replace("\n", "\n" + indent)
+    return f"{json.dumps(key)}: {rendered}"
+
+
+class ObjectWriter:
+    """Writes a JSON object member by member, formatted like `json.dumps(obj,
+    indent=indent)`, so members do not have to be kept once they are written"""
+
+    def __init__(self, write: t.Callable[[str], t.Any], indent: str = "  "):
+        self.write = write
+        self.indent = indent
+        self.count = 0
+
+    def add(self, key: str, value: t.Any):
+        self.add_raw(key, json.dumps(value, indent=self.indent))
+
+    def add_raw(self, key: str, rendered: str):
+        """Adds a value that is already serialized with the same indent"""
+        indent = self.indent
+        sep = ",\n" if self.count else "{\n"
+        rendered = rendered.replace("\n", "\n" + indent)
+        self.write(f"{sep}{indent}{json.dumps(key)}: {rendered}")
+        self.count += 1
+
+    def close(self):
+        self.write("\n}" if self.count else "{}")
+
+
+def merge_object(text: str, updates: t.Mapping[str, t.Any], indent: str = "  ") -> str:
+    """Sets the keys of a top-level JSONC object to the given values. Only the values
+    that change are replaced. New keys are appended after the last member. Comments,
+    key order and untouched entries are kept as they are."""
+    if not text.strip():
+        return json.dumps(dict(updates), indent=indent)
+    data, members, close = parse_object(text)
+    if members:
+        indent = _member_indent(text, members[-1]) or indent
+    spans = {m.key: m for m in members}
+    edits: t.List[t.Tuple[int, int, str]] = []
+    new = []
+    for key, value in updates.items():
+        if key not in data:
+            new.append(dumps_member(key, value, indent))
+        elif data[key] != value:
+            m = spans[key]
+            rendered = json.dumps(value, indent=indent).replace("\n", "\n" + indent)
+            edits.append((m.value_start, m.value_end, rendered))
+    if new:
+        entries = ",".join(f"\n{indent}{entry}" for entry in new)
+        if not members:
+            edits.append((close, close, entries + "\n"))
+        else:
+            edits.extend(_append_edits(text, members[-1], entries))
+    parts = []
+    pos = 0
+    for start, end, replacement in sorted(edits, key=lambda e: e[0]):
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _append_edits(text: str, last: Member, entries: str):
+    """Inserts entries after the last member, keeping its line comment on its line"""
+    following = _next_token(text, last.value_end)
+    if following is not None and following.group() == ",":
+        pos, comma = following.end(), ""
+    else:
+        pos, comma = last.value_end, ","
+    line_end = _line_rest_rgx.match(text, pos).end()
+    if line_end == pos or line_end >= len(text) or text[line_end] != "\n":
+        return [(pos, pos, comma + entries)]
+    return [(pos, pos, comma), (line_end, line_end, entries)]
+
+
+def _member_indent(text: str, member: Member) -> str:
+    line_start = text.rfind("\n", 0, member.value_start) + 1
+    line = text[line_start : member.value_start]
+    return line[: len(line) - len(line.lstrip())]
+
+
+def _next_token(text: str, pos: int) -> t.Optional[re.Match]:
+    for token in _token_rgx.finditer(text, pos):
+        if token.lastgroup not in ("ws", "comment"):
+            return token
+    return None
+
+
+_skip_rgx = re.compile(r"(?:\s+|//[^\n]*\n|/\*.*?\*/)*", re.S)
+_decoder = json.JSONDecoder()
+
+
+class _Stream:
+    """A text buffer over a file that is extended on demand and trimmed after each
+    member, so only about one member is held in memory"""
+
+    def __init__(self, fp: t.TextIO, chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        # Offset of buf[0] in the document, for error positions
+        self.offset = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        """Reads the next chunk. Chunks grow with the buffer, so that re-parsing a
+        large value after each chunk stays linear"""
+        if self.eof:
+            return False
+        chunk = self.fp.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            # Terminates a line comment on the last line
+            self.buf += "\n"
+            return False
+        self.buf += chunk
+        return True
+
+    def trim(self):
+        self.offset += self.pos
+        self.buf = self.buf[self.pos :]
+        self.pos = 0
+
+    def skip(self) -> str:
+        """Skips whitespace and comments and returns the next character, '' at the end"""
+        while True:
+            end = _skip_rgx.match(self.buf, self.pos).end()
+            # A "/" left over starts a comment that continues in the next chunk
+            if end < len(self.buf) and self.buf[end] != "/":
+                self.pos = end
+                return self.buf[end]
+            if self.eof:
+                self.pos = end
+                return self.buf[end : end + 1]
+            self.more()
+
+    def error(self, msg: str) -> JSONCDecodeError:
+        return JSONCDecodeError(msg, self.offset + self.pos)
+
+    def decode(self) -> t.Any:
+        """Decodes the value at the position, reading more until it is complete"""
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                try:
+                    # Comments or trailing commas inside the value
+                    parser = _Parser(self.buf[self.pos :])
+                    value = parser.value()
+                    end = self.pos + parser.tokens[parser.pos - 1].end
+                except JSONCDecodeError as err:
+                    if self.more():
+                        continue
+                    raise JSONCDecodeError(err.msg, self.offset + self.pos + err.pos)
+            if end == len(self.buf) and self.more():
+                # A number might continue in the next chunk
+                continue
+            self.pos = end
+            return value
+
+
+def iter_members(
+    fp: t.TextIO, chunk_size: int = 64 * 1024
+) -> t.Iterator[t.Tuple[str, t.Any]]:
+    """Yields the keys and values of a top-level JSONC object one by one, reading the
+    file in chunks"""
+    stream = _Stream(fp, chunk_size)
+    if stream.skip() != "{":
+        raise stream.error("Expected '{'")
+    stream.pos += 1
+    while True:
+        char = stream.skip()
+        if char == "}":
+            stream.pos += 1
+            break
+        if char != '"':
+            raise stream.error("Expected a string key" if char else "Unexpected end")
+        key = stream.decode()
+        if stream.skip() != ":":
+            raise stream.error("Expected ':'")
+        stream.pos += 1
+        if not stream.skip():
+            raise stream.error("Unexpected end of document")
+        yield key, stream.decode()
+        char = stream.skip()
+        if char == ",":
+            stream.pos += 1
+        elif char != "}":
+            raise stream.error("Expected ',' or '}'")
+        stream.trim()
+    if stream.skip():
+        raise stream.error("Extra data")
@@ -1,165 +1,156 @@
+import contextlib
 import functools
 import re
 import sys
 import typing as t
-from functools import lru_cache, partial
 from os import getenv
 from pathlib import Path
 
 import typer
-from pydantic import BaseModel
-from rich import print
 
 from cs_cli.charm import config_dir as pycharm_config_dir
-from cs_cli.charm_models import (
-    CharmTemplate,
-    TemplateContext,
-    TemplateSet,
-    transform_pycharm_to_extmark,
-)
 from cs_cli.codium import config_dirs as codium_config_dir
-from cs_cli.codium_models import (
-    DefaultLangID,
-    MergeStrategy,
-    VSCodeOut,
-    VSCodeSnippet,
-    VSCodeSnippets,
-)
-from cs_cli.config import SnippetsConfig, StrictSnippetsConfig
-from cs_cli.constants import DEFAULT_PREFIX, SNIPPET_CONFIG, SNIPPETS_ROOT_ENV
-from cs_cli.py import remove_python_imports
-from cs_cli.types import StringOrPath, TransformT
-from cs_cli.utils import file_ending, snippet_folders, yield_lines
+from cs_cli.constants import DEFAULT_PREFIX, SNIPPETS_ROOT_ENV
+from cs_cli.folder_index import FolderIndex
+from cs_cli.types import Editor, MergeStrategy
+
+# Only light modules are imported at module level, so that `--help` and shell
+# completion stay fast. Command bodies import the pipeline (pydantic, rich, ...).
 
 app = typer.Typer()
 
 
-@functools.cache
-def snippets_root():
-    return Path(getenv(SNIPPETS_ROOT_ENV, "."))
+def __getattr__(name: str):
+    """Keeps the pipeline importable from here without importing it eagerly"""
+    if name.startswith("__"):
+        # e.g. the import system probing for __path__
+        raise AttributeError(name)
+    from cs_cli import pipeline
+
+    try:
+        return getattr(pipeline, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
 
-def success(msg):
-    print(f"[bold green]{msg}:party_popper:")
+def snippets_root():
+    return Path(getenv(SNIPPETS_ROOT_ENV, "."))
 
 
-def on_fail(msg: StringOrPath):
-    print(f"[red]Abort:[/red] {msg}")
-    sys.exit(1)
+def folder_index() -> FolderIndex:
+    return _folder_index(snippets_root())
 
 
-def file_info(f: Path):
-    print(f"[bold]File: [magenta]{f.name}")
+@functools.cache
+def _folder_index(root: Path) -> FolderIndex:
+    return FolderIndex(root)
 
 
 def auto_complete_snippets(ctx: typer.Context, search: str):
     """Autocompletion function for shell completion"""
-    selected = ctx.params.get("folders") or []
-    for f in snippet_folders(snippets_root()):
-        name = f.name
-        if search in name and name not in selected:
-            yield name
+    selected = set()
+    source = ctx.get_parameter_source("folders")
+    if source is not None and source.name != "DEFAULT":
+        # Without folders given, the parameter holds every folder
+        selected = {Path(f).name for f in ctx.params.get("folders") or ()}
+    index = folder_index()
+    matches = [n for n in index.names() if search in n and n not in selected]
+    completions = []
+    for name in matches:
+        info = index.info(name)
+        langs = f" ({', '.join(info.lang_ids)})" if info.lang_ids else ""
+        completions.append((name, f"{info.files} snippets{langs}"))
+    index.save()
+    return completions
 
 
 def get_snippets_folders():
-    return tuple(snippet_folders(snippets_root()))
-
-
-@lru_cache(typed=True)
-def snippets_config(path: Path) -> SnippetsConfig:
-    f = (path.parent if path.is_file() else path) / SNIPPET_CONFIG
-    if f.is_file():
-        return SnippetsConfig.parse_file(f)
-    return SnippetsConfig()
+    index = folder_index()
+    folders = index.folders()
+    index.save()
+    return folders
 
 
-def schema_info(model: t.Type[BaseModel], **kwargs):
+def schema_info(model, **kwargs):
     typer.echo(model.schema_json(indent=2, **kwargs))
     sys.exit()
 
 
-def remove_imports(line: str, rm_imports: bool = False) -> str | None:
-    return line if not rm_imports else remove_python_imports(line)
+folders_opt = typer.Option(
+    get_snippets_folders,
+    "--folder",
+    "-f",
+    autocompletion=auto_complete_snippets,
+    help="List of snippets folders that you want to parse",
+)
+version_opt = typer.Option(None, help="Example:: CE2022.1, 2023.2")
+rm_imports_opt = typer.Option(False, help="Remove python import statements in snippets")
+group_prefix_opt = typer.Option(
+    DEFAULT_PREFIX, help="Group prefix for pycharm Live Template group"
+)
+exclude_opt = typer.Option(
+    ["*.json"],
+    "--exclude",
+    "-e",
+    help="Glob (or regex with a 're:' prefix) of files or folders to skip, "
+    "like a line of a .csignore file. Can be repeated",
+)
+include_opt = typer.Option(
+    [],
+    "--include",
+    "-i",
+    help="Only files matching one of these globs (or 're:' regexes) are used",
+)
+exclude_rgx_opt = typer.Option(
+    None, help="A regex expression to exclude file name in snippets folders"
+)
 
 
-def handle_file(
-    f: Path,
-    line_transforms: t.Dict[str | None, t.Sequence[TransformT]],
-) -> tuple[str, str, Path]:
-    fn = f.name
-    ending = file_ending(fn)
-    content = f.read_text()
-    transformers = line_transforms[ending]
+def make_matcher(
+    exclude: t.Sequence[str], include: t.Sequence[str], exclude_rgx: str | None
+):
+    """The file matcher shared by the build commands"""
+    from cs_cli.matcher import REGEX_PREFIX, Matcher
 
-    file_info(f)
-    lines = yield_lines(content, transformers)
-    snippet_name = re.sub(rf"\.{ending}", "", fn)
-    content = re.sub(r"^\n{2,}", "", "\n".join(lines))
-    return snippet_name, content, f
+    exclude = list(exclude)
+    if exclude_rgx:
+        exclude.append(REGEX_PREFIX + exclude_rgx)
+    try:
+        return Matcher(exclude, include)
+    except re.error as err:
+        raise typer.BadParameter(f"Invalid pattern: {err}") from None
 
 
-def ensure_templates_dir(
-    app_dir: Path, template_folder_name: str, out_dir: Path | None = None
-):
-    templates_dir = out_dir if out_dir else app_dir / template_folder_name
-    if not templates_dir.is_dir():
-        if not out_dir:
-            print(f"{templates_dir.resolve()} does not exist")
-            typer.Exit(1)
-        templates_dir.mkdir()
-    print(f"Snippets path: {templates_dir}")
-    return templates_dir
-
-
-def generate(
-    rm_imports: bool,
-    folders: t.Sequence[Path],
-    templates_dir: Path,
-    file_to_model: t.Callable[[str, str, Path], t.Any],
-    models_callback: t.Callable,
-    write_callback: t.Callable[[Path, t.Any, str], None] | None = None,
-    get_fn: t.Callable[[Path], str] | None = None,
-    exclude_rgx: str = "",
-    dry_run: bool = False,
-    print_on_dry_run: bool = True,
-):
-    transform_by_ending = {
-        "py": (partial(remove_imports, rm_imports=rm_imports),),
-        None: (lambda x: x,),
-        "sh": (lambda x: x,),
-    }
-
-    def _file_to_model(folder: Path):
-        for file in folder.iterdir():
-            if file.is_dir():
-                continue
-            fn = file.name
-            if exclude_rgx and re.search(re.escape(exclude_rgx), fn):
-                continue
-            if fn.startswith("."):
-                continue
-            yield file_to_model(*handle_file(file, line_transforms=transform_by_ending))
-
-    for folder in folders:
-        fn = folder.name
-        print(f"---- Group name: {fn}")
-        models = (te for te in _file_to_model(folder) if te)
-        final_model, string_repr = models_callback(models, folder)
-
-        if dry_run:
-            if print_on_dry_run:
-                print(string_repr)
-            continue
-        if get_fn and write_callback:
-            target = templates_dir / get_fn(folder)
-            write_callback(target, final_model, string_repr)
-
-
-def charm_handle_file(snippet_name: str, content: str, file: Path):
-    sn_cfg = snippets_config(file)
-    ctx_opts: t.Sequence[str] = sn_cfg.pycharm_contexts
-    ctx = TemplateContext.parse_obj([{"name": n} for n in ctx_opts])
-    return CharmTemplate(name=snippet_name, value=content, context=ctx)
+strategy_opt = typer.Option(
+    MergeStrategy.MERGE,
+    help="Overwrite or merge existing json snippets. Comments in merged files are kept",
+)
+jobs_opt = typer.Option(
+    None,
+    "--jobs",
+    "-j",
+    min=1,
+    help="Number of worker processes. Defaults to the number of cores",
+)
+read_ahead_opt = typer.Option(
+    0,
+    "--read-ahead",
+    min=0,
+    envvar="CS_CLI_READ_AHEAD",
+    help="Read up to this many snippet files concurrently ahead of the build. "
+    "Speeds up snippets on network filesystems (NFS, SSHFS)",
+)
+force_opt = typer.Option(
+    False, "--force", help="Rebuild all folders, ignoring the build manifest"
+)
+profile_opt = typer.Option(
+    None,
+    "--profile",
+    help="Time each stage and write the report as json to this file",
+)
+profile_top_opt = typer.Option(
+    10, min=0, help="Number of slowest files listed in the profile report"
+)
 
 
 @app.command()
@@ -169,164 +160,586 @@ def config_schema(
     ),
 ):
     """Prints the jsonschema for `cs-confg.json`."""
+    from cs_cli.config import SnippetsConfig, StrictSnippetsConfig
+
     cls = StrictSnippetsConfig if strict else SnippetsConfig
     typer.echo(cls.schema_json(indent=2))
 
 
 @app.command()
 def pycharm(
-    folders: t.List[Path] = typer.Option(
-        get_snippets_folders,
-        "--folder",
-        "-f",
-        autocompletion=auto_complete_snippets,
-        help="List of snippets folders that you want to parse",
-    ),
+    folders: t.List[Path] = folders_opt,
     out_dir: t.Optional[Path] = typer.Option(
         None,
         help="Custom output directory. Defaults to the programs snippets directory",
     ),
-    version: t.Optional[str] = typer.Option(None, help="Example:: CE2022.1, 2023.2"),
-    rm_imports: bool = typer.Option(
-        False, help="Remove python import statements in snippets"
-    ),
-    group_prefix: str = typer.Option(
-        DEFAULT_PREFIX, help="Group prefix for pycharm Live Template group"
-    ),
-    exclude_rgx: str = typer.Option(
-        "*.json", help="A regex expression to exclude file name in snippets folders"
-    ),
+    version: t.Optional[str] = version_opt,
+    rm_imports: bool = rm_imports_opt,
+    group_prefix: str = group_prefix_opt,
+    exclude: t.List[str] = exclude_opt,
+    include: t.List[str] = include_opt,
+    exclude_rgx: t.Optional[str] = exclude_rgx_opt,
     dry_run: bool = False,
+    jobs: t.Optional[int] = jobs_opt,
+    read_ahead: int = read_ahead_opt,
+    force: bool = force_opt,
+    profile: t.Optional[Path] = profile_opt,
+    profile_top: int = profile_top_opt,
     schema_json: bool = typer.Option(
         False, help="Only show the dataschema for the pycharm config"
     ),
 ):
     """Generates Live Templates for pycharm using a defined data schema."""
+    from cs_cli.charm_models import TemplateSet
+    from cs_cli.console import on_fail
+    from cs_cli.pipeline import ensure_templates_dir, pycharm_target, run_targets
 
     if schema_json:
         schema_info(TemplateSet)
 
     cfg_dir = out_dir or pycharm_config_dir(on_fail=on_fail, version=version)
     templates_dir = ensure_templates_dir(cfg_dir, "templates", out_dir)
-
-    def models_callback(models, folder: Path):
-        template_set = TemplateSet(
-            group=group_prefix + folder.name, templates=list(models)
-        )
-        xml_repr = template_set.xml()
-        return template_set, xml_repr
-
-    def get_fn(folder: Path):
-        return f"{group_prefix}{folder.name}.xml"
-
-    def write_template(target: Path, model, string_repr):
-        target.write_text(string_repr)
-
-    generate(
+    run_targets(
+        [pycharm_target(templates_dir, group_prefix, force=force)],
         folders=folders,
         rm_imports=rm_imports,
-        templates_dir=templates_dir,
-        exclude_rgx=exclude_rgx,
+        matcher=make_matcher(exclude, include, exclude_rgx),
         dry_run=dry_run,
-        file_to_model=charm_handle_file,
-        models_callback=models_callback,
-        get_fn=get_fn,
-        write_callback=write_template,
-        print_on_dry_run=True,
-    )
-
-
-def vscode_handle_file(snippet_name: str, content: str, file: Path):
-    return VSCodeSnippet(
-        prefix=[snippet_name],
-        body=transform_pycharm_to_extmark(content).splitlines(),
-        description=f"from {file.parent.name}/{snippet_name}",
+        jobs=jobs,
+        profile=profile,
+        profile_top=profile_top,
+        root=snippets_root(),
+        read_ahead=read_ahead,
     )
 
 
 @app.command()
 def vscode(
-    folders: t.List[Path] = typer.Option(
-        get_snippets_folders,
-        "--folder",
-        "-f",
-        autocompletion=auto_complete_snippets,
-        help="List of snippets folders that you want to parse",
-    ),
+    folders: t.List[Path] = folders_opt,
     out_dir: t.Optional[Path] = typer.Option(
         None,
         help="Custom output directory. Defaults to the programs snippets directory",
     ),
-    rm_imports: bool = typer.Option(
-        False, help="Remove python import statements in snippets"
-    ),
-    exclude_rgx: str = typer.Option(
-        "*.json", help="A regex expression to exclude file name in snippets folders"
-    ),
-    strategy: MergeStrategy = typer.Option(
-        MergeStrategy.MERGE,
-        help="Overwrite or merge existing json snippets. Will only work if comments have been removed",
-    ),
+    rm_imports: bool = rm_imports_opt,
+    exclude: t.List[str] = exclude_opt,
+    include: t.List[str] = include_opt,
+    exclude_rgx: t.Optional[str] = exclude_rgx_opt,
+    strategy: MergeStrategy = strategy_opt,
     dry_run: bool = False,
+    jobs: t.Optional[int] = jobs_opt,
+    read_ahead: int = read_ahead_opt,
+    force: bool = force_opt,
+    profile: t.Optional[Path] = profile_opt,
+    profile_top: int = profile_top_opt,
     schema_json: bool = typer.Option(
         False, help="Only show the jsonschema for the vscode config"
     ),
 ):
     """Install snippets for VSCode/VSCodium."""
+    from cs_cli.codium_models import VSCodeSnippets
+    from cs_cli.console import on_fail
+    from cs_cli.pipeline import ensure_templates_dir, run_targets, vscode_target
+
     if schema_json:
         schema_info(VSCodeSnippets)
     cfg_dirs = (out_dir,) if out_dir else tuple(codium_config_dir())
     if not cfg_dirs:
         on_fail("vscodium/vscode not installed.")
 
-    lang_ids = set(e.value for e in DefaultLangID)
+    snippets_dirs = [
+        ensure_templates_dir(ide_config_dir, "snippets", out_dir)
+        for ide_config_dir in cfg_dirs
+    ]
+    run_targets(
+        [vscode_target(snippets_dirs, strategy, force=force)],
+        folders=folders,
+        rm_imports=rm_imports,
+        matcher=make_matcher(exclude, include, exclude_rgx),
+        dry_run=dry_run,
+        jobs=jobs,
+        profile=profile,
+        profile_top=profile_top,
+        root=snippets_root(),
+        read_ahead=read_ahead,
+    )
+
+
+build_targets = ("pycharm", "vscode")
+
 
-    model_registry = {}
+def parse_targets(value: str) -> t.List[str]:
+    selected = [v.strip() for v in value.split(",") if v.strip()]
+    for name in selected:
+        if name not in build_targets:
+            raise typer.BadParameter(f"{name} is not one of {', '.join(build_targets)}")
+    return list(dict.fromkeys(selected))
 
-    def register_for_file(folder, models: VSCodeSnippets):
-        sn_cfg = snippets_config(folder)
-        lang_ids_ = sn_cfg.vscode_lang_ids
-        folder_name = folder.name
 
-        if not lang_ids_:
-            if folder_name in lang_ids:
-                lang_ids_ = (folder_name,)
-        if not lang_ids_:
-            fn = f"{folder_name}.code-snippets"
-            model_registry[fn] = models
+@app.command()
+def build(
+    folders: t.List[Path] = folders_opt,
+    targets: str = typer.Option(
+        ",".join(build_targets),
+        help="Comma separated editors to build for. Each file is read only once",
+    ),
+    pycharm_dir: t.Optional[Path] = typer.Option(
+        None, help="Custom output directory for pycharm templates"
+    ),
+    vscode_dir: t.Optional[Path] = typer.Option(
+        None, help="Custom output directory for vscode snippets"
+    ),
+    version: t.Optional[str] = version_opt,
+    rm_imports: bool = rm_imports_opt,
+    group_prefix: str = group_prefix_opt,
+    exclude: t.List[str] = exclude_opt,
+    include: t.List[str] = include_opt,
+    exclude_rgx: t.Optional[str] = exclude_rgx_opt,
+    strategy: MergeStrategy = strategy_opt,
+    dry_run: bool = False,
+    jobs: t.Optional[int] = jobs_opt,
+    read_ahead: int = read_ahead_opt,
+    force: bool = force_opt,
+    profile: t.Optional[Path] = profile_opt,
+    profile_top: int = profile_top_opt,
+):
+    """Builds the snippets for several editors in one pass."""
+    from cs_cli.pipeline import make_targets, run_targets
+
+    build_list = make_targets(
+        parse_targets(targets),
+        pycharm_dir=pycharm_dir,
+        vscode_dir=vscode_dir,
+        version=version,
+        group_prefix=group_prefix,
+        strategy=strategy,
+        force=force,
+    )
+    run_targets(
+        build_list,
+        folders=folders,
+        rm_imports=rm_imports,
+        matcher=make_matcher(exclude, include, exclude_rgx),
+        dry_run=dry_run,
+        jobs=jobs,
+        profile=profile,
+        profile_top=profile_top,
+        root=snippets_root(),
+        read_ahead=read_ahead,
+    )
+
+
+@app.command()
+def bundle(
+    folders: t.List[Path] = folders_opt,
+    out: t.Optional[Path] = typer.Option(
+        None,
+        "--out",
+        "-o",
+        help="Bundle file. Defaults to snippets[-<version>].csbundle",
+    ),
+    bundle_version: t.Optional[str] = typer.Option(
+        None, help="Version stored in the bundle. Defaults to a hash of its content"
+    ),
+    rm_imports: bool = rm_imports_opt,
+    group_prefix: str = group_prefix_opt,
+    exclude: t.List[str] = exclude_opt,
+    include: t.List[str] = include_opt,
+    exclude_rgx: t.Optional[str] = exclude_rgx_opt,
+    jobs: t.Optional[int] = jobs_opt,
+    read_ahead: int = read_ahead_opt,
+):
+    """Renders the snippets for all editors into one file for `cs-cli install`."""
+    from cs_cli.bundle import BUNDLE_SUFFIX, build_bundle
+    from cs_cli.console import success
+
+    if out is None:
+        suffix = f"-{bundle_version}" if bundle_version else ""
+        out = Path(f"snippets{suffix}{BUNDLE_SUFFIX}")
+    header = build_bundle(
+        out,
+        folders,
+        root=snippets_root(),
+        matcher=make_matcher(exclude, include, exclude_rgx),
+        rm_imports=rm_imports,
+        group_prefix=group_prefix,
+        version=bundle_version or "",
+        jobs=jobs,
+        read_ahead=read_ahead,
+    )
+    snippets = sum(len(g["snippets"]) for g in header["index"])
+    success(
+        f"Bundled {snippets} snippets in {len(header['index'])} groups into {out}, "
+        f"version {header['version']}"
+    )
+
+
+@app.command()
+def install(
+    bundle_file: Path = typer.Argument(
+        ..., exists=True, dir_okay=False, help="A bundle written by `cs-cli bundle`"
+    ),
+    targets: str = typer.Option(
+        ",".join(build_targets), help="Comma separated editors to install for"
+    ),
+    pycharm_dir: t.Optional[Path] = typer.Option(
+        None, help="Custom output directory for pycharm templates"
+    ),
+    vscode_dir: t.Optional[Path] = typer.Option(
+        None, help="Custom output directory for vscode snippets"
+    ),
+    version: t.Optional[str] = version_opt,
+    strategy: MergeStrategy = strategy_opt,
+    dry_run: bool = False,
+    list_: bool = typer.Option(
+        False, "--list", help="Only list the groups and snippets of the bundle"
+    ),
+):
+    """Installs a snippet bundle without the snippet sources."""
+    # Installing must not need pydantic or the pipeline
+    from cs_cli.bundle import Bundle, BundleError, install_bundle
+    from cs_cli.console import on_fail, print
+    from cs_cli.jsonc import JSONCDecodeError
+    from cs_cli.utils import ensure_templates_dir
+
+    selected = parse_targets(targets)
+    try:
+        bundle = Bundle(bundle_file)
+    except BundleError as err:
+        on_fail(str(err))
+    with bundle:
+        print(f"Bundle {bundle_file.name}, version {bundle.version}")
+        if list_:
+            for group in bundle.index:
+                print(f"[bold]{group.group}[/bold]: {', '.join(group.snippets)}")
             return
+        dirs = {}
+        if "pycharm" in selected:
+            cfg_dir = pycharm_dir or pycharm_config_dir(
+                on_fail=on_fail, version=version
+            )
+            dirs["pycharm"] = [ensure_templates_dir(cfg_dir, "templates", pycharm_dir)]
+        if "vscode" in selected:
+            cfg_dirs = (vscode_dir,) if vscode_dir else tuple(codium_config_dir())
+            if not cfg_dirs:
+                on_fail("vscodium/vscode not installed.")
+            dirs["vscode"] = [
+                ensure_templates_dir(cfg, "snippets", vscode_dir) for cfg in cfg_dirs
+            ]
+        try:
+            written = install_bundle(
+                bundle,
+                dirs,
+                overwrite=strategy == MergeStrategy.OVERWRITE,
+                dry_run=dry_run,
+            )
+        except (BundleError, JSONCDecodeError) as err:
+            on_fail(str(err))
+    for directory, names in written.items():
+        verb = "Would write" if dry_run else "Wrote"
+        print(f"{verb} {len(names)} files to {directory}: {', '.join(names)}")
+    if not written:
+        print("Everything is up to date")
 
-        for lang_id in lang_ids_:
-            fn = f"{lang_id}.json"
-            if fn in model_registry:
-                model_registry[fn] += models
-            else:
-                model_registry[fn] = models
-
-    def models_callback(models: t.Sequence[VSCodeSnippet], folder: Path):
-        folder_name = folder.name
-        data = {f"{folder_name}-{m.prefix[0]}": m for m in models}
-        snippets = VSCodeSnippets.parse_obj(data)
-        register_for_file(folder, snippets)
-        return snippets, snippets.json(indent=2)
-
-    for ide_config_dir in cfg_dirs:
-        snippets_dir = ensure_templates_dir(ide_config_dir, "snippets", out_dir)
-        generate(
-            folders=folders,
-            rm_imports=rm_imports,
-            templates_dir=snippets_dir,
-            exclude_rgx=exclude_rgx,
-            dry_run=dry_run,
-            file_to_model=vscode_handle_file,
-            models_callback=models_callback,
-            print_on_dry_run=False,
-        )
-        final_model = VSCodeOut.parse_obj(model_registry)
-        if dry_run:
-            typer.echo(VSCodeOut.__doc__)
-            typer.echo(final_model.json(indent=2))
+
+@app.command()
+def fleet(
+    homes: t.List[str] = typer.Argument(
+        ..., help="Home directories or glob patterns of them, e.g. '/home/*'"
+    ),
+    bundle_file: t.Optional[Path] = typer.Option(
+        None,
+        "--bundle",
+        exists=True,
+        dir_okay=False,
+        help="Install this bundle instead of building the snippets",
+    ),
+    targets: str = typer.Option(
+        ",".join(build_targets), help="Comma separated editors to install for"
+    ),
+    version: t.Optional[str] = version_opt,
+    strategy: MergeStrategy = strategy_opt,
+    dry_run: bool = False,
+    threads: int = typer.Option(8, min=1, help="Number of homes written at once"),
+    folders: t.List[Path] = folders_opt,
+    rm_imports: bool = rm_imports_opt,
+    group_prefix: str = group_prefix_opt,
+    exclude: t.List[str] = exclude_opt,
+    include: t.List[str] = include_opt,
+    exclude_rgx: t.Optional[str] = exclude_rgx_opt,
+    jobs: t.Optional[int] = jobs_opt,
+):
+    """Builds the snippets once and installs them into many home directories."""
+    import tempfile
+
+    from cs_cli.bundle import Bundle, BundleError, build_bundle
+    from cs_cli.console import on_fail, print
+    from cs_cli.fleet import expand_homes, fleet_install
+
+    selected = parse_targets(targets)
+    home_dirs = expand_homes(homes)
+    if not home_dirs:
+        on_fail(f"No home directories match {' '.join(homes)}")
+    with contextlib.ExitStack() as stack:
+        if bundle_file is None:
+            tmp = stack.enter_context(tempfile.TemporaryDirectory(prefix="cs-fleet-"))
+            bundle_file = Path(tmp) / "snippets.csbundle"
+            build_bundle(
+                bundle_file,
+                folders,
+                root=snippets_root(),
+                matcher=make_matcher(exclude, include, exclude_rgx),
+                rm_imports=rm_imports,
+                group_prefix=group_prefix,
+                jobs=jobs,
+            )
+        try:
+            bundle = stack.enter_context(Bundle(bundle_file))
+            results = list(
+                fleet_install(
+                    bundle,
+                    home_dirs,
+                    selected,
+                    version=version,
+                    overwrite=strategy == MergeStrategy.OVERWRITE,
+                    dry_run=dry_run,
+                    threads=threads,
+                )
+            )
+        except BundleError as err:
+            on_fail(str(err))
+    verb = "would write" if dry_run else "written"
+    # Plain lines, one per target, that are not wrapped and can be grepped
+    for result in results:
+        target = f"{result.home} {result.editor}"
+        if result.skipped:
+            typer.echo(f"{target}: skipped, {result.skipped}")
+        else:
+            typer.echo(
+                f"{target}: {result.written} {verb}, {result.unchanged} unchanged"
+                f" in {len(result.dirs)} dirs"
+            )
+    installed = {r.home for r in results if not r.skipped}
+    print(f"Installed into {len(installed)} of {len(home_dirs)} homes")
+
+
+@app.command("import")
+def import_(
+    editor: Editor = typer.Argument(..., help="Editor the snippet files are from"),
+    paths: t.Optional[t.List[Path]] = typer.Argument(
+        None,
+        help="Snippet files or directories. Defaults to the editor's snippets directory",
+    ),
+    out_dir: t.Optional[Path] = typer.Option(
+        None, help="Directory for the snippet folders. Defaults to the snippets root"
+    ),
+    version: t.Optional[str] = version_opt,
+    group_prefix: str = group_prefix_opt,
+    overwrite: bool = typer.Option(
+        False, help="Replace existing snippet files with other content"
+    ),
+    dry_run: bool = False,
+):
+    """Imports PyCharm Live Templates or VSCode snippets into snippet folders."""
+    from cs_cli.console import on_fail, print
+    from cs_cli.importer import (
+        SnippetWriter,
+        iter_pycharm_templates,
+        iter_vscode_snippets,
+        source_files,
+    )
+    from cs_cli.jsonc import JSONCDecodeError
+
+    if editor == Editor.PYCHARM:
+        if not paths:
+            paths = [pycharm_config_dir(on_fail=on_fail, version=version) / "templates"]
+        files = source_files(paths, ("*.xml",))
+    else:
+        if not paths:
+            paths = [d / "snippets" for d in codium_config_dir()]
+        files = source_files(paths, ("*.json", "*.code-snippets"))
+    if not files:
+        on_fail("No snippet files found")
+
+    unknown_contexts = set()
+    writer = SnippetWriter(out_dir or snippets_root(), overwrite, dry_run)
+    for f in files:
+        if editor == Editor.PYCHARM:
+            snippets = iter_pycharm_templates(f, group_prefix, unknown_contexts.add)
         else:
-            final_model.write_files(
-                snippets_dir, overwrite=strategy == MergeStrategy.OVERWRITE
+            snippets = iter_vscode_snippets(f)
+        try:
+            for snippet in snippets:
+                written = writer.add(snippet)
+                if written and dry_run:
+                    print(f"Would write {written}")
+        except (JSONCDecodeError, SyntaxError) as err:
+            # ET.ParseError is a SyntaxError
+            on_fail(f"{f}: {err}")
+    stats = writer.finish()
+
+    if unknown_contexts:
+        print(
+            f"[yellow]Unsupported contexts:[/yellow] {', '.join(sorted(unknown_contexts))}"
+        )
+    for path in stats.conflicts:
+        print(f"[yellow]Exists, kept:[/yellow] {path}")
+    for path in stats.configs:
+        print(f"{'Would write' if dry_run else 'Wrote'} {path}")
+    print(
+        f"{len(files)} files: {stats.written} snippets written, "
+        f"{stats.unchanged} unchanged, {len(stats.conflicts)} kept, "
+        f"{stats.duplicates} duplicates"
+    )
+
+
+db_opt = typer.Option(
+    None, "--db", help="Index database. Defaults to a file in the user cache dir"
+)
+
+
+@app.command()
+def index(
+    force: bool = typer.Option(False, "--force", help="Rebuild the index from scratch"),
+    db: t.Optional[Path] = db_opt,
+    exclude: t.List[str] = exclude_opt,
+    include: t.List[str] = include_opt,
+    exclude_rgx: t.Optional[str] = exclude_rgx_opt,
+):
+    """Updates the search index of the snippets below the snippets root."""
+    from cs_cli.snippet_db import SnippetDB
+
+    root = snippets_root()
+    # The same files as the builds
+    matcher = make_matcher(exclude, include, exclude_rgx)
+    with SnippetDB(db or SnippetDB.default_path(root)) as snippet_db:
+        if force:
+            snippet_db.clear()
+        stats = snippet_db.update(folder_index(), matcher)
+        typer.echo(
+            f"{snippet_db.count()} snippets: {stats.added} added, "
+            f"{stats.updated} updated, {stats.removed} removed"
+        )
+
+
+@app.command()
+def search(
+    query: t.Optional[t.List[str]] = typer.Argument(
+        None, help="Words that must all appear in the name, group, variables or body"
+    ),
+    lang: t.Optional[str] = typer.Option(None, help="Only snippets for this lang id"),
+    group: t.Optional[str] = typer.Option(None, help="Only snippets of this folder"),
+    limit: int = typer.Option(20, min=1, help="Maximum number of results"),
+    raw: bool = typer.Option(False, help="Pass the query as FTS5 query syntax"),
+    db: t.Optional[Path] = db_opt,
+):
+    """Searches the snippets in the index built by `cs-cli index`."""
+    import sqlite3
+
+    from cs_cli.snippet_db import SnippetDB
+
+    path = db or SnippetDB.default_path(snippets_root())
+    if not path.is_file():
+        typer.echo("No index found, run `cs-cli index` first", err=True)
+        raise typer.Exit(1)
+    with SnippetDB(path) as snippet_db:
+        try:
+            hits = snippet_db.search(
+                " ".join(query or ()), lang_id=lang, group=group, limit=limit, raw=raw
             )
+        except sqlite3.OperationalError as err:
+            if not raw:
+                raise
+            # Only raw queries reach FTS5 unchecked
+            raise typer.BadParameter(
+                f"Invalid FTS5 query: {err}", param_hint="QUERY"
+            ) from None
+    for hit in hits:
+        langs = f" ({', '.join(hit.lang_ids)})" if hit.lang_ids else ""
+        typer.echo(f"{hit.folder}/{hit.file}{langs}")
+        excerpt = " ".join(hit.excerpt.split())
+        if excerpt:
+            typer.echo(f"    {excerpt}")
+    if not hits:
+        raise typer.Exit(1)
+
+
+@app.command()
+def watch(
+    targets: str = typer.Option(
+        ",".join(build_targets), help="Comma separated editors to build for"
+    ),
+    pycharm_dir: t.Optional[Path] = typer.Option(
+        None, help="Custom output directory for pycharm templates"
+    ),
+    vscode_dir: t.Optional[Path] = typer.Option(
+        None, help="Custom output directory for vscode snippets"
+    ),
+    version: t.Optional[str] = version_opt,
+    rm_imports: bool = rm_imports_opt,
+    group_prefix: str = group_prefix_opt,
+    exclude: t.List[str] = exclude_opt,
+    include: t.List[str] = include_opt,
+    exclude_rgx: t.Optional[str] = exclude_rgx_opt,
+    strategy: MergeStrategy = strategy_opt,
+    jobs: t.Optional[int] = typer.Option(
+        1, "--jobs", "-j", min=1, help="Number of worker processes per rebuild"
+    ),
+    debounce: float = typer.Option(
+        0.3, help="Seconds without events before a burst of changes is rebuilt"
+    ),
+    polling: bool = typer.Option(
+        False, help="Poll file modification times instead of using inotify"
+    ),
+    poll_interval: float = typer.Option(1.0, help="Seconds between two polls"),
+    read_ahead: int = read_ahead_opt,
+):
+    """Watches the snippets root and reinstalls the changed groups."""
+    from cs_cli.console import print
+    from cs_cli.pipeline import make_targets, run_targets
+    from cs_cli.watch import batches, create_watcher
+
+    selected = parse_targets(targets)
+    matcher = make_matcher(exclude, include, exclude_rgx)
+    root = snippets_root()
+
+    def rebuild(show_skipped: bool = False):
+        try:
+            build(show_skipped)
+        except (ValueError, OSError) as err:
+            # e.g. a config saved half-edited, the next save triggers a rebuild
+            print(f"[red]Build failed:[/red] {err}")
+        except SystemExit:
+            # on_fail printed why
+            pass
+
+    def build(show_skipped: bool):
+        run_targets(
+            make_targets(
+                selected,
+                pycharm_dir=pycharm_dir,
+                vscode_dir=vscode_dir,
+                version=version,
+                group_prefix=group_prefix,
+                strategy=strategy,
+            ),
+            folders=get_snippets_folders(),
+            rm_imports=rm_imports,
+            matcher=matcher,
+            dry_run=False,
+            jobs=jobs,
+            show_skipped=show_skipped,
+            root=root,
+            read_ahead=read_ahead,
+        )
+
+    rebuild(show_skipped=True)
+    watcher = create_watcher(root, polling=polling, interval=poll_interval)
+    print(f"Watching {root.resolve()} with {watcher.__class__.__name__}")
+    try:
+        for changed in batches(watcher, debounce=debounce):
+            print(f"Changed: {', '.join(sorted(f.name for f in changed))}")
+            rebuild()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
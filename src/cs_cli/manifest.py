@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import typing as t
+from importlib import metadata
+from pathlib import Path
+
+from cs_cli.constants import MANIFEST_FILE, SNIPPET_CONFIG
+
+MANIFEST_VERSION = 1
+
+
+def tool_version() -> str:
+    try:
+        return metadata.version("cs-cli")
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class BuildManifest:
+    """Persistent record of the inputs used to build each snippets folder.
+
+    A folder digest covers the hash of every source file, the folder's
+    `.cs-config.json` and the transform options. File hashes are cached by
+    (mtime, size), so an unchanged tree is checked with stat calls only."""
+
+    def __init__(self, path: Path, force: bool = False):
+        self.path = path
+        self.force = force
+        self._files: t.Dict[str, list] = {}
+        self._folders: t.Dict[str, dict] = {}
+        self._seen_files: t.Dict[str, list] = {}
+        self._visited: t.Set[str] = set()
+        self._load()
+
+    @classmethod
+    def for_dir(cls, templates_dir: Path, namespace: str, force: bool = False):
+        return cls(templates_dir / f"{MANIFEST_FILE}-{namespace}", force=force)
+
+    def _load(self):
+        if not self.path.is_file():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except ValueError:
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            return
+        if data.get("tool") != tool_version():
+            return
+        self._files = data.get("files", {})
+        self._folders = data.get("folders", {})
+
+    def file_hash(self, file: Path) -> str:
+        key = str(file.resolve())
+        try:
+            st = file.stat()
+        except FileNotFoundError:
+            return ""
+        cached = self._files.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            entry = cached
+        else:
+            entry = [st.st_mtime_ns, st.st_size, content_hash(file.read_bytes())]
+        self._seen_files[key] = entry
+        return entry[2]
+
+    def folder_digest(
+        self,
+        folder: Path,
+        files: t.Iterable[Path],
+        options: t.Mapping[str, t.Any],
+        config_files: t.Sequence[Path] | None = None,
+    ) -> str:
+        """`config_files` are the configs the folder inherits, by default only its own"""
+        self._visited.add(str(folder.resolve()))
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps(options, sort_keys=True, default=str).encode())
+        if config_files is None:
+            h.update(b"\0config\0")
+            h.update(self.file_hash(folder / SNIPPET_CONFIG).encode())
+        else:
+            for config in config_files:
+                h.update(f"\0config\0{config}\0{self.file_hash(config)}".encode())
+        for file in sorted(files, key=lambda f: f.name):
+            h.update(f"\0{file.name}\0{self.file_hash(file)}".encode())
+        return h.hexdigest()
+
+    def previous_outputs(self, folder: Path) -> t.Tuple[str, ...]:
+        entry = self._folders.get(str(folder.resolve()))
+        return tuple(entry["outputs"]) if entry else ()
+
+    def is_fresh(self, folder: Path, digest: str) -> bool:
+        if self.force:
+            return False
+        entry = self._folders.get(str(folder.resolve()))
+        return bool(entry) and entry["digest"] == digest
+
+    def outputs_exist(self, outputs: t.Iterable[str]) -> bool:
+        return all((self.path.parent / o).is_file() for o in outputs)
+
+    def update(self, folder: Path, digest: str, outputs: t.Sequence[str]):
+        self._folders[str(folder.resolve())] = {
+            "digest": digest,
+            "outputs": list(outputs),
+        }
+
+    def remove_stale(self, tops: t.Iterable[Path]) -> t.Tuple[str, ...]:
+        """Drops the folders that are gone since the last build and returns their
+        outputs. A folder is gone if it was not visited but no longer exists or lies
+        below one of the walked `tops`, i.e. it was removed, emptied or excluded"""
+        prefixes = tuple(f"{top.resolve()}{os.sep}" for top in tops)
+        outputs: t.Dict[str, None] = {}
+        for key in list(self._folders):
+            if key in self._visited:
+                continue
+            if key.startswith(prefixes) or not os.path.isdir(key):
+                outputs.update(dict.fromkeys(self._folders.pop(key)["outputs"]))
+        return tuple(outputs)
+
+    def save(self):
+        files = {
+            k: v
+            for k, v in self._files.items()
+            if str(Path(k).parent) not in self._visited
+        }
+        files.update(self._seen_files)
+        data = {
+            "version": MANIFEST_VERSION,
+            "tool": tool_version(),
+            "files": files,
+            "folders": self._folders,
+        }
+        self.path.write_text(json.dumps(data, indent=1, sort_keys=True))
+
+
+class ManifestGroup:
+    """The manifests of several output directories written from the same build.
+    A folder is only fresh if it is fresh in every directory."""
+
+    def __init__(self, manifests: t.Sequence[BuildManifest]):
+        self.manifests = tuple(manifests)
+
+    def folder_digest(
+        self,
+        folder: Path,
+        files: t.Iterable[Path],
+        options: t.Mapping[str, t.Any],
+        config_files: t.Sequence[Path] | None = None,
+    ) -> str:
+        # The digest only depends on the inputs, the file hashes are shared on save
+        return self.manifests[0].folder_digest(folder, files, options, config_files)
+
+    def previous_outputs(self, folder: Path) -> t.Tuple[str, ...]:
+        outputs = {}
+        for m in self.manifests:
+            outputs.update(dict.fromkeys(m.previous_outputs(folder)))
+        return tuple(outputs)
+
+    def is_fresh(self, folder: Path, digest: str) -> bool:
+        return all(m.is_fresh(folder, digest) for m in self.manifests)
+
+    def outputs_exist(self, outputs: t.Iterable[str]) -> bool:
+        outputs = tuple(outputs)
+        return all(m.outputs_exist(outputs) for m in self.manifests)
+
+    def update(self, folder: Path, digest: str, outputs: t.Sequence[str]):
+        for m in self.manifests:
+            m.update(folder, digest, outputs)
+
+    def remove_stale(self, tops: t.Iterable[Path]) -> t.Tuple[str, ...]:
+        tops = tuple(tops)
+        first = self.manifests[0]
+        outputs: t.Dict[str, None] = {}
+        for m in self.manifests:
+            # Only the first manifest records the visits, see `folder_digest`
+            m._visited.update(first._visited)
+            outputs.update(dict.fromkeys(m.remove_stale(tops)))
+        return tuple(outputs)
+
+    def save(self):
+        first = self.manifests[0]
+        for m in self.manifests:
+            m._seen_files.update(first._seen_files)
+            m._visited.update(first._visited)
+            m.save()
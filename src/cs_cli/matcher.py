@@ -0,0 +1,188 @@
+"""Include and exclude patterns for the files of snippet folders.
+
+Patterns are globs by default, or regular expressions with a `re:` prefix. Globs follow
+gitignore: a pattern without a slash matches a name at any depth, one with a slash
+is anchored at its base folder, a trailing slash only matches directories and `**`
+spans directories. `.csignore` files use the same syntax, one pattern per line, with
+`#` comments and `!` to include again what an earlier line excluded.
+
+Consecutive globs of a folder are compiled once into a single regex. Its alternatives are
+in reverse order, so the first one that matches is the last pattern, which wins. `re:`
+patterns are compiled on their own, as global flags like `(?i)` and backreferences do
+not survive being joined with others.
+"""
+
+import re
+import typing as t
+from pathlib import Path
+
+REGEX_PREFIX = "re:"
+
+
+class Rule(t.NamedTuple):
+    pattern: str
+    # Matches paths relative to the base folder. Directories end with a "/"
+    regex: str
+    negate: bool = False
+    # A `re:` pattern, searched anywhere in the path
+    search: bool = False
+
+
+def _glob_regex(glob: str) -> str:
+    out = []
+    i = 0
+    n = len(glob)
+    while i < n:
+        char = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = glob.find("]", i + 2 if glob.startswith("[!", i) else i + 1)
+            if end < 0:
+                out.append(re.escape(char))
+            else:
+                body = glob[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif char == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "".join(out)
+
+
+def parse_pattern(pattern: str) -> Rule:
+    """A rule for a glob or a `re:` regex, which is searched in the relative path"""
+    source = pattern
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    if pattern.startswith(REGEX_PREFIX):
+        regex = pattern[len(REGEX_PREFIX) :]
+        re.compile(regex)
+        return Rule(source, regex, negate, search=True)
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    anchored = "/" in pattern
+    regex = _glob_regex(pattern.lstrip("/"))
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    regex += "/" if dir_only else "/?"
+    return Rule(source, regex + r"\Z", negate)
+
+
+def parse_ignore_file(text: str) -> t.List[Rule]:
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("\\"):
+            # e.g. "\#name" or "\!name"
+            line = line[1:]
+        rules.append(parse_pattern(line))
+    return rules
+
+
+class RuleSet:
+    """Rules relative to one base folder. Each run of globs is compiled into a single
+    regex, each `re:` pattern into its own"""
+
+    def __init__(self, rules: t.Sequence[Rule]):
+        self.rules = tuple(rules)
+        # (regex, index of the rule if it is a `re:` pattern, else None)
+        self._regexes: t.List[t.Tuple[t.Pattern, int | None]] = []
+        globs: t.List[int] = []
+        for i, rule in enumerate(self.rules):
+            if rule.search:
+                self._add_globs(globs)
+                self._regexes.append((re.compile(rule.regex, re.S), i))
+            else:
+                globs.append(i)
+        self._add_globs(globs)
+        self._regexes.reverse()
+
+    def _add_globs(self, indices: t.List[int]):
+        if not indices:
+            return
+        alternatives = (f"(?P<_r{i}>{self.rules[i].regex})" for i in reversed(indices))
+        self._regexes.append((re.compile("|".join(alternatives), re.S), None))
+        indices.clear()
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def match(self, path: str, is_dir: bool = False) -> bool | None:
+        """True if the last matching rule excludes, False if it includes again, None
+        without a matching rule"""
+        if is_dir:
+            path += "/"
+        for regex, index in self._regexes:
+            if index is not None:
+                if regex.search(path):
+                    return not self.rules[index].negate
+                continue
+            m = regex.match(path)
+            if m is not None:
+                return not self.rules[int(m.lastgroup[2:])].negate
+        return None
+
+
+class Matcher:
+    """The include and exclude patterns given on the command line. `.csignore` files
+    found during the walk are added per folder with `RuleSet`"""
+
+    def __init__(self, exclude: t.Sequence[str] = (), include: t.Sequence[str] = ()):
+        self.exclude = tuple(exclude)
+        self.include = tuple(include)
+        self.excludes = RuleSet([parse_pattern(p) for p in exclude])
+        self.includes = RuleSet([parse_pattern(p) for p in include])
+
+    @property
+    def options(self) -> t.Dict[str, t.List[str]]:
+        """The patterns, for the build manifest"""
+        return {"exclude": list(self.exclude), "include": list(self.include)}
+
+    def is_excluded(
+        self,
+        path: str,
+        is_dir: bool,
+        ignores: t.Sequence[t.Tuple[str, RuleSet]] = (),
+    ) -> bool:
+        """Whether a path relative to the walked folder is excluded. `ignores` are the
+        rule sets of `.csignore` files with the path of their folder, outermost
+        first. The nearest file with a matching rule decides, then the excludes.
+        Files must match an include pattern, if there are any"""
+        decision = None
+        for base, rules in reversed(ignores):
+            decision = rules.match(path[len(base) :], is_dir)
+            if decision is not None:
+                break
+        if decision is None:
+            decision = self.excludes.match(path, is_dir)
+        if decision:
+            return True
+        if not is_dir and self.includes and not self.includes.match(path):
+            return True
+        return False
+
+
+def read_ignore_file(path: Path) -> RuleSet:
+    try:
+        return RuleSet(parse_ignore_file(path.read_text()))
+    except re.error as err:
+        raise ValueError(f"{path}: {err}") from None
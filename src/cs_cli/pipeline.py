@@ -0,0 +1,703 @@
+"""The build pipeline behind the commands: reading and transforming snippet files,
+rendering them for each editor target and writing the outputs."""
+
+import contextlib
+import json
+import os
+import re
+import time
+import typing as t
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache, partial
+from operator import itemgetter
+from pathlib import Path
+
+import typer
+
+from cs_cli.charm import config_dir as pycharm_config_dir
+from cs_cli.charm_models import CharmTemplate, TemplateSet
+from cs_cli.codium import config_dirs as codium_config_dir
+from cs_cli.codium_models import (
+    MergeStrategy,
+    VSCodeOut,
+    VSCodeSnippet,
+    VSCodeSnippets,
+    VSCodeWriter,
+)
+from cs_cli.config import ConfigResolver, FolderConfig
+from cs_cli.console import file_info, on_fail, print
+from cs_cli.constants import DEFAULT_PREFIX
+from cs_cli.folder_index import lang_ids as group_lang_ids
+from cs_cli.jsonc import JSONCDecodeError
+from cs_cli.manifest import BuildManifest, ManifestGroup
+from cs_cli.matcher import Matcher
+from cs_cli.prefetch import prefetch
+from cs_cli.profile import Profile, TimingT, null_call, print_report
+from cs_cli.py import remove_python_import_lines
+from cs_cli.snippet import Snippet
+from cs_cli.types import BufferTransformT
+from cs_cli.utils import ensure_templates_dir, file_ending
+from cs_cli.walk import FolderFilesT, SnippetFolder, walk
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+_configs = ConfigResolver()
+
+
+def snippets_config(path: Path | SnippetFolder) -> FolderConfig:
+    """The config of a folder in the current run, see `ConfigResolver`"""
+    return _configs.resolve(path)
+
+
+def reset_configs():
+    """Starts a new run, in which the config files are read again"""
+    global _configs
+    _configs = ConfigResolver()
+
+
+# Line breaks of str.splitlines besides "\n" and "\r\n". Looked up with `in`,
+# which is much faster than a regex character class on large files
+_ascii_line_breaks = ("\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e")
+_unicode_line_breaks = ("\x85", "\u2028", "\u2029")
+_leading_newlines_rgx = re.compile(r"^\n{2,}")
+
+
+@lru_cache()
+def file_transforms(
+    rm_imports: bool,
+) -> t.Dict[str | None, t.Sequence[BufferTransformT]]:
+    """Whole-buffer transforms by file ending. Files with other endings are only
+    normalized"""
+    return {
+        "py": (remove_python_import_lines,) if rm_imports else (),
+    }
+
+
+def terminated_lines(content: str) -> str:
+    """Normalizes the line breaks to "\n" and terminates the last line, splitting
+    lines like `str.splitlines` does"""
+    text = content.replace("\r\n", "\n") if "\r" in content else content
+    if any(c in text for c in _ascii_line_breaks) or (
+        not text.isascii() and any(c in text for c in _unicode_line_breaks)
+    ):
+        return "".join(line + "\n" for line in content.splitlines())
+    if text and not text.endswith("\n"):
+        text += "\n"
+    return text
+
+
+def transform_content(
+    fn: str,
+    content: str,
+    transforms: t.Mapping[str | None, t.Sequence[BufferTransformT]],
+) -> tuple[str, str]:
+    """Returns the snippet name and the transformed content of a file"""
+    ending = file_ending(fn)
+    text = terminated_lines(content)
+    for transform in transforms.get(ending, ()):
+        text = transform(text)
+    snippet_name = re.sub(rf"\.{ending}", "", fn)
+    return snippet_name, _leading_newlines_rgx.sub("", text[:-1], count=1)
+
+
+def handle_file(
+    f: Path,
+    transforms: t.Mapping[str | None, t.Sequence[BufferTransformT]],
+    content: str | None = None,
+) -> tuple[str, str, Path]:
+    """Transforms a snippet file. The `content` is read from `f` unless given"""
+    if content is None:
+        content = f.read_text()
+    snippet_name, content = transform_content(f.name, content, transforms)
+    return snippet_name, content, f
+
+
+def read_snippet(
+    f: Path,
+    transforms: t.Mapping[str | None, t.Sequence[BufferTransformT]],
+    config: FolderConfig,
+    group: str | None = None,
+    content: str | None = None,
+) -> Snippet:
+    snippet_name, content, _ = handle_file(f, transforms=transforms, content=content)
+    return Snippet(
+        snippet_name, group or f.parent.name, content, f, config.for_file(f.name)
+    )
+
+
+class Target(t.NamedTuple):
+    """An editor output of `generate_targets`. `file_to_model` and `models_callback`
+    run in worker processes, so they must be picklable"""
+
+    templates_dir: Path
+    file_to_model: t.Callable[[Snippet], t.Any]
+    models_callback: t.Callable
+    write_callback: t.Callable[[Path, t.Any], None] | None = None
+    render_callback: t.Callable[[t.Any], str] | None = None
+    get_fn: t.Callable[[Path], str] | None = None
+    get_outputs: t.Callable[[Path], t.Sequence[str]] | None = None
+    collect_callback: t.Callable[[Path, t.Any], None] | None = None
+    manifest: BuildManifest | ManifestGroup | None = None
+    options: t.Mapping[str, t.Any] | None = None
+    print_on_dry_run: bool = True
+    # Used in profile reports
+    name: str = ""
+
+
+FinishT = t.Callable[[t.Set[str] | None, bool], None]
+
+
+def build_folder(
+    folder: Path,
+    files: t.Sequence[Path],
+    emitters: t.Sequence[t.Tuple[t.Callable, t.Callable] | None],
+    config: FolderConfig | None = None,
+    contents: t.Sequence[str] | None = None,
+    *,
+    rm_imports: bool,
+):
+    """Reads and transforms the files of one folder once and renders the model of each
+    emitter (file_to_model, models_callback) from the snippets. Emitters that are None
+    are skipped. The `config` is resolved in the main process, where each config file
+    is read once per run. The `contents` of the files are used if they were read
+    ahead. Runs in worker processes, so all arguments must be picklable"""
+    transforms = file_transforms(rm_imports)
+    if config is None:
+        config = snippets_config(folder)
+    snippets = [
+        read_snippet(f, transforms, config, folder.name, content)
+        for f, content in zip(files, contents or (None,) * len(files))
+    ]
+    results = []
+    for emitter in emitters:
+        if emitter is None:
+            results.append(None)
+            continue
+        file_to_model, models_callback = emitter
+        models = (file_to_model(sn) for sn in snippets)
+        results.append(models_callback((m for m in models if m), folder))
+    return results
+
+
+def profiled_build_folder(
+    folder: Path,
+    files: t.Sequence[Path],
+    emitters: t.Sequence[t.Tuple[t.Callable, t.Callable] | None],
+    config: FolderConfig | None = None,
+    contents: t.Sequence[str] | None = None,
+    *,
+    names: t.Sequence[str],
+    rm_imports: bool,
+) -> t.Tuple[t.List[t.Any], t.List[TimingT]]:
+    """`build_folder` that also returns the time of each stage per file. For files
+    read ahead, the wait for them is timed as `prefetch` in the main process"""
+    clock = time.perf_counter
+    timings = []
+    transforms = file_transforms(rm_imports)
+    if config is None:
+        config = snippets_config(folder)
+    snippets = []
+    for f, content in zip(files, contents or (None,) * len(files)):
+        start = clock()
+        if content is None:
+            content = f.read_text()
+        read = clock()
+        snippet_name, content = transform_content(f.name, content, transforms)
+        snippets.append(
+            Snippet(snippet_name, folder.name, content, f, config.for_file(f.name))
+        )
+        timings.append(("read", read - start, f))
+        timings.append(("transform", clock() - read, f))
+    results = []
+    for emitter, name in zip(emitters, names):
+        if emitter is None:
+            results.append(None)
+            continue
+        file_to_model, models_callback = emitter
+        models = []
+        for sn in snippets:
+            start = clock()
+            model = file_to_model(sn)
+            timings.append((f"validate:{name}", clock() - start, sn.file))
+            if model:
+                models.append(model)
+        start = clock()
+        results.append(models_callback(models, folder))
+        timings.append((f"models:{name}", clock() - start, None))
+    return results, timings
+
+
+def generate(
+    rm_imports: bool,
+    folders: t.Sequence[Path],
+    templates_dir: Path,
+    file_to_model: t.Callable[[Snippet], t.Any],
+    models_callback: t.Callable,
+    write_callback: t.Callable[[Path, t.Any], None] | None = None,
+    render_callback: t.Callable[[t.Any], str] | None = None,
+    get_fn: t.Callable[[Path], str] | None = None,
+    matcher: Matcher | None = None,
+    dry_run: bool = False,
+    print_on_dry_run: bool = True,
+    manifest: BuildManifest | None = None,
+    get_outputs: t.Callable[[Path], t.Sequence[str]] | None = None,
+    options: t.Mapping[str, t.Any] | None = None,
+    collect_callback: t.Callable[[Path, t.Any], None] | None = None,
+    jobs: int = 1,
+) -> t.Set[str] | None:
+    """Builds the models of a single target, see `generate_targets`"""
+    target = Target(
+        templates_dir=templates_dir,
+        file_to_model=file_to_model,
+        models_callback=models_callback,
+        write_callback=write_callback,
+        render_callback=render_callback,
+        get_fn=get_fn,
+        get_outputs=get_outputs,
+        collect_callback=collect_callback,
+        manifest=manifest,
+        options=options,
+        print_on_dry_run=print_on_dry_run,
+    )
+    (dirty,) = generate_targets(
+        rm_imports=rm_imports,
+        folders=folders,
+        targets=(target,),
+        matcher=matcher,
+        dry_run=dry_run,
+        jobs=jobs,
+    )
+    return dirty
+
+
+def _build_entry(build: t.Callable, entry: t.Tuple[t.Any, ...]):
+    return build(*entry)
+
+
+def _bounded_map(
+    pool: ProcessPoolExecutor, fn: t.Callable, items: t.Iterable, window: int
+) -> t.Iterator:
+    """Like `pool.map`, which submits everything at once, but keeps at most `window`
+    items in flight. Results are yielded in order and released once consumed, so
+    finished folders do not pile up while an earlier one is still built"""
+    pending: t.Deque[Future] = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def generate_targets(
+    rm_imports: bool,
+    folders: t.Sequence[Path],
+    targets: t.Sequence[Target],
+    matcher: Matcher | None = None,
+    dry_run: bool = False,
+    jobs: int = 1,
+    show_skipped: bool = True,
+    profile: Profile | None = None,
+    root: Path | None = None,
+    read_ahead: int = 0,
+) -> t.List[t.Set[str] | None]:
+    """Builds the models for each folder and target and writes them using the callbacks.
+
+    The folders are walked recursively, nested folders are groups of their own (see
+    `walk`). Each file is read and transformed once into a `Snippet` shared by all
+    targets. If a target has a manifest, folders whose inputs did not change are
+    skipped, unless one of their outputs needs a rebuild because of another folder.
+    That is only known after the whole walk; without manifests to check, folders are
+    built while the walk goes on.
+    With jobs > 1, folders are built in a process pool, a few folders ahead of the
+    one being written. Results are consumed in folder order, so output and
+    `collect_callback` calls do not depend on which worker finishes first. Returns
+    per target the output names that are out of date, or None if everything was
+    built. With a `profile`, the stages are timed per file.
+    With `read_ahead` > 1, up to that many files are read concurrently by threads in
+    the main process ahead of the build, see `prefetch`.
+    The folder configs are resolved once per run in the main process and handed to
+    the workers with the files, see `ConfigResolver`.
+    """
+    call = profile.call if profile is not None else null_call
+    matcher = matcher or Matcher()
+    reset_configs()
+    walked = _unique_file_names(walk(folders, root=root, matcher=matcher))
+    if profile is not None:
+        walked = profile.iterate("walk", walked)
+    base_options = {"rm_imports": rm_imports, **matcher.options}
+    states = [_target_state(target, base_options, dry_run) for target in targets]
+    checked = [state for state in states if state.dirty is not None]
+
+    def emitters(folder: SnippetFolder):
+        return [
+            (target.file_to_model, target.models_callback)
+            if state.needs_build(folder)
+            else None
+            for target, state in zip(targets, states)
+        ]
+
+    if checked:
+        folder_files: t.Dict[SnippetFolder, t.Tuple[Path, ...]] = {}
+        for folder, files in walked:
+            folder_files[folder] = files
+            for state in checked:
+                call("manifest", state.check, folder, files)
+        for state in checked:
+            state.check_removed(folders)
+        entries: t.Iterable[FolderFilesT] = folder_files.items()
+        to_build = [
+            (folder, files, emitters(folder), snippets_config(folder))
+            for folder, files in entries
+            if any(s.needs_build(folder) for s in states)
+        ]
+        pooled = len(to_build) > 1
+        workers = min(jobs, len(to_build))
+    else:
+        # Everything is built: the walk feeds the build directly
+        entries = deque()
+
+        def scheduled():
+            for folder, files in walked:
+                entries.append((folder, files))
+                yield folder, files, emitters(folder), snippets_config(folder)
+
+        to_build = scheduled()
+        pooled = True
+        workers = jobs
+
+    if profile is None:
+        build = partial(build_folder, rm_imports=rm_imports)
+    else:
+        names = [target.name or str(i) for i, target in enumerate(targets)]
+        build = partial(profiled_build_folder, names=names, rm_imports=rm_imports)
+    build = partial(_build_entry, build)
+    if read_ahead > 1:
+        to_build = (
+            (*entry, contents)
+            for entry, contents in prefetch(to_build, itemgetter(1), read_ahead)
+        )
+        if profile is not None:
+            to_build = profile.iterate("prefetch", to_build)
+
+    def emit(folder: SnippetFolder, files: t.Sequence[Path], folder_results):
+        print(f"---- Group name: {folder.name}")
+        for file in files:
+            file_info(file)
+        if profile is not None:
+            folder_results, timings = folder_results
+            profile.extend(timings)
+            profile.folders += 1
+        for target, final_model in zip(targets, folder_results):
+            if final_model is None:
+                continue
+            if target.collect_callback:
+                call("collect", target.collect_callback, folder, final_model)
+            if dry_run:
+                if target.print_on_dry_run and target.render_callback:
+                    print(target.render_callback(final_model))
+                continue
+            if target.get_fn and target.write_callback:
+                out = target.templates_dir / target.get_fn(folder)
+                call(f"write:{target.name}", target.write_callback, out, final_model)
+
+    with contextlib.ExitStack() as stack:
+        if jobs > 1 and pooled:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            results = _bounded_map(pool, build, to_build, window=2 * workers)
+        else:
+            results = map(build, to_build)
+
+        if checked:
+            for folder, files in entries:
+                if not any(s.needs_build(folder) for s in states):
+                    if show_skipped:
+                        print(f"---- Group name: {folder.name}")
+                        print("[dim]Unchanged, skipped")
+                    continue
+                emit(folder, files, next(results))
+        else:
+            for folder_results in results:
+                # The entry was taken from the walk before its result
+                emit(*entries.popleft(), folder_results)
+
+    for state in states:
+        state.update_manifest()
+    return [state.dirty for state in states]
+
+
+class _TargetState:
+    def __init__(
+        self,
+        target: Target,
+        dirty: t.Set[str] | None,
+        options: t.Mapping[str, t.Any] | None = None,
+    ):
+        self.target = target
+        self.dirty = dirty
+        self.options = options
+        self.digests: t.Dict[SnippetFolder, str] = {}
+        self.outputs: t.Dict[SnippetFolder, t.Tuple[str, ...]] = {}
+
+    def needs_build(self, folder: SnippetFolder) -> bool:
+        return self.dirty is None or bool(self.dirty.intersection(self.outputs[folder]))
+
+    def check(self, folder: SnippetFolder, files: t.Sequence[Path]):
+        """Marks the outputs of the folder as dirty if its inputs changed"""
+        manifest = self.target.manifest
+        get_fn = self.target.get_fn
+        get_outputs = self.target.get_outputs or (
+            lambda f: (get_fn(f),) if get_fn else ()
+        )
+        digest = self.digests[folder] = manifest.folder_digest(
+            folder.path, files, self.options, folder.config_files
+        )
+        outputs = self.outputs[folder] = tuple(get_outputs(folder))
+        if not manifest.is_fresh(folder.path, digest):
+            self.dirty.update(outputs)
+            self.dirty.update(manifest.previous_outputs(folder.path))
+        elif not manifest.outputs_exist(outputs):
+            self.dirty.update(outputs)
+
+    def check_removed(self, tops: t.Sequence[Path]):
+        """Marks the outputs of folders that are gone since the last build as dirty,
+        so the outputs they shared with other folders are rebuilt without them"""
+        self.dirty.update(self.target.manifest.remove_stale(tops))
+
+    def update_manifest(self):
+        if self.dirty is None:
+            return
+        for folder, digest in self.digests.items():
+            self.target.manifest.update(folder.path, digest, self.outputs[folder])
+
+
+def _target_state(
+    target: Target,
+    base_options: t.Mapping[str, t.Any],
+    dry_run: bool,
+) -> _TargetState:
+    if target.manifest is None or dry_run:
+        return _TargetState(target, None)
+    return _TargetState(target, set(), {**base_options, **(target.options or {})})
+
+
+def group_file_name(folder: Path | SnippetFolder) -> str:
+    """The group of a folder as a file name, e.g. `python-django` for `python/django`"""
+    return folder.name.replace("/", "-")
+
+
+def _unique_file_names(walked: t.Iterable[FolderFilesT]) -> t.Iterator[FolderFilesT]:
+    """Aborts if two groups share a file name, e.g. the nested group `a/b` and the
+    folder `a-b`: the later one would overwrite the templates of the other. Checked
+    while walking, before the second group is built"""
+    groups: t.Dict[str, str] = {}
+    for folder, files in walked:
+        fn = group_file_name(folder)
+        other = groups.setdefault(fn, folder.name)
+        if other != folder.name:
+            on_fail(
+                f"The groups {other} and {folder.name} both use the file name {fn},"
+                " rename one of the folders"
+            )
+        yield folder, files
+
+
+def charm_handle_file(snippet: Snippet):
+    # The context is validated once per distinct list when the config is resolved
+    return CharmTemplate.trusted(
+        snippet.name, snippet.body, snippet.config.template_context
+    )
+
+
+def charm_models_callback(models, folder: Path, group_prefix: str = DEFAULT_PREFIX):
+    return TemplateSet.construct(
+        group=group_prefix + folder.name, templates=list(models)
+    )
+
+
+def write_template(target: Path, model: TemplateSet):
+    model.write_xml(target)
+
+
+def pycharm_target(
+    templates_dir: Path, group_prefix: str = DEFAULT_PREFIX, force: bool = False
+) -> t.Tuple[Target, FinishT]:
+    manifest = BuildManifest.for_dir(templates_dir, "pycharm", force=force)
+
+    def get_fn(folder: Path):
+        return f"{group_prefix}{group_file_name(folder)}.xml"
+
+    def finish(dirty: t.Set[str] | None, dry_run: bool):
+        if not dry_run:
+            manifest.save()
+
+    target = Target(
+        name="pycharm",
+        templates_dir=templates_dir,
+        file_to_model=charm_handle_file,
+        models_callback=partial(charm_models_callback, group_prefix=group_prefix),
+        get_fn=get_fn,
+        write_callback=write_template,
+        render_callback=TemplateSet.xml,
+        print_on_dry_run=True,
+        manifest=manifest,
+        options={"group_prefix": group_prefix},
+    )
+    return target, finish
+
+
+def vscode_handle_file(snippet: Snippet):
+    return VSCodeSnippet.construct(
+        prefix=[snippet.name],
+        body=snippet.placeholders.extmark.splitlines(),
+        description=f"from {snippet.group}/{snippet.name}",
+    )
+
+
+def folder_lang_ids(folder: Path | SnippetFolder) -> t.Tuple[str, ...]:
+    """The VSCode lang ids of a folder, by config or by folder name. A nested folder
+    takes the name of the nearest parent that is a lang id. Resolved like the
+    metadata of the folder index, see `folder_index.lang_ids`"""
+    config = {"vscode_lang_ids": snippets_config(folder).vscode_lang_ids}
+    return group_lang_ids(folder.name, config)
+
+
+def vscode_output_names(folder: Path | SnippetFolder) -> t.Tuple[str, ...]:
+    """The snippet files a folder contributes to, by lang id or by folder name"""
+    lang_ids = folder_lang_ids(folder)
+    if not lang_ids:
+        return (f"{group_file_name(folder)}.code-snippets",)
+    return tuple(f"{lang_id}.json" for lang_id in lang_ids)
+
+
+def vscode_models_callback(models: t.Iterable[VSCodeSnippet], folder: Path):
+    folder_name = folder.name
+    data = {f"{folder_name}-{m.prefix[0]}": m for m in models}
+    return VSCodeSnippets.construct(__root__=data)
+
+
+def vscode_target(
+    snippets_dirs: t.Sequence[Path],
+    strategy: MergeStrategy = MergeStrategy.MERGE,
+    force: bool = False,
+) -> t.Tuple[Target, FinishT]:
+    """The snippets are built once and written to every directory in `snippets_dirs`"""
+    manifest = ManifestGroup(
+        [BuildManifest.for_dir(d, "vscode", force=force) for d in snippets_dirs]
+    )
+    writer = VSCodeWriter()
+
+    def register_for_file(folder, models: VSCodeSnippets):
+        # Written right away, so the models of the folder can be released
+        for fn in vscode_output_names(folder):
+            for collision in writer.add(fn, models, folder.name):
+                print(
+                    f"[yellow]Duplicate snippet key:[/yellow] {collision.key} in {fn}"
+                    f" from {collision.group}, kept the one from"
+                    f" {collision.previous_group}"
+                )
+
+    def finish(dirty: t.Set[str] | None, dry_run: bool):
+        names = writer.names
+        if dirty is not None:
+            # Outputs no folder contributes to anymore are written empty
+            names = [fn for fn in names if fn in dirty]
+            names.extend(sorted(dirty.difference(names)))
+        try:
+            if dry_run:
+                typer.echo(VSCodeOut.__doc__)
+                writer.echo(partial(typer.echo, nl=False))
+                typer.echo()
+                return
+            writer.write_dirs(
+                snippets_dirs, names, overwrite=strategy == MergeStrategy.OVERWRITE
+            )
+        except JSONCDecodeError as err:
+            on_fail(str(err))
+        finally:
+            writer.cleanup()
+        manifest.save()
+
+    target = Target(
+        name="vscode",
+        templates_dir=snippets_dirs[0],
+        file_to_model=vscode_handle_file,
+        models_callback=vscode_models_callback,
+        collect_callback=register_for_file,
+        print_on_dry_run=False,
+        manifest=manifest,
+        get_outputs=vscode_output_names,
+        options={"strategy": strategy.value},
+    )
+    return target, finish
+
+
+def run_targets(
+    targets: t.Sequence[t.Tuple[Target, FinishT]],
+    folders: t.Sequence[Path],
+    rm_imports: bool,
+    matcher: Matcher | None,
+    dry_run: bool,
+    jobs: int | None,
+    show_skipped: bool = True,
+    profile: Path | None = None,
+    profile_top: int = 10,
+    root: Path | None = None,
+    read_ahead: int = 0,
+):
+    """Builds the targets and finishes them. With a `profile` path, a report of the
+    stage timings is printed and written there as json"""
+    prof = Profile() if profile is not None else None
+    call = prof.call if prof is not None else null_call
+    built = generate_targets(
+        rm_imports=rm_imports,
+        folders=folders,
+        targets=[target for target, _ in targets],
+        matcher=matcher,
+        dry_run=dry_run,
+        jobs=jobs or default_jobs(),
+        show_skipped=show_skipped,
+        profile=prof,
+        root=root,
+        read_ahead=read_ahead,
+    )
+    for (target, finish), dirty_outputs in zip(targets, built):
+        call(f"finish:{target.name}", finish, dirty_outputs, dry_run)
+    if prof is not None:
+        prof.stop()
+        report = prof.report(profile_top)
+        profile.write_text(json.dumps(report, indent=2))
+        print_report(report)
+        print(f"Profile written to {profile}")
+
+
+def make_targets(
+    selected: t.Sequence[str],
+    pycharm_dir: Path | None = None,
+    vscode_dir: Path | None = None,
+    version: str | None = None,
+    group_prefix: str = DEFAULT_PREFIX,
+    strategy: MergeStrategy = MergeStrategy.MERGE,
+    force: bool = False,
+) -> t.List[t.Tuple[Target, FinishT]]:
+    if not selected:
+        on_fail("No targets selected.")
+    build_list = []
+    if "pycharm" in selected:
+        cfg_dir = pycharm_dir or pycharm_config_dir(on_fail=on_fail, version=version)
+        templates_dir = ensure_templates_dir(cfg_dir, "templates", pycharm_dir)
+        build_list.append(pycharm_target(templates_dir, group_prefix, force=force))
+    if "vscode" in selected:
+        cfg_dirs = (vscode_dir,) if vscode_dir else tuple(codium_config_dir())
+        if not cfg_dirs:
+            on_fail("vscodium/vscode not installed.")
+        snippets_dirs = [
+            ensure_templates_dir(ide_config_dir, "snippets", vscode_dir)
+            for ide_config_dir in cfg_dirs
+        ]
+        build_list.append(vscode_target(snippets_dirs, strategy, force=force))
+    return build_list
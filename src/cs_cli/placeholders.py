@@ -0,0 +1,240 @@
+"""Single-pass parsing of snippet placeholders in PyCharm (`$NAME$`) and VSCode
+(extmark, `${1:name}`) syntax.
+
+If a body contains PyCharm variables, it is a PyCharm snippet and only those are
+converted. Otherwise the VSCode placeholders are tokenized in one pass into a tree,
+which supports nested placeholders like `${1:${2:x}}`, choices `${1|a,b|}`, variable
+transforms and escapes. `parse_placeholders` returns the variables and both
+renderings at once and is memoized by content."""
+
+import functools
+import re
+import typing as t
+
+_charm_rgx = re.compile(r"\$([A-Za-z_0-9]+)\$")
+_token_rgx = re.compile(
+    r"""
+    (?P<text>[^$\\}]+)
+    |\$(?:
+        (?P<open>\{(?:(?P<open_index>[0-9]+)|(?P<open_name>[A-Za-z_][A-Za-z_0-9]*))
+            (?P<delim>[}:]))
+        |(?P<tabstop>(?P<tabstop_index>[0-9]+))
+        |(?P<var>(?P<var_name>[A-Za-z_][A-Za-z_0-9]*))
+        |(?P<choice>\{(?P<choice_index>[0-9]+)\|(?P<choice_body>(?:[^|\\]|\\.)*)\|\})
+        |(?P<transform>\{(?P<transform_name>[A-Za-z_][A-Za-z_0-9]*)
+            /(?:[^/\\]|\\.)*/(?:[^/\\]|\\.)*/[a-z]*\})
+    )
+    |(?P<escape>\\[$}\\])
+    |(?P<close>\})
+    |(?P<char>.)
+    """,
+    re.X | re.S,
+)
+_name_rgx = re.compile(r"[A-Za-z_0-9]+")
+_unescape_rgx = re.compile(r"\\(.)", re.S)
+
+
+class Tabstop(t.NamedTuple):
+    index: int
+
+
+class Placeholder(t.NamedTuple):
+    index: int
+    children: t.Tuple[t.Any, ...]
+
+
+class Choice(t.NamedTuple):
+    index: int
+    options: t.Tuple[str, ...]
+
+
+class Variable(t.NamedTuple):
+    """A VSCode variable like `$TM_FILENAME`, with an optional default"""
+
+    name: str
+    children: t.Tuple[t.Any, ...] = ()
+
+
+class VariableSpec(t.NamedTuple):
+    """A PyCharm template variable. `expression` and `default_value` are PyCharm
+    expressions, e.g. `enum("a", "b")` for a choice"""
+
+    name: str
+    expression: str = ""
+    default_value: str = ""
+
+
+class Placeholders(t.NamedTuple):
+    syntax: t.Literal["pycharm", "extmark"]
+    # Unique, in order of appearance
+    variables: t.Tuple[VariableSpec, ...]
+    pycharm: str
+    extmark: str
+
+    @property
+    def names(self) -> t.Tuple[str, ...]:
+        return tuple(v.name for v in self.variables)
+
+
+def _split_choices(body: str) -> t.Tuple[str, ...]:
+    options = []
+    start = 0
+    escaped = False
+    for i, char in enumerate(body):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == ",":
+            options.append(body[start:i])
+            start = i + 1
+    options.append(body[start:])
+    return tuple(_unescape_rgx.sub(r"\1", o) for o in options)
+
+
+def tokenize(content: str) -> t.List[t.Any]:
+    """Parses the VSCode placeholders into a tree of nodes and plain str for text.
+    Unclosed placeholders are kept as text"""
+    root: t.List[t.Any] = []
+    children = root
+    # (node type, index or name, opening source, parent children)
+    stack: t.List[t.Tuple[type, t.Any, str, t.List[t.Any]]] = []
+    for m in _token_rgx.finditer(content):
+        kind = m.lastgroup
+        if kind == "text" or kind == "char":
+            children.append(m.group())
+        elif kind == "open":
+            index, name, delim = m.group("open_index", "open_name", "delim")
+            if delim == "}":
+                children.append(Tabstop(int(index)) if name is None else Variable(name))
+            else:
+                if name is None:
+                    stack.append((Placeholder, int(index), m.group(), children))
+                else:
+                    stack.append((Variable, name, m.group(), children))
+                children = []
+        elif kind == "close":
+            if not stack:
+                children.append("}")
+                continue
+            node_type, key, _, parent = stack.pop()
+            parent.append(node_type(key, tuple(children)))
+            children = parent
+        elif kind == "tabstop":
+            children.append(Tabstop(int(m.group("tabstop_index"))))
+        elif kind == "var":
+            children.append(Variable(m.group("var_name")))
+        elif kind == "escape":
+            children.append(m.group()[1])
+        elif kind == "choice":
+            options = _split_choices(m.group("choice_body"))
+            children.append(Choice(int(m.group("choice_index")), options))
+        else:
+            children.append(Variable(m.group("transform_name")))
+    while stack:
+        _, _, opening, parent = stack.pop()
+        parent.append(opening)
+        parent.extend(children)
+        children = parent
+    return root
+
+
+def _quoted(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _plain_text(nodes: t.Sequence[t.Any]) -> str | None:
+    if len(nodes) == 1 and type(nodes[0]) is str:
+        return nodes[0]
+    if all(type(n) is str for n in nodes):
+        return "".join(nodes)
+    return None
+
+
+def _render_pycharm(
+    nodes: t.Sequence[t.Any], out: t.List[str], specs: t.Dict[str, VariableSpec]
+):
+    for node in nodes:
+        node_type = type(node)
+        if node_type is str:
+            out.append(node.replace("$", "$$"))
+            continue
+        if node_type is Tabstop:
+            out.append(f"${node.index}$")
+            continue
+        if node_type is Choice:
+            expression = "enum(" + ", ".join(map(_quoted, node.options)) + ")"
+            spec = VariableSpec(str(node.index), expression=expression)
+        elif node_type is Variable:
+            text = _plain_text(node.children)
+            spec = VariableSpec(node.name, default_value=_quoted(text) if text else "")
+        else:
+            text = _plain_text(node.children)
+            if text is None:
+                # Nested placeholders: PyCharm has no nesting, keep the inner ones
+                _render_pycharm(node.children, out, specs)
+                continue
+            if not text:
+                out.append(f"${node.index}$")
+                continue
+            if _name_rgx.fullmatch(text):
+                spec = VariableSpec(text)
+            else:
+                spec = VariableSpec(str(node.index), default_value=_quoted(text))
+        known = specs.get(spec.name)
+        if known is None or not (known.expression or known.default_value):
+            specs[spec.name] = spec
+        out.append(f"${spec.name}$")
+
+
+def _render_extmark(content: str, charm: t.Sequence[re.Match]) -> str:
+    """Numbers the PyCharm variables in order of appearance. A name used several
+    times keeps its number, so VSCode mirrors it"""
+    out = []
+    numbers: t.Dict[str, int] = {}
+    count = 0
+    last = 0
+    for m in charm:
+        out.append(content[last : m.start()])
+        last = m.end()
+        name = m.group(1)
+        if name == "0":
+            out.append("$0")
+        elif name.isdigit():
+            count += 1
+            out.append(f"${name}")
+        else:
+            if name not in numbers:
+                count += 1
+                numbers[name] = count
+            out.append(f"${{{numbers[name]}:{name}}}")
+    out.append(content[last:])
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_placeholders(content: str) -> Placeholders:
+    if "$" not in content:
+        return Placeholders("extmark", (), content, content)
+    charm = list(_charm_rgx.finditer(content))
+    if charm:
+        names = dict.fromkeys(m.group(1) for m in charm)
+        return Placeholders(
+            syntax="pycharm",
+            variables=tuple(VariableSpec(n) for n in names),
+            pycharm=content,
+            extmark=_render_extmark(content, charm),
+        )
+    nodes = tokenize(content)
+    if all(type(n) is str for n in nodes):
+        # No placeholders, backslashes are not escapes then
+        return Placeholders("extmark", (), content.replace("$", "$$"), content)
+    out: t.List[str] = []
+    specs: t.Dict[str, VariableSpec] = {}
+    _render_pycharm(nodes, out, specs)
+    return Placeholders(
+        syntax="extmark",
+        variables=tuple(specs.values()),
+        pycharm="".join(out),
+        extmark=content,
+    )
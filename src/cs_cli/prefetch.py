@@ -0,0 +1,44 @@
+"""Reads snippet files ahead of the build with a pool of threads.
+
+On network filesystems like NFS or SSHFS a build spends most of its time waiting for
+each read to return. Reading several files at once hides that latency; the reads
+release the GIL, so threads are enough. At most `concurrency` reads are in flight
+and the contents are handed on in the order of the walk, so the transform and model
+stages see the same input as with plain reads.
+"""
+
+import typing as t
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+ItemT = t.TypeVar("ItemT")
+
+
+def read_text(path: Path) -> str:
+    return path.read_text()
+
+
+def prefetch(
+    items: t.Iterable[ItemT],
+    files_of: t.Callable[[ItemT], t.Sequence[Path]],
+    concurrency: int,
+) -> t.Iterator[t.Tuple[ItemT, t.List[str]]]:
+    """Yields each item with the contents of its files, in the order of `items`.
+    Reads of later items start while earlier ones are consumed, up to `concurrency`
+    files. Items are taken from `items` only as far as needed to keep the readers
+    busy, so a lazy walk stays lazy"""
+    pending: t.Deque[t.Tuple[ItemT, t.List[Future]]] = deque()
+    in_flight = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for item in items:
+            futures = [pool.submit(read_text, f) for f in files_of(item)]
+            pending.append((item, futures))
+            in_flight += len(futures)
+            while pending and in_flight >= concurrency:
+                first, futures = pending.popleft()
+                in_flight -= len(futures)
+                yield first, [future.result() for future in futures]
+        while pending:
+            first, futures = pending.popleft()
+            yield first, [future.result() for future in futures]
@@ -0,0 +1,125 @@
+"""Per-stage timings of a build, enabled with `--profile`.
+
+When profiling is off, the pipeline runs the plain `build_folder`, so none of this is
+on the hot path."""
+
+import contextlib
+import sys
+import time
+import typing as t
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_end = object()
+# (stage, seconds, file or None)
+TimingT = t.Tuple[str, float, t.Optional[Path]]
+
+
+def peak_memory() -> t.Dict[str, int | None]:
+    """Peak resident set size in bytes of this process and its finished workers"""
+    if resource is None:
+        return {"self": None, "children": None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+class Profile:
+    """Collects stage timings in the main process and from the workers.
+
+    Stages timed in workers run in parallel with jobs > 1, so their sum can exceed
+    the wall time."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.stages: t.Dict[str, float] = defaultdict(float)
+        self.files: t.Dict[Path, t.Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self.folders = 0
+
+    def add(self, stage: str, seconds: float, file: Path | None = None):
+        self.stages[stage] += seconds
+        if file is not None:
+            self.files[file][stage] += seconds
+
+    def extend(self, timings: t.Iterable[TimingT]):
+        for stage, seconds, file in timings:
+            self.add(stage, seconds, file)
+
+    @contextlib.contextmanager
+    def timed(self, stage: str, file: Path | None = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, file)
+
+    def iterate(self, stage: str, items: t.Iterable[t.Any]) -> t.Iterator[t.Any]:
+        """Yields the items, timing only the work of producing them"""
+        it = iter(items)
+        while True:
+            with self.timed(stage):
+                item = next(it, _end)
+            if item is _end:
+                return
+            yield item
+
+    def call(self, stage: str, fn: t.Callable, *args):
+        with self.timed(stage):
+            return fn(*args)
+
+    def stop(self):
+        self.end = time.perf_counter()
+
+    def report(self, slowest: int = 10) -> t.Dict[str, t.Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        totals = {f: sum(stages.values()) for f, stages in self.files.items()}
+        ranked = sorted(totals, key=totals.__getitem__, reverse=True)[:slowest]
+        file_total = sum(totals.values())
+        return {
+            "wall_s": end - self.start,
+            "folders": self.folders,
+            "files": len(self.files),
+            "stages_s": dict(sorted(self.stages.items())),
+            "per_file_mean_s": file_total / len(totals) if totals else 0.0,
+            "slowest_files": [
+                {"file": str(f), "total_s": totals[f], "stages_s": dict(self.files[f])}
+                for f in ranked
+            ],
+            "peak_memory_bytes": peak_memory(),
+        }
+
+
+def null_call(stage: str, fn: t.Callable, *args):
+    return fn(*args)
+
+
+def print_report(report: t.Mapping[str, t.Any]):
+    from cs_cli.console import print
+
+    print(
+        f"[bold]Profile:[/bold] {report['wall_s']:.3f}s wall, "
+        f"{report['folders']} folders, {report['files']} files"
+    )
+    for stage, seconds in report["stages_s"].items():
+        print(f"  {stage:24} {seconds:9.4f}s")
+    if report["slowest_files"]:
+        print("[bold]Slowest files:")
+    for entry in report["slowest_files"]:
+        print(f"  {entry['total_s'] * 1e3:9.2f}ms  {entry['file']}")
+    memory = report["peak_memory_bytes"]
+    if memory["self"] is not None:
+        print(
+            f"Peak memory: {memory['self'] / 2**20:.1f} MiB, "
+            f"workers {memory['children'] / 2**20:.1f} MiB"
+        )
@@ -5,3 +5,13 @@ imports_rgx = re.compile(r"^(from |import )")
 
 def remove_python_imports(line: str) -> str | None:
     return None if imports_rgx.search(line) else line
+
+
+# Starts with the newline before the line, which is faster to scan for than ^ in
+# multiline mode
+import_lines_rgx = re.compile(r"\n(?:from|import) [^\n]*")
+
+
+def remove_python_import_lines(text: str) -> str:
+    """Removes the import lines of a text whose lines all end with a newline"""
+    return import_lines_rgx.sub("", "\n" + text)[1:]
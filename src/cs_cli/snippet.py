@@ -0,0 +1,24 @@
+import typing as t
+from pathlib import Path
+
+from cs_cli.config import FolderConfig
+from cs_cli.placeholders import Placeholders, parse_placeholders
+
+
+class Snippet(t.NamedTuple):
+    """Editor independent representation of a snippet file after the transforms.
+    Every editor target is rendered from it, so each file is read only once."""
+
+    name: str
+    group: str
+    body: str
+    file: Path
+    config: FolderConfig
+
+    @property
+    def placeholders(self) -> Placeholders:
+        return parse_placeholders(self.body)
+
+    @property
+    def variables(self) -> t.Tuple[str, ...]:
+        return tuple(sorted(self.placeholders.names))
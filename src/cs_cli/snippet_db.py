@@ -0,0 +1,312 @@
+"""SQLite index of every snippet below a snippets root, used by `cs-cli search`.
+
+Each snippet is stored with its folder, the folder's lang ids, its PyCharm contexts,
+its variables, a content hash and the transformed body, which is searchable through
+an FTS5 table. `update` is incremental: folders are walked from the `FolderIndex` with
+the include and exclude patterns of the builds, files whose mtime and size did not
+change are skipped and changed files are only re-indexed if their hash differs.
+Searching only queries the database.
+"""
+
+import os
+import sqlite3
+import typing as t
+from pathlib import Path
+
+from cs_cli.folder_index import FolderIndex, cache_dir, root_key
+from cs_cli.manifest import content_hash
+
+if t.TYPE_CHECKING:
+    from cs_cli.matcher import Matcher
+
+SCHEMA_VERSION = 3
+
+_schema = """
+CREATE TABLE folders (
+    name TEXT PRIMARY KEY,
+    -- Comma separated with a leading and trailing comma, e.g. ',python,html,'
+    lang_ids TEXT NOT NULL
+);
+CREATE TABLE snippets (
+    id INTEGER PRIMARY KEY,
+    folder TEXT NOT NULL,
+    file TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    -- Per file, as `files` sections of the config may override the folder's
+    contexts TEXT NOT NULL,
+    variables TEXT NOT NULL,
+    body TEXT NOT NULL,
+    UNIQUE (folder, file)
+);
+CREATE VIRTUAL TABLE snippets_fts USING fts5(
+    name, folder, variables, body, content='snippets', content_rowid='id'
+);
+CREATE TRIGGER snippets_ai AFTER INSERT ON snippets BEGIN
+    INSERT INTO snippets_fts(rowid, name, folder, variables, body)
+    VALUES (new.id, new.name, new.folder, new.variables, new.body);
+END;
+CREATE TRIGGER snippets_ad AFTER DELETE ON snippets BEGIN
+    INSERT INTO snippets_fts(snippets_fts, rowid, name, folder, variables, body)
+    VALUES ('delete', old.id, old.name, old.folder, old.variables, old.body);
+END;
+CREATE TRIGGER snippets_au AFTER UPDATE OF name, variables, body ON snippets BEGIN
+    INSERT INTO snippets_fts(snippets_fts, rowid, name, folder, variables, body)
+    VALUES ('delete', old.id, old.name, old.folder, old.variables, old.body);
+    INSERT INTO snippets_fts(rowid, name, folder, variables, body)
+    VALUES (new.id, new.name, new.folder, new.variables, new.body);
+END;
+"""
+
+_search_sql = """
+SELECT s.folder, s.name, s.file, f.lang_ids, s.contexts, s.variables,
+    snippet(snippets_fts, 3, '', '', '...', 12)
+FROM snippets_fts
+JOIN snippets s ON s.id = snippets_fts.rowid
+JOIN folders f ON f.name = s.folder
+WHERE snippets_fts MATCH :query {filters}
+ORDER BY bm25(snippets_fts, 10.0, 4.0, 4.0, 1.0)
+LIMIT :limit
+"""
+
+_list_sql = """
+SELECT s.folder, s.name, s.file, f.lang_ids, s.contexts, s.variables,
+    substr(s.body, 1, 80)
+FROM snippets s
+JOIN folders f ON f.name = s.folder
+WHERE 1 {filters}
+ORDER BY s.folder, s.name
+LIMIT :limit
+"""
+
+
+class UpdateStats(t.NamedTuple):
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+
+
+class SearchHit(t.NamedTuple):
+    folder: str
+    name: str
+    file: str
+    lang_ids: t.Tuple[str, ...]
+    contexts: t.Tuple[str, ...]
+    variables: t.Tuple[str, ...]
+    excerpt: str
+
+
+def _join(values: t.Iterable[str]) -> str:
+    return "," + ",".join(values) + ","
+
+
+def _split(value: str) -> t.Tuple[str, ...]:
+    return tuple(v for v in value.split(",") if v)
+
+
+def fts_query(text: str) -> str:
+    """Turns the words of a query into FTS5 prefix terms that all have to match,
+    so that characters like '-' or '.' are not read as query syntax"""
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+
+class SnippetDB:
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._create()
+
+    @staticmethod
+    def default_path(root: Path) -> Path:
+        return cache_dir() / f"snippets-{root_key(root)}.sqlite3"
+
+    def _create(self):
+        with self.conn:
+            tables = self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+                " AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'snippets_fts_%'"
+            ).fetchall()
+            for (name,) in tables:
+                self.conn.execute(f"DROP TABLE IF EXISTS {name}")
+            self.conn.executescript(_schema)
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM snippets")
+            self.conn.execute("DELETE FROM folders")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(
+        self, index: FolderIndex, matcher: "Matcher | None" = None
+    ) -> UpdateStats:
+        """Brings the database in line with the snippet files below the index root,
+        including nested groups. Pass the `matcher` of the builds, so that the index
+        holds the same files as the editors"""
+        # The pipeline imports pydantic, which searching does not need
+        from cs_cli.pipeline import (
+            file_transforms,
+            folder_lang_ids,
+            reset_configs,
+            snippets_config,
+            transform_content,
+        )
+        from cs_cli.placeholders import parse_placeholders
+        from cs_cli.walk import walk
+
+        transforms = file_transforms(False)
+        reset_configs()
+
+        def read(fn: str, data: bytes) -> t.Tuple[str, str, str]:
+            name, body = transform_content(
+                fn, data.decode(errors="replace"), transforms
+            )
+            return name, " ".join(parse_placeholders(body).names), body
+
+        counts = [0, 0, 0, 0]
+        with self.conn:
+            walked = dict(walk(index.folders(), root=index.root, matcher=matcher))
+            names = {folder.name for folder in walked}
+            known = {r[0] for r in self.conn.execute("SELECT name FROM folders")}
+            for name in known.difference(names):
+                counts[2] += self.conn.execute(
+                    "DELETE FROM snippets WHERE folder = ?", (name,)
+                ).rowcount
+                self.conn.execute("DELETE FROM folders WHERE name = ?", (name,))
+            for folder, files in walked.items():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO folders VALUES (?, ?)",
+                    (folder.name, _join(folder_lang_ids(folder))),
+                )
+                config = snippets_config(folder)
+                contexts = {
+                    f.name: _join(config.for_file(f.name).pycharm_contexts)
+                    for f in files
+                }
+                folder_counts = self._update_folder(folder.name, files, read, contexts)
+                counts = [a + b for a, b in zip(counts, folder_counts)]
+        index.save()
+        return UpdateStats(*counts)
+
+    def _update_folder(
+        self,
+        folder: str,
+        files: t.Sequence[Path],
+        read: t.Callable[[str, bytes], t.Tuple[str, str, str]],
+        contexts: t.Mapping[str, str],
+    ) -> t.Tuple[int, int, int, int]:
+        """`contexts` are the joined PyCharm contexts per file name"""
+        conn = self.conn
+        # file -> (id, mtime_ns, size, hash, contexts)
+        existing = {
+            r[0]: r[1:]
+            for r in conn.execute(
+                "SELECT file, id, mtime_ns, size, hash, contexts FROM snippets"
+                " WHERE folder = ?",
+                (folder,),
+            )
+        }
+        added = updated = unchanged = 0
+        for file in files:
+            fn = file.name
+            st = os.stat(file)
+            old = existing.pop(fn, None)
+            if old and old[4] != contexts[fn]:
+                # The config changed, not the file
+                conn.execute(
+                    "UPDATE snippets SET contexts = ? WHERE id = ?",
+                    (contexts[fn], old[0]),
+                )
+            if old and old[1] == st.st_mtime_ns and old[2] == st.st_size:
+                unchanged += 1
+                continue
+            with open(file, "rb") as f:
+                data = f.read()
+            digest = content_hash(data)
+            if old and old[3] == digest:
+                conn.execute(
+                    "UPDATE snippets SET mtime_ns = ?, size = ? WHERE id = ?",
+                    (st.st_mtime_ns, st.st_size, old[0]),
+                )
+                unchanged += 1
+                continue
+            row = (st.st_mtime_ns, st.st_size, digest, *read(fn, data))
+            if old:
+                conn.execute(
+                    "UPDATE snippets SET mtime_ns = ?, size = ?, hash = ?,"
+                    " name = ?, variables = ?, body = ? WHERE id = ?",
+                    (*row, old[0]),
+                )
+                updated += 1
+            else:
+                conn.execute(
+                    "INSERT INTO snippets (folder, file, mtime_ns, size, hash,"
+                    " name, variables, body, contexts)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (folder, fn, *row, contexts[fn]),
+                )
+                added += 1
+        conn.executemany(
+            "DELETE FROM snippets WHERE id = ?",
+            [(old[0],) for old in existing.values()],
+        )
+        return added, updated, len(existing), unchanged
+
+    def search(
+        self,
+        query: str = "",
+        lang_id: str | None = None,
+        group: str | None = None,
+        limit: int = 20,
+        raw: bool = False,
+    ) -> t.List[SearchHit]:
+        """Snippets matching all words of the query, best matches first. With `raw`,
+        the query is passed to FTS5 as is. Without a query, the snippets are listed"""
+        params: t.Dict[str, t.Any] = {"limit": limit}
+        filters = ""
+        if lang_id:
+            filters += " AND instr(f.lang_ids, :lang_id)"
+            params["lang_id"] = _join((lang_id,))
+        if group:
+            filters += " AND s.folder = :group"
+            params["group"] = group
+        match = query if raw else fts_query(query)
+        if match and group:
+            # Lets FTS5 narrow down the rows before they are ranked
+            match = f"({match}) AND folder : {fts_query(group)[:-1]}"
+        if match:
+            params["query"] = match
+            sql = _search_sql.format(filters=filters)
+        else:
+            sql = _list_sql.format(filters=filters)
+        return [
+            SearchHit(
+                folder,
+                name,
+                file,
+                _split(lang_ids),
+                _split(contexts),
+                tuple(variables.split()),
+                excerpt,
+            )
+            for folder, name, file, lang_ids, contexts, variables, excerpt in (
+                self.conn.execute(sql, params)
+            )
+        ]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT count(*) FROM snippets").fetchone()[0]
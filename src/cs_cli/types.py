@@ -1,5 +1,61 @@
 import typing as t
+from enum import Enum
 from pathlib import Path
 
 StringOrPath = t.Union[str, Path]
 TransformT = t.Callable[[str], str | None]
+# Transforms the whole text of a file, whose lines all end with a newline
+BufferTransformT = t.Callable[[str], str]
+
+
+class MergeStrategy(str, Enum):
+    OVERWRITE = "overwrite"
+    MERGE = "merge"
+
+
+class Editor(str, Enum):
+    PYCHARM = "pycharm"
+    VSCODE = "vscode"
+
+
+class DefaultLangID(str, Enum):
+    """Most of the VSCode supported language ids"""
+
+    BIBTEXT = "bibtex"
+    CLOZURE = "clozure"
+    C = "c"
+    CPP = "cpp"
+    CSHARP = "csharp"
+    COMPOSE = "dockercompose"
+    CSS = "css"
+    DOCKERFILE = "dockerfile"
+    GO = "go"
+    HANDLEBARS = "handlebars"
+    HTML = "html"
+    JAVA = "java"
+    INI = "init"
+    JS = "javascript"
+    JSX = "javascriptreact"
+    LATEX = "latex"
+    LESS = "less"
+    LUA = "lua"
+    MAKEFILE = "makefile"
+    MARKDOWN = "markdown"
+    PLAINTEXT = "plaintext"
+    POWER_SHELL = "powershell"
+    PYTHON = "python"
+    R = "r"
+    RUBY = "ruby"
+    RUST = "rust"
+    SCSS = "scss"
+    SHELL = "shellscript"
+    SQL = "sql"
+    STYLUS = "stylus"
+    SWIFT = "swift"
+    TYPESCRIPT = "typescript"
+    TYPESCRIPT_REACT = "typescriptreact"
+    TEX = "tex"
+    VUE = "vue"
+    XML = "xml"
+    XSL = "xsl"
+    YAML = "yaml"
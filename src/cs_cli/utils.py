@@ -1,7 +1,9 @@
+import os
 import re
 import typing as t
 from pathlib import Path
 
+import typer
 from click import get_app_dir
 
 from cs_cli.types import TransformT
@@ -10,14 +12,14 @@ fn_rgx = re.compile(r"([\w_])\.([a-z]+)$")
 
 
 def snippet_folders(root: Path):
+    """The top-level snippet folders. `DirEntry` knows its type without a stat"""
     exclude = {"tests", "__pycache__", "cs_cli"}
-    for f in root.iterdir():
-        if f.is_file():
-            continue
-        ending = f.name
-        if ending.startswith(".") or ending in exclude:
-            continue
-        yield f
+    with os.scandir(root) as it:
+        for entry in it:
+            name = entry.name
+            if name.startswith(".") or name in exclude or not entry.is_dir():
+                continue
+            yield root / name
 
 
 def file_ending(fn: str, group: int = 2) -> str | None:
@@ -47,3 +49,18 @@ def application_dir(name: str):
     """Fixes click.get_app_dir lowercasing app name for unix"""
     p = Path(get_app_dir(name))
     return p.parent / name
+
+
+def ensure_templates_dir(
+    app_dir: Path, template_folder_name: str, out_dir: Path | None = None
+):
+    from cs_cli.console import print
+
+    templates_dir = out_dir if out_dir else app_dir / template_folder_name
+    if not templates_dir.is_dir():
+        if not out_dir:
+            print(f"{templates_dir.resolve()} does not exist")
+            typer.Exit(1)
+        templates_dir.mkdir()
+    print(f"Snippets path: {templates_dir}")
+    return templates_dir
@@ -0,0 +1,123 @@
+"""Walks snippet folders recursively with `os.scandir`.
+
+Nested folders are groups of their own, named by their path below the snippets root,
+e.g. `python/django`. A folder's config inherits from the `.cs-config.json` files of
+its parents, the nearest one winning per key. `DirEntry` carries the entry type from
+the directory listing, so no extra stat is needed per entry, and each folder is
+yielded as soon as it is listed. Include and exclude patterns are applied while
+walking, see `cs_cli.matcher`.
+"""
+
+import os
+import typing as t
+from pathlib import Path
+
+from cs_cli.constants import IGNORE_FILE, SNIPPET_CONFIG
+from cs_cli.folder_index import excluded_folders
+from cs_cli.matcher import Matcher, RuleSet, read_ignore_file
+
+
+class SnippetFolder(t.NamedTuple):
+    """A folder of snippets found by `walk`"""
+
+    path: Path
+    # The group, e.g. "python/django" for a folder nested in "python"
+    name: str
+    # The existing config files of the folder and its parents, outermost first
+    config_files: t.Tuple[Path, ...] = ()
+
+
+FolderFilesT = t.Tuple[SnippetFolder, t.Tuple[Path, ...]]
+
+
+def _parent_configs(root: Path, parts: t.Sequence[str]) -> t.Tuple[Path, ...]:
+    configs = []
+    path = root
+    for part in (None, *parts):
+        if part is not None:
+            path = path / part
+        config = path / SNIPPET_CONFIG
+        if config.is_file():
+            configs.append(config)
+    return tuple(configs)
+
+
+def walk(
+    folders: t.Iterable[Path],
+    root: Path | None = None,
+    matcher: Matcher | None = None,
+) -> t.Iterator[FolderFilesT]:
+    """Yields each folder and its snippet files, sorted by name, in depth-first
+    order. Folders below `root` are named by their relative path and inherit the
+    configs between `root` and them. Nested folders without files are skipped,
+    the given folders are always yielded.
+
+    The `matcher` and the `.csignore` files of the walked folders are applied to
+    the paths relative to each given folder. Excluded directories are not listed"""
+    matcher = matcher or Matcher()
+    for top in folders:
+        name, configs = top.name, ()
+        if root is not None:
+            try:
+                parts = top.resolve().relative_to(root.resolve()).parts
+            except ValueError:
+                parts = ()
+            if parts:
+                name = "/".join(parts)
+                configs = _parent_configs(root, parts[:-1])
+        yield from _walk(top, name, "", configs, (), matcher, True)
+
+
+def _walk(
+    path: Path,
+    name: str,
+    rel: str,
+    configs: t.Tuple[Path, ...],
+    ignores: t.Tuple[t.Tuple[str, RuleSet], ...],
+    matcher: Matcher,
+    given: bool,
+) -> t.Iterator[FolderFilesT]:
+    files = []
+    dirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            fn = entry.name
+            if fn.startswith("."):
+                if fn == SNIPPET_CONFIG and entry.is_file():
+                    configs = (*configs, path / fn)
+                elif fn == IGNORE_FILE and entry.is_file():
+                    ignores = (*ignores, (rel, read_ignore_file(path / fn)))
+                continue
+            if entry.is_dir():
+                if fn not in excluded_folders:
+                    dirs.append(fn)
+            elif entry.is_file():
+                files.append(fn)
+    files = [fn for fn in files if not matcher.is_excluded(rel + fn, False, ignores)]
+    if files or given:
+        files.sort()
+        yield SnippetFolder(path, name, configs), tuple(path / fn for fn in files)
+    for fn in sorted(dirs):
+        if matcher.is_excluded(rel + fn, True, ignores):
+            continue
+        yield from _walk(
+            path / fn, f"{name}/{fn}", f"{rel}{fn}/", configs, ignores, matcher, False
+        )
+
+
+def iter_dirs(path: Path) -> t.Iterator[Path]:
+    """The directory and all directories below it that `walk` descends into"""
+    yield path
+    try:
+        with os.scandir(path) as it:
+            names = [
+                e.name
+                for e in it
+                if not e.name.startswith(".")
+                and e.name not in excluded_folders
+                and e.is_dir()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    for name in sorted(names):
+        yield from iter_dirs(path / name)
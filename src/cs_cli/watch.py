@@ -0,0 +1,206 @@
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import struct
+import sys
+import time
+import typing as t
+from pathlib import Path
+
+from cs_cli.constants import SNIPPET_CONFIG
+from cs_cli.utils import snippet_folders
+from cs_cli.walk import iter_dirs
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+_event = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Watches the snippets root and its folders, including nested ones, with Linux
+    inotify.
+
+    `changes` blocks until a snippets folder changed or the timeout expired and
+    returns the changed folders, an empty set on timeout. Every folder inherits the
+    config at the root, so a change to it changes all folders."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._libc = _libc()
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._folders: t.Dict[int, Path] = {}
+        self._root_wd = self._add(root)
+        for folder in snippet_folders(root):
+            self._add_tree(folder)
+
+    @classmethod
+    def available(cls) -> bool:
+        return sys.platform.startswith("linux") and _libc() is not None
+
+    def _add(self, path: Path) -> int:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._folders[wd] = path
+        return wd
+
+    def _add_tree(self, path: Path):
+        for folder in iter_dirs(path):
+            self._add(folder)
+
+    def changes(self, timeout: float | None) -> t.Set[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            changed.update(self._parse(data))
+
+    def _parse(self, data: bytes) -> t.Iterator[Path]:
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _event.unpack_from(data, offset)
+            offset += _event.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                yield from snippet_folders(self.root)
+                continue
+            if mask & IN_IGNORED:
+                self._folders.pop(wd, None)
+                continue
+            folder = self._folders.get(wd)
+            if folder is None:
+                continue
+            if name and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                if (folder / name).is_dir():
+                    self._add_tree(folder / name)
+            if wd != self._root_wd:
+                yield folder
+            elif name and mask & IN_ISDIR:
+                yield self.root / name
+            elif name == SNIPPET_CONFIG:
+                yield from snippet_folders(self.root)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Fallback watcher comparing the mtimes and sizes of the snippet files and of
+    the config at the root."""
+
+    def __init__(self, root: Path, interval: float = 1.0):
+        self.root = root
+        self.interval = interval
+        self._state = self._snapshot()
+
+    def _snapshot(self) -> t.Dict[Path, t.Dict[str, t.Tuple[int, int]]]:
+        state = {}
+        try:
+            st = (self.root / SNIPPET_CONFIG).stat()
+            state[self.root] = {SNIPPET_CONFIG: (st.st_mtime_ns, st.st_size)}
+        except FileNotFoundError:
+            pass
+        folders = (d for f in snippet_folders(self.root) for d in iter_dirs(f))
+        for folder in folders:
+            entries = {}
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        st = entry.stat()
+                        entries[entry.name] = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                continue
+            state[folder] = entries
+        return state
+
+    def changes(self, timeout: float | None) -> t.Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.interval
+            if deadline is not None:
+                wait = max(0.0, min(wait, deadline - time.monotonic()))
+            time.sleep(wait)
+            new = self._snapshot()
+            changed = {
+                folder
+                for folder in new.keys() | self._state.keys()
+                if new.get(folder) != self._state.get(folder)
+            }
+            self._state = new
+            if self.root in changed:
+                changed.remove(self.root)
+                changed.update(snippet_folders(self.root))
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+@functools.cache
+def _libc():
+    name = ctypes.util.find_library("c")
+    if not name:
+        return None
+    libc = ctypes.CDLL(name, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
+
+
+def create_watcher(root: Path, polling: bool = False, interval: float = 1.0):
+    if not polling and InotifyWatcher.available():
+        try:
+            return InotifyWatcher(root)
+        except OSError:
+            pass
+    return PollingWatcher(root, interval=interval)
+
+
+def batches(
+    watcher: InotifyWatcher | PollingWatcher, debounce: float = 0.3
+) -> t.Iterator[t.Set[Path]]:
+    """Yields the changed folders, collecting events until none arrived for
+    `debounce` seconds"""
+    while True:
+        changed = watcher.changes(None)
+        while changed:
+            more = watcher.changes(debounce)
+            if not more:
+                break
+            changed |= more
+        if changed:
+            yield changed
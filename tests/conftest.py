@@ -8,11 +8,24 @@ from typing import Optional
 import pytest
 from typer.testing import CliRunner
 
-from cs_cli.constants import SNIPPETS_ROOT_ENV
+from cs_cli.constants import CACHE_DIR_ENV, SNIPPETS_ROOT_ENV
 
 fixture_path = Path(__file__).parent / "fixtures"
 
 
+@pytest.fixture(scope="session", autouse=True)
+def cache_directory(tmp_path_factory):
+    """Keeps the folder index out of the user's cache dir"""
+    path = tmp_path_factory.mktemp("cache")
+    prev = os.environ.get(CACHE_DIR_ENV)
+    os.environ[CACHE_DIR_ENV] = str(path)
+    yield path
+    if prev is None:
+        del os.environ[CACHE_DIR_ENV]
+    else:
+        os.environ[CACHE_DIR_ENV] = prev
+
+
 @pytest.fixture(scope="function")
 def temporary_directory():
     """Provides a temporary directory that is removed after the test."""
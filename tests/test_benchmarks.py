@@ -0,0 +1,49 @@
+from benchmarks import corpus
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from benchmarks.suite import run
+from cs_cli.constants import SNIPPET_CONFIG
+
+
+def test_corpus_is_deterministic(temporary_directory):
+    spec = CorpusSpec(folders=9, files=4, size=200)
+    first = generate_corpus(temporary_directory / "a", spec)
+    second = generate_corpus(temporary_directory / "b", spec)
+    assert [f.name for f in first] == [f.name for f in second]
+    assert any((f / SNIPPET_CONFIG).is_file() for f in first)
+    for a, b in zip(first, second):
+        assert sorted(p.read_text() for p in a.iterdir()) == sorted(
+            p.read_text() for p in b.iterdir()
+        )
+
+
+def test_corpus_cli(temporary_directory, capsys):
+    root = temporary_directory / "corpus"
+    # The defaults of the spec, as in the example of the docstring
+    corpus.main([str(root)])
+    spec = CorpusSpec()
+    assert f"Wrote {spec.folders} folders with {spec.files} files" in (
+        capsys.readouterr().out
+    )
+    corpus.main([str(root / "small"), "--folders", "2", "--seed", "1"])
+    assert len(list((root / "small").iterdir())) == 2
+
+
+def test_suite_runs():
+    results = run(CorpusSpec(folders=2, files=3, size=100), repeat=1)
+    assert results["meta"]["corpus"]["folders"] == 2
+    assert set(results["results"]) >= {"transform_content", "cli_pycharm", "cli_vscode"}
+
+
+def test_search_benchmark_runs():
+    from benchmarks.search import run as run_search
+
+    results = run_search(CorpusSpec(folders=8, files=3, size=100), repeat=1)
+    assert results["index_s"] > 0
+
+
+def test_lang_merge_benchmark_runs():
+    from benchmarks.lang_merge import run as run_lang_merge
+
+    results = run_lang_merge(folders=20, files=3, repeat=1)
+    assert results["snippets"] == 60
+    assert results["streamed_s"] > 0
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from cs_cli.bundle import BUNDLE_MAGIC, Bundle, BundleError, _prelude, _write_atomic
+from cs_cli.main import app
+from tests.test_startup import run_probe
+
+
+def make_bundle(runner, temporary_directory):
+    result = runner.invoke(app, ["bundle", "-j", "1", "--bundle-version", "1.2"])
+    assert result.exit_code == 0, result.output
+    return temporary_directory / "snippets-1.2.csbundle"
+
+
+def test_install_matches_build(runner, temporary_directory):
+    path = make_bundle(runner, temporary_directory)
+    with Bundle(path) as bundle:
+        assert bundle.version == "1.2"
+        assert {g.group: g.snippets for g in bundle.index}["css"] == ("flex",)
+
+    built, installed = temporary_directory / "built", temporary_directory / "installed"
+    for name, command in ((built, "build"), (installed, "install")):
+        args = [command, "--pycharm-dir", str(name), "--vscode-dir", str(name)]
+        if command == "install":
+            args.insert(1, str(path))
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.output
+
+    outputs = sorted(f.name for f in installed.iterdir())
+    assert outputs == sorted(
+        f.name for f in built.iterdir() if not f.name.startswith(".")
+    )
+    for name in outputs:
+        assert (installed / name).read_bytes() == (built / name).read_bytes()
+
+    args = ["install", str(path), "--targets", "vscode", "--vscode-dir", str(installed)]
+    result = runner.invoke(app, args)
+    assert "Everything is up to date" in result.stdout
+
+
+def test_install_merges_vscode_files(runner, temporary_directory):
+    path = make_bundle(runner, temporary_directory)
+    out = temporary_directory / "out"
+    out.mkdir()
+    (out / "css.json").write_text('// mine\n{"mine": {"prefix": ["m"], "body": []}}')
+    args = ["install", str(path), "--targets", "vscode", "--vscode-dir", str(out)]
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0, result.output
+    merged = (out / "css.json").read_text()
+    assert merged.startswith("// mine\n")
+    assert '"css-flex"' in merged
+    assert not list(out.glob("*.xml"))
+
+
+def test_install_rejects_broken_bundles(runner, temporary_directory):
+    path = make_bundle(runner, temporary_directory)
+    data = bytearray(path.read_bytes())
+    data[-2] ^= 0xFF
+    path.write_bytes(bytes(data))
+    out = str(temporary_directory / "out")
+    result = runner.invoke(
+        app, ["install", str(path), "--vscode-dir", out, "--pycharm-dir", out]
+    )
+    assert result.exit_code == 1
+    assert "is corrupt" in result.stdout
+
+    other = temporary_directory / "other.csbundle"
+    other.write_bytes(b"PK\x03\x04")
+    with pytest.raises(BundleError):
+        Bundle(other)
+    other.write_bytes(b"")
+    with pytest.raises(BundleError):
+        Bundle(other)
+
+
+def rename_payload(path, name):
+    with Bundle(path) as bundle:
+        header, start = bundle.header, bundle._data_start
+    header["files"][0]["name"] = name
+    encoded = json.dumps(header).encode()
+    data = path.read_bytes()[start:]
+    path.write_bytes(BUNDLE_MAGIC + _prelude.pack(1, len(encoded)) + encoded + data)
+
+
+@pytest.mark.parametrize(
+    "name", ("../../.bashrc", "/etc/passwd", "..", "sub/css.json", "css.sh")
+)
+def test_bundle_rejects_unsafe_names(runner, temporary_directory, name):
+    path = make_bundle(runner, temporary_directory)
+    rename_payload(path, name)
+    with pytest.raises(BundleError, match="invalid file"):
+        Bundle(path)
+
+
+def test_write_does_not_follow_planted_links(temporary_directory):
+    victim = temporary_directory / "victim"
+    victim.write_text("keep")
+    out = temporary_directory / "out"
+    out.mkdir()
+    (out / ".css.json.tmp").symlink_to(victim)
+    _write_atomic(out / "css.json", b"{}")
+    assert victim.read_text() == "keep"
+    assert (out / "css.json").read_bytes() == b"{}"
+    assert [f.name for f in out.iterdir() if f.name.endswith(".tmp")] == [
+        ".css.json.tmp"
+    ]
+
+
+def test_install_is_lazy(runner, temporary_directory):
+    path = make_bundle(runner, temporary_directory)
+    out = str(temporary_directory / "out")
+    stdout, loaded = run_probe(
+        ["install", str(path), "--pycharm-dir", out, "--vscode-dir", out]
+    )
+    assert "Wrote" in stdout
+    assert set(loaded) <= {"rich"}
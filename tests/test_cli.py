@@ -1,7 +1,10 @@
+import json
+import shutil
 from pathlib import Path
 
 import pytest
 
+from cs_cli import main, pipeline
 from cs_cli.main import app
 from tests.conftest import fixture_path
 
@@ -64,3 +67,175 @@ def test_codium(runner, temporary_directory):
         ],
     )
     assert result.exit_code == 0
+
+
+def test_pycharm_incremental(runner, temporary_directory):
+    src = temporary_directory / "src"
+    shutil.copytree(fixture_path, src)
+    out = temporary_directory / "out"
+    out.mkdir()
+    args = ["pycharm", "--folder", str(src / "n_snips"), "--out-dir", str(out)]
+
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0
+    assert "skipped" not in result.stdout
+    target = out / "cs-n_snips.xml"
+    assert target.is_file()
+
+    result = runner.invoke(app, args)
+    assert "Unchanged, skipped" in result.stdout
+
+    (src / "n_snips" / "snip").write_text("bar $VAR$")
+    result = runner.invoke(app, args)
+    assert "skipped" not in result.stdout
+    assert 'value="bar $VAR$"' in target.read_text()
+
+    result = runner.invoke(app, args + ["--force"])
+    assert "skipped" not in result.stdout
+
+
+def test_codium_incremental(runner, temporary_directory):
+    src = temporary_directory / "src"
+    shutil.copytree(fixture_path, src)
+    out = temporary_directory / "out"
+    out.mkdir()
+    args = ["vscode", "--out-dir", str(out), "--strategy", "overwrite"]
+    args += ["-f", str(src / "codium_only"), "-f", str(src / "css")]
+
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0
+    assert "codium_only-snip" in (out / "rust.json").read_text()
+
+    (src / "codium_only" / ".cs-config.json").write_text('{"vscode_lang_ids": ["r"]}')
+    result = runner.invoke(app, args)
+    assert result.stdout.count("Unchanged, skipped") == 1
+    assert "codium_only-snip" not in (out / "rust.json").read_text()
+    assert "codium_only-snip" in (out / "r.json").read_text()
+
+
+def test_codium_incremental_removed_folders(runner, temporary_directory):
+    src = temporary_directory / "src"
+    for rel in ("a/one", "a/sub/three", "b/two"):
+        (src / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src / rel).write_text(rel)
+    for folder in ("a", "b"):
+        (src / folder / ".cs-config.json").write_text('{"vscode_lang_ids": ["python"]}')
+    out = temporary_directory / "out"
+    out.mkdir()
+    args = ["vscode", "--out-dir", str(out), "--strategy", "overwrite"]
+    env = {"CODE_SNIPPETS_PATH": str(src)}
+
+    result = runner.invoke(app, args, env=env)
+    assert result.exit_code == 0, result.output
+    assert set(json.loads((out / "python.json").read_text())) == {
+        "a-one",
+        "a/sub-three",
+        "b-two",
+    }
+
+    shutil.rmtree(src / "b")
+    (src / "a" / "sub" / "three").unlink()
+    result = runner.invoke(app, args, env=env)
+    assert result.exit_code == 0, result.output
+    assert set(json.loads((out / "python.json").read_text())) == {"a-one"}
+    manifest = json.loads((out / ".cs-manifest-vscode").read_text())
+    assert [Path(f).name for f in manifest["folders"]] == ["a"]
+
+    result = runner.invoke(app, args, env=env)
+    assert "Unchanged, skipped" in result.stdout
+
+
+@pytest.mark.parametrize("command", ("pycharm", "vscode"))
+def test_parallel_output_is_deterministic(runner, temporary_directory, command):
+    args = [command, "--out-dir", str(temporary_directory), "--dry-run"]
+    serial = runner.invoke(app, args + ["--jobs", "1"])
+    parallel = runner.invoke(app, args + ["--jobs", "3"])
+    assert serial.exit_code == 0
+    assert parallel.exit_code == 0
+    assert serial.stdout == parallel.stdout
+
+
+def test_build_reads_each_file_once(runner, temporary_directory, monkeypatch):
+    calls = []
+    handle_file = pipeline.handle_file
+
+    def counting_handle_file(f, **kwargs):
+        calls.append(f.name)
+        return handle_file(f, **kwargs)
+
+    monkeypatch.setattr(pipeline, "handle_file", counting_handle_file)
+    pycharm_dir = temporary_directory / "pycharm"
+    vscode_dir = temporary_directory / "vscode"
+    result = runner.invoke(
+        app,
+        [
+            "build",
+            "--targets",
+            "pycharm,vscode",
+            "--pycharm-dir",
+            str(pycharm_dir),
+            "--vscode-dir",
+            str(vscode_dir),
+            "--jobs",
+            "1",
+        ],
+    )
+    assert result.exit_code == 0
+    assert sorted(calls) == ["flex", "snip", "snip"]
+    assert (pycharm_dir / "cs-n_snips.xml").is_file()
+    assert (vscode_dir / "css.json").is_file()
+    assert (vscode_dir / "rust.json").is_file()
+
+
+def test_build_unknown_target(runner):
+    result = runner.invoke(app, ["build", "--targets", "vim", "--dry-run"])
+    assert result.exit_code != 0
+
+
+def test_codium_fans_out_to_all_config_dirs(runner, temporary_directory, monkeypatch):
+    cfg_dirs = [temporary_directory / name for name in ("VSCodium", "Code")]
+    for cfg_dir in cfg_dirs:
+        (cfg_dir / "snippets").mkdir(parents=True)
+    monkeypatch.setattr(main, "codium_config_dir", lambda: iter(cfg_dirs))
+    calls = []
+    handle_file = pipeline.handle_file
+
+    def counting_handle_file(f, **kwargs):
+        calls.append(f.name)
+        return handle_file(f, **kwargs)
+
+    monkeypatch.setattr(pipeline, "handle_file", counting_handle_file)
+    result = runner.invoke(app, ["vscode", "--jobs", "1"])
+    assert result.exit_code == 0
+    assert len(calls) == 3
+    first, second = (d / "snippets" / "rust.json" for d in cfg_dirs)
+    assert first.read_bytes() == second.read_bytes()
+
+
+@pytest.mark.parametrize("jobs", ("1", "2"))
+def test_build_profile_report(runner, temporary_directory, jobs):
+    report_file = temporary_directory / "profile.json"
+    result = runner.invoke(
+        app,
+        [
+            "build",
+            "--pycharm-dir",
+            str(temporary_directory / "pycharm"),
+            "--vscode-dir",
+            str(temporary_directory / "vscode"),
+            "--profile",
+            str(report_file),
+            "--profile-top",
+            "2",
+            "-j",
+            jobs,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    report = json.loads(report_file.read_text())
+    assert report["folders"] == 3
+    assert report["files"] == 3
+    assert len(report["slowest_files"]) == 2
+    for stage in ("walk", "read", "transform", "validate:pycharm", "write:pycharm"):
+        assert stage in report["stages_s"]
+    assert "finish:vscode" in report["stages_s"]
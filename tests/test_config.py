@@ -0,0 +1,81 @@
+from cs_cli.charm_models import template_context
+from cs_cli.config import ConfigResolver
+from cs_cli.main import app
+from cs_cli.walk import walk
+
+
+def make_tree(root):
+    for rel, content in {
+        ".cs-config.json": '{"files": {"*.sh": {"pycharm_contexts": ["SHELL_SCRIPT"]}}}',
+        "python/.cs-config.json": '{"pycharm_contexts": ["Python"]}',
+        "python/main": "if __name__ == '__main__':",
+        "python/run.sh": "python -m $MODULE$",
+        "python/django/.cs-config.json": (
+            '{"vscode_lang_ids": ["python"],'
+            ' "files": {"*.html": {"pycharm_contexts": ["HTML"]}}}'
+        ),
+        "python/django/view.py": "def view(request): ...",
+        "python/django/block.html": "{% block $NAME$ %}{% endblock %}",
+        "python/django/manage.sh": "./manage.py $CMD$",
+        "python/django/templates/base.html": "<html></html>",
+    }.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def walked(root):
+    return {f.name: f for f, _ in walk([root / "python"], root=root)}
+
+
+def test_inherits_root_and_parent_configs(temporary_directory):
+    make_tree(temporary_directory)
+    folders = walked(temporary_directory)
+    resolver = ConfigResolver()
+    config = resolver.resolve(folders["python/django"])
+    assert config.pycharm_contexts == ("Python",)
+    assert config.vscode_lang_ids == ("python",)
+    assert config.template_context is template_context(("Python",))
+    assert config.for_file("view.py") is config
+    # Overrides of the root and the nearer config are merged per pattern
+    assert config.for_file("manage.sh").pycharm_contexts == ("SHELL_SCRIPT",)
+    assert config.for_file("block.html").pycharm_contexts == ("HTML",)
+    assert config.for_file("block.html").vscode_lang_ids == ("python",)
+    parent = resolver.resolve(folders["python"])
+    assert parent.for_file("run.sh").template_context is template_context(
+        ("SHELL_SCRIPT",)
+    )
+    assert parent.for_file("block.html") is parent
+
+
+def test_configs_are_read_once_and_shared(temporary_directory):
+    make_tree(temporary_directory)
+    folders = walked(temporary_directory)
+    resolver = ConfigResolver()
+    config = resolver.resolve(folders["python/django"])
+    # Same config files, same object
+    assert resolver.resolve(folders["python/django/templates"]) is config
+    (temporary_directory / "python" / ".cs-config.json").write_text(
+        '{"pycharm_contexts": ["Django"]}'
+    )
+    assert resolver.resolve(folders["python"]).pycharm_contexts == ("Python",)
+    # The next run reads it again
+    assert ConfigResolver().resolve(folders["python"]).pycharm_contexts == ("Django",)
+
+
+def test_build_uses_file_overrides(runner, temporary_directory):
+    root = temporary_directory / "root"
+    make_tree(root)
+    out = temporary_directory / "out"
+    result = runner.invoke(
+        app,
+        ["pycharm", "--out-dir", str(out), "-j", "2"],
+        env={"CODE_SNIPPETS_PATH": str(root)},
+    )
+    assert result.exit_code == 0, result.output
+    xml = (out / "cs-python-django.xml").read_text()
+    templates = xml.split("<template ")[1:]
+    [manage] = [t for t in templates if 'name="manage"' in t]
+    assert '<option name="SHELL_SCRIPT" value="true" />' in manage
+    [view] = [t for t in templates if 'name="view"' in t]
+    assert '<option name="Python" value="true" />' in view
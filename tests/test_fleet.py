@@ -0,0 +1,97 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from cs_cli.charm import charm_config_base
+from cs_cli.codium import codium_config_base, vscode_config_base
+from cs_cli.fleet import expand_homes
+from cs_cli.main import app
+
+
+def in_home(home, base):
+    return home / base.relative_to(Path.home())
+
+
+def make_homes(root):
+    homes = root / "homes"
+    alice, bob, carol = (homes / name for name in ("alice", "bob", "carol"))
+    (in_home(alice, charm_config_base) / "PyCharm2023.2").mkdir(parents=True)
+    in_home(alice, codium_config_base).mkdir(parents=True)
+    in_home(bob, codium_config_base).mkdir(parents=True)
+    in_home(bob, vscode_config_base).mkdir(parents=True)
+    carol.mkdir()
+    return alice, bob, carol
+
+
+def test_expand_homes(temporary_directory):
+    alice, bob, carol = make_homes(temporary_directory)
+    (temporary_directory / "homes" / "file").write_text("")
+    pattern = str(temporary_directory / "homes" / "*")
+    assert expand_homes([str(bob), pattern, "/does/not/exist"]) == [bob, alice, carol]
+
+
+def test_fleet_install(runner, temporary_directory):
+    alice, bob, carol = make_homes(temporary_directory)
+    user_snippets = in_home(bob, vscode_config_base) / "snippets" / "css.json"
+    user_snippets.parent.mkdir()
+    user_snippets.write_text('{"mine": {"prefix": ["m"], "body": []}}')
+    args = ["fleet", str(temporary_directory / "homes" / "*"), "-j", "1"]
+
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0, result.output
+    lines = [li for li in result.stdout.splitlines() if "/homes/" in li]
+    assert len(lines) == 6
+    assert "alice pycharm: 3 written, 0 unchanged in 1 dirs" in result.stdout
+    assert "bob vscode: 8 written, 0 unchanged in 2 dirs" in result.stdout
+    assert "bob pycharm: skipped" in result.stdout
+    assert "carol vscode: skipped, vscodium/vscode not installed" in result.stdout
+    assert "Installed into 2 of 3 homes" in result.stdout
+
+    templates = in_home(alice, charm_config_base) / "PyCharm2023.2" / "templates"
+    assert (templates / "cs-css.xml").is_file()
+    assert set(json.loads(user_snippets.read_text())) == {"mine", "css-flex"}
+
+    result = runner.invoke(app, args + ["--targets", "vscode"])
+    assert "bob vscode: 0 written, 8 unchanged in 2 dirs" in result.stdout
+
+
+def test_fleet_does_not_follow_links(runner, temporary_directory):
+    alice, bob, _ = make_homes(temporary_directory)
+    outside = temporary_directory / "outside"
+    outside.mkdir()
+    victim = outside / "victim"
+    victim.write_text("keep")
+    # A link planted as file and at the old fixed temp name
+    snippets = in_home(bob, codium_config_base) / "snippets"
+    snippets.mkdir()
+    (snippets / "css.json").symlink_to(victim)
+    (snippets / ".css.json.tmp").symlink_to(victim)
+    # A snippets directory leading out of the home
+    (in_home(alice, codium_config_base) / "snippets").symlink_to(outside)
+    args = ["fleet", str(alice), str(bob), "--targets", "vscode", "-j", "1"]
+
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0, result.output
+    assert "alice vscode: skipped" in result.stdout
+    assert "leads out of" in result.stdout
+    assert "bob vscode: skipped" in result.stdout
+    assert "refusing to follow a link" in result.stdout
+    assert victim.read_text() == "keep"
+    assert [f.name for f in outside.iterdir()] == ["victim"]
+    assert (snippets / "css.json").is_symlink()
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root"
+)
+def test_fleet_refuses_foreign_directories(runner, temporary_directory):
+    _, bob, _ = make_homes(temporary_directory)
+    snippets = in_home(bob, codium_config_base) / "snippets"
+    snippets.mkdir()
+    os.chown(snippets, 12345, 12345)
+    args = ["fleet", str(bob), "--targets", "vscode", "-j", "1"]
+    result = runner.invoke(app, args)
+    assert "is not owned by the owner of" in result.stdout
+    assert not list(snippets.iterdir())
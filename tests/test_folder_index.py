@@ -0,0 +1,71 @@
+import json
+import os
+
+from cs_cli import folder_index
+from cs_cli.constants import SNIPPET_CONFIG
+from cs_cli.folder_index import FolderIndex
+
+
+def test_index_is_reused_until_root_changes(temporary_directory, monkeypatch):
+    root = temporary_directory / "snippets"
+    (root / "python").mkdir(parents=True)
+    (root / "python" / "a.py").write_text("a")
+    (root / ".git").mkdir()
+    path = temporary_directory / "index.json"
+
+    index = FolderIndex(root, path)
+    assert index.names() == ("python",)
+    assert index.info("python").lang_ids == ("python",)
+    index.save()
+
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(
+        folder_index.os, "scandir", lambda p: scans.append(p) or scandir(p)
+    )
+    index = FolderIndex(root, path)
+    assert index.names() == ("python",)
+    assert index.info("python").files == 1
+    assert scans == []
+
+    (root / "django").mkdir()
+    os.utime(root, ns=(0, os.stat(root).st_mtime_ns + 1))
+    (root / "django" / SNIPPET_CONFIG).write_text(
+        json.dumps({"vscode_lang_ids": ["python", "html"]})
+    )
+    assert index.names() == ("django", "python")
+    assert index.info("django").lang_ids == ("python", "html")
+    assert index.info("django").files == 0
+
+
+def test_info_inherits_root_config_like_builds(temporary_directory):
+    from cs_cli.pipeline import folder_lang_ids, reset_configs
+    from cs_cli.walk import walk
+
+    root = temporary_directory / "snippets"
+    for name in ("python", "tools", "css"):
+        (root / name).mkdir(parents=True)
+        (root / name / "snip").write_text("x")
+    (root / "css" / SNIPPET_CONFIG).write_text('{"vscode_lang_ids": ["scss"]}')
+    config = root / SNIPPET_CONFIG
+    config.write_text('{"vscode_lang_ids": ["shellscript"]}')
+    path = temporary_directory / "index.json"
+
+    def resolved():
+        index = FolderIndex(root, path)
+        infos = {name: index.info(name).lang_ids for name in index.names()}
+        index.save()
+        reset_configs()
+        walked = walk(index.folders(), root=root)
+        assert infos == {f.name: folder_lang_ids(f) for f, _ in walked}
+        return infos
+
+    assert resolved() == {
+        "css": ("scss",),
+        "python": ("shellscript",),
+        "tools": ("shellscript",),
+    }
+    config.write_text('{"pycharm_contexts": ["Python"]}')
+    os.utime(config, ns=(0, os.stat(config).st_mtime_ns + 1))
+    assert resolved()["python"] == ("python",)
+    assert resolved()["tools"] == ()
@@ -0,0 +1,141 @@
+import io
+import json
+
+import pytest
+
+from cs_cli.importer import (
+    ImportedSnippet,
+    SnippetWriter,
+    iter_pycharm_templates,
+    iter_vscode_snippets,
+)
+from cs_cli.jsonc import JSONCDecodeError, iter_members, loads
+from cs_cli.main import app
+from tests.conftest import fixture_path
+
+jsonc_doc = """// header
+{
+  /* c */ "a": {"prefix": ["x"], "body": ["l1", "l2"]}, // trailing
+  "b": 12345,
+  "c": {"x": [1, 2,],},
+  "d": "s\\"q",
+}
+// end"""
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 3, 7, 1024))
+def test_iter_members(chunk_size):
+    members = iter_members(io.StringIO(jsonc_doc), chunk_size)
+    assert dict(members) == loads(jsonc_doc)
+
+
+@pytest.mark.parametrize("doc", ('{"a" 1}', '{"a": 1', "[1]", '{"a": 1} x'))
+def test_iter_members_invalid(doc):
+    with pytest.raises(JSONCDecodeError):
+        list(iter_members(io.StringIO(doc), 2))
+
+
+def test_iter_pycharm_templates(temporary_directory):
+    xml = temporary_directory / "cs-python.xml"
+    xml.write_text(
+        """<templateSet group="cs-python">
+  <template name="dc" value="@dataclass&#10;class $NAME$:" description="">
+    <variable name="NAME" expression="" defaultValue="" alwaysStopAt="true" />
+    <context>
+      <option name="Python" value="true" />
+      <option name="HTML" value="false" />
+      <option name="KOTLIN" value="true" />
+    </context>
+  </template>
+  <template name="any" value="x" />
+</templateSet>"""
+    )
+    unknown = []
+    first, second = iter_pycharm_templates(xml, on_unknown_context=unknown.append)
+    assert first.group == "python"
+    assert first.body == "@dataclass\nclass $NAME$:"
+    assert first.pycharm_contexts == ("Python",)
+    assert second.pycharm_contexts == ("OTHER",)
+    assert unknown == ["KOTLIN"]
+
+
+def test_iter_vscode_snippets(temporary_directory):
+    f = temporary_directory / "python.json"
+    f.write_text(
+        json.dumps(
+            {
+                "py-main": {"prefix": ["main"], "body": ["if x:", "\tpass"]},
+                "n_snips-snip": {
+                    "prefix": ["snip"],
+                    "body": "foo",
+                    "description": "from n_snips/snip",
+                },
+            }
+        )
+    )
+    first, second = iter_vscode_snippets(f)
+    assert first == ("python", "main", "if x:\n\tpass", (), ("python",))
+    assert second.group == "n_snips"
+    assert second.name == "snip"
+
+
+def test_snippet_writer(temporary_directory):
+    (temporary_directory / "r").mkdir()
+    (temporary_directory / "r" / ".cs-config.json").write_text(
+        '{"vscode_lang_ids": ["r"]}'
+    )
+    writer = SnippetWriter(temporary_directory)
+    snippet = ImportedSnippet("r", ".hidden/name", "body", vscode_lang_ids=("r",))
+    assert writer.add(snippet) == temporary_directory / "r" / "hidden_name"
+    assert writer.add(snippet._replace(vscode_lang_ids=("rmd",))) is None
+    stats = writer.finish()
+    assert (stats.written, stats.duplicates) == (1, 1)
+    config = json.loads((temporary_directory / "r" / ".cs-config.json").read_text())
+    assert config == {"vscode_lang_ids": ["r", "rmd"]}
+
+
+@pytest.mark.parametrize("editor", ("pycharm", "vscode"))
+def test_import_round_trip(runner, temporary_directory, editor):
+    built = temporary_directory / "built"
+    result = runner.invoke(app, [editor, "--out-dir", str(built)])
+    assert result.exit_code == 0, result.output
+
+    imported = temporary_directory / "imported"
+    args = ["import", editor, str(built), "--out-dir", str(imported)]
+    result = runner.invoke(app, args)
+    assert result.exit_code == 0, result.output
+    for folder in ("n_snips", "css", "codium_only"):
+        for f in (fixture_path / folder).iterdir():
+            if not f.name.startswith("."):
+                copy = imported / folder / f.name
+                assert copy.read_text().strip() == f.read_text().strip()
+
+    config = imported / "n_snips" / ".cs-config.json"
+    codium_config = imported / "codium_only" / ".cs-config.json"
+    if editor == "pycharm":
+        contexts = json.loads(config.read_text())["pycharm_contexts"]
+        assert contexts == ["Python", "ECMAScript6"]
+        assert not codium_config.exists()
+    else:
+        lang_ids = json.loads(codium_config.read_text())["vscode_lang_ids"]
+        assert sorted(lang_ids) == ["r", "rust"]
+        assert not config.exists()
+    assert not (imported / "css" / ".cs-config.json").exists()
+
+    result = runner.invoke(app, args)
+    assert "0 snippets written" in result.stdout
+
+
+def test_import_keeps_changed_files(runner, temporary_directory):
+    built = temporary_directory / "built"
+    runner.invoke(app, ["vscode", "--out-dir", str(built)])
+    imported = temporary_directory / "imported"
+    (imported / "css").mkdir(parents=True)
+    (imported / "css" / "flex").write_text("mine")
+    args = ["import", "vscode", str(built / "css.json"), "--out-dir", str(imported)]
+
+    result = runner.invoke(app, args + ["--dry-run"])
+    assert "Exists, kept" in result.stdout
+    result = runner.invoke(app, args + ["--overwrite"])
+    assert result.exit_code == 0
+    assert (imported / "css" / "flex").read_text() != "mine"
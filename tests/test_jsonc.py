@@ -0,0 +1,120 @@
+import json
+from textwrap import dedent
+
+import pytest
+
+from cs_cli.codium_models import VSCodeOut, VSCodeSnippets, VSCodeWriter
+from cs_cli.jsonc import JSONCDecodeError, ObjectWriter, loads, merge_object
+
+user_snippets = dedent(
+    """\
+    // Place your snippets here
+    {
+      /* written by the user */
+      "mine": {"prefix": ["mine"], "body": ["x"]},
+      "cs-snip": {
+        "prefix": ["snip"],
+        "body": ["old"],
+      }, // managed by cs-cli
+    }
+    """
+)
+
+
+def test_loads_jsonc():
+    data = loads(user_snippets)
+    assert list(data) == ["mine", "cs-snip"]
+    assert data["cs-snip"]["body"] == ["old"]
+    with pytest.raises(JSONCDecodeError):
+        loads('{"a": 1 /* unterminated')
+
+
+def test_merge_keeps_comments_and_order():
+    updates = {
+        "cs-snip": {"prefix": ["snip"], "body": ["new"]},
+        "cs-other": {"prefix": ["other"], "body": []},
+    }
+    merged = merge_object(user_snippets, updates)
+    assert "// Place your snippets here" in merged
+    assert "/* written by the user */" in merged
+    assert '"mine": {"prefix": ["mine"], "body": ["x"]},' in merged
+    assert "}, // managed by cs-cli\n" in merged
+    data = loads(merged)
+    assert list(data) == ["mine", "cs-snip", "cs-other"]
+    assert data["cs-snip"]["body"] == ["new"]
+
+
+def test_merge_without_changes_is_identical():
+    updates = {"cs-snip": {"prefix": ["snip"], "body": ["old"]}}
+    assert merge_object(user_snippets, updates) == user_snippets
+    assert merge_object("{}", updates) == json.dumps(updates, indent=2)
+
+
+def test_write_files_only_rewrites_changes(temporary_directory):
+    def out(body):
+        snippets = {"cs-snip": {"prefix": ["snip"], "body": body}}
+        return VSCodeOut.parse_obj({"python.json": snippets})
+
+    file = temporary_directory / "python.json"
+    assert out(["old"]).write_files(temporary_directory, False) == ["python.json"]
+    file.write_text("// user comment\n" + file.read_text())
+    assert out(["old"]).write_files(temporary_directory, False) == []
+    assert out(["new"]).write_files(temporary_directory, False) == ["python.json"]
+    assert file.read_text().startswith("// user comment\n")
+    assert loads(file.read_text())["cs-snip"]["body"] == ["new"]
+
+
+@pytest.mark.parametrize("obj", ({}, {"a": 1}, {"a": {"b": [1, "x\n"]}, "ä": []}))
+def test_object_writer_matches_dumps(obj):
+    parts = []
+    writer = ObjectWriter(parts.append)
+    for key, value in obj.items():
+        writer.add(key, value)
+    writer.close()
+    assert "".join(parts) == json.dumps(obj, indent=2)
+
+
+def test_vscode_writer_matches_vscode_out(temporary_directory):
+    def snippets(*names):
+        data = {n: {"prefix": [n], "body": [n, "$0"]} for n in names}
+        return VSCodeSnippets.parse_obj(data)
+
+    first, second = snippets("a-x", "a-y"), snippets("b-x")
+    expected = VSCodeOut.parse_obj({"python.json": first + second, "r.json": first})
+    writer = VSCodeWriter()
+    writer.add("python.json", first)
+    writer.add("r.json", first)
+    writer.add("python.json", second)
+    parts = []
+    writer.echo(parts.append)
+    assert "".join(parts) == expected.json(indent=2)
+
+    streamed, accumulated = temporary_directory / "a", temporary_directory / "b"
+    streamed.mkdir()
+    accumulated.mkdir()
+    (streamed / "r.json").write_text('// mine\n{"mine": {"prefix": ["m"], "body": []}}')
+    written = writer.write_dirs(
+        [streamed], ["python.json", "r.json", "old.json"], False
+    )
+    expected.write_files(accumulated)
+    assert written[streamed] == ["python.json", "r.json", "old.json"]
+    assert (streamed / "python.json").read_text() == (
+        accumulated / "python.json"
+    ).read_text()
+    assert list(loads((streamed / "r.json").read_text())) == ["mine", "a-x", "a-y"]
+    assert (streamed / "old.json").read_text() == "{}"
+    writer.cleanup()
+
+
+def test_vscode_writer_reports_key_collisions():
+    def snippets(*keys):
+        return VSCodeSnippets.parse_obj({k: {"prefix": [k], "body": [k]} for k in keys})
+
+    writer = VSCodeWriter()
+    assert writer.add("python.json", snippets("a-b-c", "a-b-d"), "a-b") == []
+    assert writer.add("python.json", snippets("a-b-d"), "a-b") == []
+    [collision] = writer.add("python.json", snippets("a-b-c", "a-x"), "a")
+    assert collision == ("python.json", "a-b-c", "a", "a-b")
+    assert writer.add("r.json", snippets("a-b-c"), "a") == []
+    assert list(json.loads(writer.render("python.json"))) == ["a-b-c", "a-b-d", "a-x"]
+    writer.cleanup()
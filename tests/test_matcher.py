@@ -0,0 +1,119 @@
+import pytest
+
+from cs_cli.main import app
+from cs_cli.matcher import Matcher, RuleSet, parse_ignore_file, parse_pattern
+from cs_cli.walk import walk
+
+
+@pytest.mark.parametrize(
+    "pattern, path, is_dir, expected",
+    (
+        ("*.json", "a.json", False, True),
+        ("*.json", "sub/a.json", False, True),
+        ("*.json", "a.jsonc", False, None),
+        ("/*.json", "sub/a.json", False, None),
+        ("sub/*.py", "sub/a.py", False, True),
+        ("sub/*.py", "x/sub/a.py", False, None),
+        ("**/tests", "a/b/tests", True, True),
+        ("docs/**", "docs/a/b", False, True),
+        ("build/", "build", True, True),
+        ("build/", "build", False, None),
+        ("a?c", "abc", False, True),
+        ("[!a]b", "ab", False, None),
+        ("re:\\.(md|txt)$", "sub/readme.md", False, True),
+        ("re:(?i)readme", "sub/README.md", False, True),
+        ("re:(a)\\1", "aa", False, True),
+        ("re:(a)\\1", "ab", False, None),
+        ("!keep.json", "keep.json", False, False),
+    ),
+)
+def test_parse_pattern(pattern, path, is_dir, expected):
+    assert RuleSet([parse_pattern(pattern)]).match(path, is_dir) is expected
+
+
+def test_last_rule_wins():
+    rules = RuleSet(parse_ignore_file("# comment\n*.json\n!keep.json\n\\#x\n"))
+    assert [r.pattern for r in rules.rules] == ["*.json", "!keep.json", "#x"]
+    assert rules.match("a.json") is True
+    assert rules.match("keep.json") is False
+    assert rules.match("#x") is True
+    assert rules.match("a.py") is None
+
+
+def test_regex_rules_keep_their_order():
+    rules = RuleSet(
+        [parse_pattern(p) for p in ("re:(?i)\\.md$", "!keep*", "*.bak", "!re:^x")]
+    )
+    assert rules.match("A.MD") is True
+    assert rules.match("keep.md") is False
+    assert rules.match("a.bak") is True
+    assert rules.match("x.bak") is False
+
+
+@pytest.mark.parametrize(
+    "args", (["--exclude-rgx", "(?i)readme"], ["-e", "re:(?i)readme"])
+)
+def test_cli_accepts_regex_flags(runner, temporary_directory, args):
+    src = temporary_directory / "src"
+    src.mkdir()
+    (src / "README").write_text("x")
+    (src / "snip").write_text("x")
+    result = runner.invoke(
+        app, ["vscode", "-f", str(src), "--out-dir", str(temporary_directory)] + args
+    )
+    assert result.exit_code == 0, result.output
+    assert "File: snip" in result.stdout
+    assert "README" not in result.stdout
+
+
+def test_matcher_include_and_exclude():
+    matcher = Matcher(["tmp/", "*.bak"], ["*.py", "*.sh"])
+    assert matcher.is_excluded("tmp", True)
+    assert not matcher.is_excluded("src", True)
+    assert matcher.is_excluded("a.py.bak", False)
+    assert matcher.is_excluded("readme", False)
+    assert not matcher.is_excluded("src/a.py", False)
+    # The nearest .csignore file decides before the command line patterns
+    ignores = (("", RuleSet(parse_ignore_file("!*.bak"))),)
+    assert matcher.is_excluded("a.bak", False, ignores)
+    assert not Matcher(["*.bak"]).is_excluded("a.bak", False, ignores)
+
+
+def test_walk_applies_csignore(temporary_directory):
+    for rel in ("s/a", "s/b.json", "s/skip/x", "s/sub/c", "s/sub/d.txt", "s/sub/e"):
+        path = temporary_directory / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    (temporary_directory / "s" / ".csignore").write_text("skip/\n*.txt\n")
+    (temporary_directory / "s" / "sub" / ".csignore").write_text("/e\n!d.txt\n")
+    walked = {
+        folder.name: [f.name for f in files]
+        for folder, files in walk(
+            [temporary_directory / "s"], matcher=Matcher(["*.json"])
+        )
+    }
+    assert walked == {"s": ["a"], "s/sub": ["c", "d.txt"]}
+
+
+def test_default_exclude_skips_json(runner, temporary_directory):
+    root = temporary_directory / "root"
+    (root / "css").mkdir(parents=True)
+    (root / "css" / "flex").write_text("display: flex;")
+    (root / "css" / "data.json").write_text("{}")
+    out = temporary_directory / "out"
+    env = {"CODE_SNIPPETS_PATH": str(root)}
+    result = runner.invoke(app, ["vscode", "--out-dir", str(out)], env=env)
+    assert result.exit_code == 0, result.output
+    assert "data" not in (out / "css.json").read_text()
+
+    out = temporary_directory / "included"
+    args = ["vscode", "--out-dir", str(out), "-i", "*.json", "--exclude", "x"]
+    result = runner.invoke(app, args, env=env)
+    assert "css-data" in (out / "css.json").read_text()
+    assert "css-flex" not in (out / "css.json").read_text()
+
+    result = runner.invoke(
+        app, ["vscode", "--out-dir", str(out), "-e", "re:("], env=env
+    )
+    assert result.exit_code != 0
+    assert "Invalid pattern" in result.output
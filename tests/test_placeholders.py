@@ -0,0 +1,53 @@
+import pytest
+
+from cs_cli.charm_models import CharmTemplate
+from cs_cli.placeholders import VariableSpec, parse_placeholders
+
+
+@pytest.mark.parametrize(
+    "content,pycharm,names",
+    (
+        ("${1:${2:x}}", "$x$", ("x",)),
+        ("${1:foo ${2:bar}} baz", "foo $bar$ baz", ("bar",)),
+        ("${1|a,b|} ${2:foo bar}", "$1$ $2$", ("1", "2")),
+        (
+            "${TM_FILENAME/(.*)/$1/} $HOME",
+            "$TM_FILENAME$ $HOME$",
+            ("TM_FILENAME", "HOME"),
+        ),
+        ("\\$5 costs ${1:x}\\}", "$$5 costs $x$}", ("x",)),
+        ("${1:unclosed", "$${1:unclosed", ()),
+        ("a\\\\b $", "a\\\\b $$", ()),
+    ),
+)
+def test_extmark_to_pycharm(content, pycharm, names):
+    placeholders = parse_placeholders(content)
+    assert placeholders.syntax == "extmark"
+    assert placeholders.pycharm == pycharm
+    assert placeholders.names == names
+    assert placeholders.extmark == content
+
+
+def test_pycharm_to_extmark_mirrors_repeated_names():
+    placeholders = parse_placeholders("$var$ = '{$var$}' $0$ $other$")
+    assert placeholders.syntax == "pycharm"
+    assert placeholders.extmark == "${1:var} = '{${1:var}}' $0 ${2:other}"
+    assert placeholders.names == ("var", "0", "other")
+
+
+def test_choices_and_defaults_become_variable_expressions():
+    assert parse_placeholders("${1|a,b\\,c|} ${2:foo bar}").variables == (
+        VariableSpec("1", expression='enum("a", "b,c")'),
+        VariableSpec("2", default_value='"foo bar"'),
+    )
+    template = CharmTemplate(name="t", value='${1|x,y|} ${2:say "hi"}')
+    assert template.value == "$1$ $2$"
+    assert [(v.name, v.expression, v.defaultValue) for v in template.variables] == [
+        ("1", 'enum("x", "y")', ""),
+        ("2", "", '"say \\"hi\\""'),
+    ]
+
+
+def test_parse_is_memoized():
+    content = "for ${1:item} in ${2:items}:"
+    assert parse_placeholders(content) is parse_placeholders(content)
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from cs_cli import prefetch as prefetch_module
+from cs_cli.main import app
+from cs_cli.prefetch import prefetch
+
+
+def test_prefetch_order_and_limit(monkeypatch):
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def slow_read(path):
+        with lock:
+            active.append(path)
+            peak.append(len(active))
+        # Later files finish first
+        time.sleep(0.02 / (1 + int(path)))
+        with lock:
+            active.remove(path)
+        return f"content {path}"
+
+    monkeypatch.setattr(prefetch_module, "read_text", slow_read)
+    taken = []
+
+    def items():
+        for i in range(5):
+            taken.append(i)
+            yield i, [str(i * 2), str(i * 2 + 1)]
+
+    it = prefetch(items(), lambda item: item[1], concurrency=3)
+    (first, files), contents = next(it)
+    assert first == 0
+    assert contents == ["content 0", "content 1"]
+    # Only as many items as needed to fill the readers were taken
+    assert taken == [0, 1]
+    rest = list(it)
+    assert [item[0] for item, _ in rest] == [1, 2, 3, 4]
+    assert rest[-1][1] == ["content 8", "content 9"]
+    assert max(peak) <= 3
+
+
+@pytest.mark.parametrize("command", ("pycharm", "vscode"))
+def test_read_ahead_output_is_identical(runner, temporary_directory, command):
+    args = [command, "--out-dir", str(temporary_directory), "--dry-run", "-j", "1"]
+    plain = runner.invoke(app, args)
+    read_ahead = runner.invoke(app, args + ["--read-ahead", "4"])
+    assert read_ahead.exit_code == 0, read_ahead.output
+    assert plain.stdout == read_ahead.stdout
@@ -0,0 +1,93 @@
+import os
+import shutil
+
+from cs_cli.folder_index import FolderIndex
+from cs_cli.main import app
+from cs_cli.snippet_db import SnippetDB, fts_query
+from tests.conftest import fixture_path
+
+
+def test_fts_query():
+    assert fts_query('for-loop "x') == '"for-loop"* """x"*'
+    assert fts_query("  ") == ""
+
+
+def test_update_is_incremental(temporary_directory):
+    root = temporary_directory / "root"
+    shutil.copytree(fixture_path, root)
+    index = FolderIndex(root, temporary_directory / "folders.json")
+    with SnippetDB(temporary_directory / "db.sqlite3") as db:
+        assert db.update(index) == (3, 0, 0, 0)
+        assert db.update(index) == (0, 0, 0, 3)
+
+        snip = root / "css" / "flex"
+        snip.write_text("display: flex;\n")
+        # Same content with a new mtime is not re-read
+        os.utime(root / "n_snips" / "snip", ns=(1, 1))
+        (root / "codium_only" / "snip").unlink()
+        assert db.update(index) == (0, 1, 1, 1)
+
+        [hit] = db.search("display")
+        assert (hit.folder, hit.name, hit.lang_ids) == ("css", "flex", ("css",))
+        assert "display: flex" in hit.excerpt
+        assert not db.search("foo", lang_id="rust")
+
+        shutil.rmtree(root / "css")
+        assert db.update(index).removed == 1
+        assert db.count() == 1
+
+
+def test_search_filters(temporary_directory):
+    index = FolderIndex(fixture_path, temporary_directory / "folders.json")
+    with SnippetDB(temporary_directory / "db.sqlite3") as db:
+        db.update(index)
+        assert [h.folder for h in db.search("fo")] == ["codium_only", "n_snips"]
+        [hit] = db.search("foo", lang_id="r")
+        assert hit.lang_ids == ("rust", "r")
+        [hit] = db.search("", group="n_snips")
+        assert hit.contexts == ("Python", "ECMAScript6")
+        assert db.search("foo OR flex", raw=True, limit=10)
+
+
+def test_cli_index_and_search(runner, temporary_directory):
+    db = str(temporary_directory / "db.sqlite3")
+    result = runner.invoke(app, ["search", "foo", "--db", db])
+    assert result.exit_code == 1
+    result = runner.invoke(app, ["index", "--db", db])
+    assert result.exit_code == 0, result.output
+    assert "3 snippets: 3 added" in result.stdout
+    result = runner.invoke(app, ["search", "foo", "--lang", "rust", "--db", db])
+    assert result.exit_code == 0
+    assert result.stdout.startswith("codium_only/snip (rust, r)")
+    result = runner.invoke(app, ["index", "--force", "--db", db])
+    assert "3 added" in result.stdout
+    result = runner.invoke(app, ["search", '"unterminated', "--raw", "--db", db])
+    assert result.exit_code == 2
+    assert "Invalid FTS5 query" in result.output
+
+
+def test_update_uses_build_matcher_and_file_configs(runner, temporary_directory):
+    root = temporary_directory / "root"
+    (root / "shell").mkdir(parents=True)
+    (root / "shell" / "ls.sh").write_text("ls $DIR$")
+    (root / "shell" / "tasks.json").write_text('{"tasks": []}')
+    (root / "shell" / "draft").write_text("ls -la")
+    (root / "shell" / ".csignore").write_text("draft\n")
+    config = root / ".cs-config.json"
+    config.write_text('{"files": {"*.sh": {"pycharm_contexts": ["SHELL_SCRIPT"]}}}')
+    db = temporary_directory / "db.sqlite3"
+    env = {"CODE_SNIPPETS_PATH": str(root)}
+
+    result = runner.invoke(app, ["index", "--db", str(db)], env=env)
+    assert result.exit_code == 0, result.output
+    assert "1 snippets: 1 added" in result.stdout
+    with SnippetDB(db) as snippet_db:
+        [hit] = snippet_db.search()
+        assert (hit.name, hit.contexts) == ("ls", ("SHELL_SCRIPT",))
+
+    # A config change alone updates the contexts
+    config.write_text('{"pycharm_contexts": ["Python"]}')
+    runner.invoke(app, ["index", "--db", str(db)], env=env)
+    with SnippetDB(db) as snippet_db:
+        [hit] = snippet_db.search()
+        assert hit.contexts == ("Python",)
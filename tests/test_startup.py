@@ -0,0 +1,75 @@
+"""Startup regressions: `--help` and shell completion must not import the pipeline."""
+
+import json
+import os
+import subprocess
+import sys
+
+from tests.conftest import fixture_path
+
+# Cumulative import time of cs_cli.main, typer included
+IMPORT_BUDGET_MS = float(os.getenv("CS_CLI_IMPORT_BUDGET_MS", "250"))
+HEAVY_MODULES = (
+    "pydantic",
+    "xml.etree",
+    "concurrent.futures.process",
+    "cs_cli.pipeline",
+)
+
+probe = """
+import atexit, json, sys
+heavy = {heavy!r}
+atexit.register(
+    lambda: print(json.dumps([m for m in heavy if m in sys.modules]), file=sys.stderr)
+)
+from cs_cli.main import app
+app({args!r}, prog_name="cs-cli")
+"""
+
+
+def run_probe(args, **env):
+    code = probe.format(heavy=HEAVY_MODULES + ("rich",), args=args)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    return result.stdout, json.loads(result.stderr.strip().splitlines()[-1])
+
+
+def test_completion_is_lazy():
+    stdout, loaded = run_probe(
+        None,
+        _CS_CLI_COMPLETE="complete_bash",
+        COMP_WORDS="cs-cli vscode -f n_",
+        COMP_CWORD="3",
+        CODE_SNIPPETS_PATH=str(fixture_path),
+    )
+    assert stdout.split() == ["n_snips"]
+    assert loaded == []
+
+
+def test_help_is_lazy():
+    stdout, loaded = run_probe(["--help"])
+    assert "pycharm" in stdout
+    # typer renders the help with rich
+    assert set(loaded) <= {"rich"}
+
+
+def test_import_time_budget():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import cs_cli.main"],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    line = next(
+        li for li in result.stderr.splitlines() if li.rstrip().endswith("| cs_cli.main")
+    )
+    cumulative_ms = int(line.split("|")[1]) / 1000
+    assert cumulative_ms < IMPORT_BUDGET_MS, (
+        f"Importing cs_cli.main took {cumulative_ms:.0f}ms, "
+        f"set CS_CLI_IMPORT_BUDGET_MS to raise the budget"
+    )
@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.transforms import (
+    legacy_line_transforms,
+    legacy_transform_content,
+    python_file,
+)
+from cs_cli.pipeline import file_transforms, transform_content
+
+contents = (
+    "",
+    "\n",
+    "\n\n\nx = 1",
+    "\nx = 1\n",
+    "import os\n\n\nx = 1\n",
+    "x = 1\nimport os",
+    "from a import b\nfrom c import d\nimport e\n",
+    "  import os\nimportant = 1\nfromage = 2\nfrom\n",
+    "a\r\nimport os\r\nb\r\n",
+    "a\r\r\nb\rc",
+    "a\x0bb\x0cc\x1cd e f\x85import g\n",
+    "x = 1\n\n\n",
+    python_file(300),
+)
+
+
+@pytest.mark.parametrize("rm_imports", (True, False))
+@pytest.mark.parametrize("fn", ("snip.py", "snip.sh", "snip"))
+@pytest.mark.parametrize("content", contents)
+def test_buffer_transforms_match_line_transforms(content, fn, rm_imports):
+    assert transform_content(fn, content, file_transforms(rm_imports)) == (
+        legacy_transform_content(fn, content, legacy_line_transforms(rm_imports))
+    )
+
+
+def test_unknown_file_endings_are_kept():
+    assert transform_content("snip.js", "import x\n", file_transforms(True)) == (
+        "snip",
+        "import x",
+    )
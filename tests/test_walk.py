@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from cs_cli.main import app
+from cs_cli.matcher import Matcher
+from cs_cli.pipeline import snippets_config, vscode_output_names
+from cs_cli.walk import walk
+
+
+def make_tree(root):
+    for rel, content in {
+        "python/.cs-config.json": '{"pycharm_contexts": ["Python"]}',
+        "python/main": "if __name__ == '__main__':",
+        "python/django/.cs-config.json": '{"vscode_lang_ids": ["python", "html"]}',
+        "python/django/view.py": "def view(request): ...",
+        "python/django/templates/block": "{% block $NAME$ %}{% endblock %}",
+        "python/empty/sub/deep": "x",
+        "python/__pycache__/x.pyc": "",
+        "python/.hidden/snip": "",
+        "shell/ls.sh": "ls",
+    }.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def test_walk_nested_groups(temporary_directory):
+    make_tree(temporary_directory)
+    top = [temporary_directory / "python", temporary_directory / "shell"]
+    walked = walk(top, root=temporary_directory, matcher=Matcher(["ls.sh"]))
+    result = {folder.name: (folder, files) for folder, files in walked}
+    assert list(result) == [
+        "python",
+        "python/django",
+        "python/django/templates",
+        "python/empty/sub",
+        "shell",
+    ]
+    folder, files = result["python/django"]
+    assert [f.name for f in files] == ["view.py"]
+    assert [f.parent.name for f in folder.config_files] == ["python", "django"]
+    assert result["shell"][1] == ()
+
+    config = snippets_config(result["python/django/templates"][0])
+    assert list(config.pycharm_contexts) == ["Python"]
+    assert list(config.vscode_lang_ids) == ["python", "html"]
+    assert vscode_output_names(result["python"][0]) == ("python.json",)
+    assert vscode_output_names(result["python/empty/sub"][0]) == ("python.json",)
+
+
+def test_walk_given_nested_folder_inherits(temporary_directory):
+    make_tree(temporary_directory)
+    nested = temporary_directory / "python" / "django"
+    [(folder, _), _] = walk([nested], root=temporary_directory)
+    assert folder.name == "python/django"
+    assert len(folder.config_files) == 2
+    [(folder, _), _] = walk([nested])
+    assert folder.name == "django"
+    assert [f.parent.name for f in folder.config_files] == ["django"]
+
+
+def test_walk_is_lazy(temporary_directory):
+    make_tree(temporary_directory)
+    walked = walk([temporary_directory / "python"])
+    folder, _ = next(walked)
+    assert folder.name == "python"
+    (temporary_directory / "python" / "django" / "late").write_text("x")
+    folder, files = next(walked)
+    assert "late" in [f.name for f in files]
+
+
+def test_build_nested_groups(runner, temporary_directory):
+    root = temporary_directory / "root"
+    make_tree(root)
+    out = temporary_directory / "out"
+    result = runner.invoke(
+        app,
+        ["build", "--pycharm-dir", str(out), "--vscode-dir", str(out), "-j", "1"],
+        env={"CODE_SNIPPETS_PATH": str(root)},
+    )
+    assert result.exit_code == 0, result.output
+    xml = (out / "cs-python-django-templates.xml").read_text()
+    assert 'group="cs-python/django/templates"' in xml
+    assert '<option name="Python" value="true" />' in xml
+    html = json.loads((out / "html.json").read_text())
+    assert set(html) == {"python/django-view", "python/django/templates-block"}
+    assert (out / "shell.code-snippets").is_file()
+
+
+@pytest.mark.parametrize("command", ("pycharm", "vscode"))
+def test_build_rejects_clashing_group_file_names(runner, temporary_directory, command):
+    root = temporary_directory / "root"
+    for rel in ("a/b/x", "a-b/y"):
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(rel)
+    out = temporary_directory / "out"
+    result = runner.invoke(
+        app,
+        [command, "--out-dir", str(out), "-j", "1"],
+        env={"CODE_SNIPPETS_PATH": str(root)},
+    )
+    assert result.exit_code == 1
+    assert "The groups a/b and a-b both use the file name a-b" in result.stdout
+    assert not (out / "cs-a-b.xml").exists()
+    assert not (out / "a-b.code-snippets").exists()
@@ -0,0 +1,102 @@
+import pytest
+
+from cs_cli.watch import InotifyWatcher, PollingWatcher, batches
+
+watchers = [
+    pytest.param(lambda root: PollingWatcher(root, interval=0.01), id="polling"),
+    pytest.param(
+        InotifyWatcher,
+        id="inotify",
+        marks=pytest.mark.skipif(
+            not InotifyWatcher.available(), reason="inotify not available"
+        ),
+    ),
+]
+
+
+@pytest.mark.parametrize("create_watcher", watchers)
+def test_watcher_reports_changed_folders(temporary_directory, create_watcher):
+    python = temporary_directory / "python"
+    python.mkdir()
+    (python / "snip").write_text("foo")
+    (temporary_directory / "shell").mkdir()
+    watcher = create_watcher(temporary_directory)
+    try:
+        assert watcher.changes(0.05) == set()
+
+        (python / "snip").write_text("bar")
+        (python / ".cs-config.json").write_text('{"vscode_lang_ids": ["r"]}')
+        assert next(batches(watcher, debounce=0.05)) == {python}
+
+        new = temporary_directory / "new"
+        new.mkdir()
+        assert new in watcher.changes(1)
+        (new / "snip").write_text("foo")
+        assert watcher.changes(1) == {new}
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("create_watcher", watchers)
+def test_watcher_reports_nested_folders(temporary_directory, create_watcher):
+    django = temporary_directory / "python" / "django"
+    django.mkdir(parents=True)
+    (django / "view").write_text("foo")
+    watcher = create_watcher(temporary_directory)
+    try:
+        (django / "view").write_text("bar")
+        assert next(batches(watcher, debounce=0.05)) == {django}
+
+        forms = django / "forms"
+        forms.mkdir()
+        assert django in watcher.changes(1)
+        (forms / "form").write_text("foo")
+        assert forms in watcher.changes(1)
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize("create_watcher", watchers)
+def test_watcher_reports_root_config_for_all_folders(
+    temporary_directory, create_watcher
+):
+    python, shell = temporary_directory / "python", temporary_directory / "shell"
+    for folder in (python, shell):
+        folder.mkdir()
+        (folder / "snip").write_text("foo")
+    config = temporary_directory / ".cs-config.json"
+    config.write_text('{"pycharm_contexts": ["Python"]}')
+    watcher = create_watcher(temporary_directory)
+    try:
+        config.write_text('{"pycharm_contexts": ["CSS"]}')
+        assert next(batches(watcher, debounce=0.05)) == {python, shell}
+        # Other files at the root are not snippets
+        (temporary_directory / "notes.txt").write_text("foo")
+        assert watcher.changes(0.1) == set()
+    finally:
+        watcher.close()
+
+
+def test_watch_survives_broken_config(runner, temporary_directory, monkeypatch):
+    from cs_cli import watch
+    from cs_cli.main import app
+
+    root = temporary_directory / "root"
+    (root / "css").mkdir(parents=True)
+    (root / "css" / "flex").write_text("display: flex;")
+    config = root / "css" / ".cs-config.json"
+    out = temporary_directory / "out"
+
+    def edits(watcher, debounce):
+        config.write_text("{bad")
+        yield {root / "css"}
+        config.write_text('{"pycharm_contexts": ["CSS"]}')
+        yield {root / "css"}
+
+    monkeypatch.setattr(watch, "batches", edits)
+    args = ["watch", "--targets", "pycharm", "--pycharm-dir", str(out), "--polling"]
+    result = runner.invoke(app, args, env={"CODE_SNIPPETS_PATH": str(root)})
+    assert result.exit_code == 0, result.output
+    assert "Build failed:" in result.stdout
+    assert ".cs-config.json" in result.stdout
+    assert '<option name="CSS" value="true" />' in (out / "cs-css.xml").read_text()
@@ -4,9 +4,13 @@ import pytest
 
 from cs_cli.charm_models import (
     CharmTemplate,
+    TemplateContext,
+    TemplateSet,
     extmarks_variable_rgx,
+    template_context,
     transform_extmark_to_pycharm,
     transform_pycharm_to_extmark,
+    xml_plan,
 )
 
 
@@ -80,3 +84,48 @@ def test_variables_charm(content, vars):
         assert f"${vars[0]}$" in template.value, (
             "The value must be adapted to fit the pycharm format"
         )
+
+
+def test_streaming_xml_matches_element_tree(temporary_directory):
+    context = TemplateContext.parse_obj([{"name": "Python"}, {"name": "CSS"}])
+    templates = [
+        CharmTemplate(name='a&<"b', value="x $A$\n\ty\r<>&\"'", context=context),
+        CharmTemplate(name="ü", value="for ${1:TARGET} in ${2:EXPR}:"),
+    ]
+    for model in (
+        TemplateSet(group="cs-g", templates=templates),
+        TemplateSet(group="cs-empty", templates=[]),
+    ):
+        target = temporary_directory / "out.xml"
+        model.write_xml(target)
+        assert target.read_bytes() == model.xml().encode()
+        assert "".join(model.iter_xml()) == model.xml()
+
+
+def test_xml_plan():
+    plan = xml_plan(CharmTemplate)
+    assert plan.attributes == (
+        "name",
+        "value",
+        "description",
+        "toReformat",
+        "toShortenFQNames",
+    )
+    assert plan.children == (("variables", True), ("context", False))
+    assert xml_plan(TemplateContext).children == (("__root__", True),)
+    assert xml_plan(CharmTemplate) is plan
+
+
+@pytest.mark.parametrize(
+    "value", ("$IN$ -> $OUT$", "for ${1:x} in ${2|a,b|}:", "plain $", "")
+)
+@pytest.mark.parametrize("contexts", (("Python", "Django"), ("Python", "OTHER")))
+def test_trusted_template_matches_validated(value, contexts):
+    validated = CharmTemplate(
+        name="t",
+        value=value,
+        context=TemplateContext.parse_obj([{"name": n} for n in contexts]),
+    )
+    trusted = CharmTemplate.trusted("t", value, template_context(contexts))
+    assert trusted.xml() == validated.xml()
+    assert template_context(contexts) is trusted.context